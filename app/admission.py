@@ -0,0 +1,245 @@
+"""
+Priority-aware admission control for LLM calls.
+
+Every upstream call (llm._create) is admitted by `controller.admit()`:
+  - token buckets for the provider's requests per minute (LLM_RPM_LIMIT)
+    and tokens per minute (LLM_TPM_LIMIT; a call is charged its estimated
+    prompt tokens plus max_tokens),
+  - a cap on calls one user may have in flight (LLM_PER_USER_CONCURRENCY),
+  - a queue ordered by priority, then arrival. A waiting call is admitted
+    only when no higher-priority call that could run is queued before it;
+    calls of a user at their cap are skipped, not blocking others.
+
+Priorities come from the turn: pending-transfer confirmations first, then
+phone turns (voice_turns), then web chat (the default), then ask_llm small
+talk. A call still queued after LLM_ADMISSION_TIMEOUT_SECONDS raises
+AdmissionTimeout; like an open circuit breaker, the llm.py classifiers
+answer it from offline_rules (ask_llm with its fallback reply). Later
+calls of the same turn then raise AdmissionTimeout at once instead of
+queueing again, so a saturated quota degrades a turn instead of
+multiplying its latency.
+
+Metrics: gauge llm.admission.queue_depth, llm.admission.wait_seconds.<prio>
+and llm.admission.timeouts.<prio>.
+"""
+
+import bisect
+import contextlib
+import contextvars
+import itertools
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import metrics
+from .config import (
+    LLM_ADMISSION_TIMEOUT_SECONDS,
+    LLM_PER_USER_CONCURRENCY,
+    LLM_RPM_LIMIT,
+    LLM_TPM_LIMIT,
+)
+
+CONFIRMATION = 0
+VOICE = 1
+CHAT = 2
+SMALL_TALK = 3
+
+PRIORITY_NAMES = {
+    CONFIRMATION: "confirmation",
+    VOICE: "voice",
+    CHAT: "chat",
+    SMALL_TALK: "small_talk",
+}
+
+# Functions that never run above this priority, whoever calls them.
+FUNCTION_PRIORITY: Dict[str, int] = {"ask_llm": SMALL_TALK}
+
+current_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "llm_priority", default=CHAT
+)
+current_user: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "llm_user", default=None
+)
+# {"timed_out": bool} of the current turn (see start_turn).
+_turn_state: contextvars.ContextVar[Optional[Dict[str, bool]]] = contextvars.ContextVar(
+    "llm_turn_state", default=None
+)
+
+
+class AdmissionTimeout(Exception):
+    pass
+
+
+class TokenBucket:
+    """`per_minute` units per minute, bursting up to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Waiter:
+    __slots__ = ("priority", "user_id", "tokens")
+
+    def __init__(self, priority: int, user_id: Optional[str], tokens: int):
+        self.priority = priority
+        self.user_id = user_id
+        self.tokens = tokens
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        rpm: int = LLM_RPM_LIMIT,
+        tpm: int = LLM_TPM_LIMIT,
+        per_user: int = LLM_PER_USER_CONCURRENCY,
+        timeout: float = LLM_ADMISSION_TIMEOUT_SECONDS,
+    ):
+        self.buckets: List[Tuple[TokenBucket, bool]] = []
+        if rpm > 0:
+            self.buckets.append((TokenBucket(rpm), False))
+        if tpm > 0:
+            self.buckets.append((TokenBucket(tpm), True))
+        self.per_user = per_user
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._in_flight: Counter = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.buckets) or self.per_user > 0
+
+    def _user_blocked(self, user_id: Optional[str]) -> bool:
+        if self.per_user <= 0 or user_id is None:
+            return False
+        return self._in_flight[user_id] >= self.per_user
+
+    def _bucket_wait(self, tokens: int, now: float) -> float:
+        waits = [
+            bucket.wait_time(tokens if by_tokens else 1, now)
+            for bucket, by_tokens in self.buckets
+        ]
+        return max(waits, default=0.0)
+
+    def _head(self) -> Optional[_Waiter]:
+        """The first queued call that is not held back by its user's cap."""
+        for _, _, waiter in self._queue:
+            if not self._user_blocked(waiter.user_id):
+                return waiter
+        return None
+
+    def _publish_depth(self) -> None:
+        metrics.gauge("llm.admission.queue_depth", len(self._queue))
+
+    @contextlib.contextmanager
+    def admit(self, tokens: int, priority: int, user_id: Optional[str]) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        turn = _turn_state.get()
+        if turn is not None and turn["timed_out"]:
+            metrics.incr(f"llm.admission.timeouts.{name}")
+            raise AdmissionTimeout(f"LLM call ({name}) skipped, the turn already timed out")
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waiter = _Waiter(priority, user_id, tokens)
+        entry = (priority, next(self._seq), waiter)
+
+        with self._cond:
+            bisect.insort(self._queue, entry)
+            self._publish_depth()
+            while True:
+                now = time.monotonic()
+                wait = deadline - now
+                if self._head() is waiter:
+                    bucket_wait = self._bucket_wait(tokens, now)
+                    if bucket_wait == 0.0:
+                        break
+                    wait = min(wait, bucket_wait)
+                if now >= deadline:
+                    self._queue.remove(entry)
+                    self._publish_depth()
+                    self._cond.notify_all()
+                    metrics.incr(f"llm.admission.timeouts.{name}")
+                    if turn is not None:
+                        turn["timed_out"] = True
+                    raise AdmissionTimeout(
+                        f"LLM call ({name}) not admitted within {self.timeout}s"
+                    )
+                self._cond.wait(wait)
+
+            self._queue.remove(entry)
+            self._publish_depth()
+            for bucket, by_tokens in self.buckets:
+                bucket.take(tokens if by_tokens else 1)
+            if user_id is not None:
+                self._in_flight[user_id] += 1
+            self._cond.notify_all()
+
+        metrics.observe(f"llm.admission.wait_seconds.{name}", time.monotonic() - started)
+        try:
+            yield
+        finally:
+            if user_id is not None:
+                with self._cond:
+                    self._in_flight[user_id] -= 1
+                    if not self._in_flight[user_id]:
+                        del self._in_flight[user_id]
+                    self._cond.notify_all()
+
+
+controller = AdmissionController()
+
+
+def priority_for(fn_name: Optional[str]) -> int:
+    return max(current_priority.get(), FUNCTION_PRIORITY.get(fn_name or "", CONFIRMATION))
+
+
+def start_turn(
+    user_id: str, urgent: bool = False
+) -> Tuple[contextvars.Token, contextvars.Token, contextvars.Token]:
+    """Attributes the turn's LLM calls to `user_id`; urgent turns go first."""
+    priority = CONFIRMATION if urgent else current_priority.get()
+    return (
+        current_user.set(user_id),
+        current_priority.set(priority),
+        _turn_state.set({"timed_out": False}),
+    )
+
+
+def end_turn(tokens: Tuple[contextvars.Token, contextvars.Token, contextvars.Token]) -> None:
+    user_token, priority_token, state_token = tokens
+    _turn_state.reset(state_token)
+    current_priority.reset(priority_token)
+    current_user.reset(user_token)
+
+
+@contextlib.contextmanager
+def priority(level: int) -> Iterator[None]:
+    token = current_priority.set(level)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
@@ -0,0 +1,353 @@
+"""
+Parser for amounts in spoken (ASR-transcribed) English.
+
+Handles:
+  - digits with spoken / written separators: '50', '100,50', '1 000,50', '1,000.50'
+  - number words: 'fifty', 'two hundred and fifty', 'a thousand', 'twelve point five'
+  - spoken decimals after digits: '12 point 5', '12 point five'
+
+Two numbers in a row ('twenty five fifty', 'nineteen ninety', '100 200')
+are ambiguous and give no amount; space-grouped digits are one number only
+with decimals or a currency after them ('1 000,50', '1 000 zł').
+  - currency words and symbols: 'złoty', 'zlotys', 'PLN', 'euro', '$', ...
+  - minor units: 'fifty złoty and twenty groszy'
+  - fractions of the balance: 'half my balance', 'a quarter of my money',
+    '10 percent of my balance', 'all my money'
+  - 'same as last time' phrases
+
+Ordinals ('on the 3rd', 'the second') are never amounts.
+
+The message is tokenized by one compiled regex and scanned once, left to
+right; the first amount expression wins.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+ABSOLUTE = "absolute"
+FRACTION_OF_BALANCE = "fraction_of_balance"
+SAME_AS_LAST = "same_as_last"
+
+
+@dataclass(frozen=True)
+class ParsedAmount:
+    """
+    kind:
+      - "absolute"            -> value is an amount of money
+      - "fraction_of_balance" -> value is a fraction in (0, 1] of the balance
+      - "same_as_last"        -> repeat the amount of the previous transfer
+    currency: ISO code if the caller named one, else None.
+    """
+
+    kind: str
+    value: float = 0.0
+    currency: Optional[str] = None
+
+    def resolve(self, balance: Optional[float]) -> Optional[float]:
+        """Returns the amount of money, or None if it needs history / a balance."""
+        if self.kind == ABSOLUTE:
+            return self.value
+        if self.kind == FRACTION_OF_BALANCE and balance is not None:
+            return round(balance * self.value, 2)
+        return None
+
+
+UNITS = {
+    "zero": 0, "oh": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11,
+    "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16,
+    "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+TENS = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fourty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+SCALES = {"hundred": 100, "thousand": 1_000, "grand": 1_000, "million": 1_000_000}
+
+CURRENCIES = {
+    "pln": "PLN", "zl": "PLN", "zł": "PLN", "zloty": "PLN", "złoty": "PLN",
+    "zlotys": "PLN", "złotys": "PLN", "zlotych": "PLN", "złotych": "PLN",
+    "zlote": "PLN", "złote": "PLN",
+    "eur": "EUR", "euro": "EUR", "euros": "EUR", "€": "EUR",
+    "usd": "USD", "dollar": "USD", "dollars": "USD", "bucks": "USD", "$": "USD",
+    "gbp": "GBP", "pound": "GBP", "pounds": "GBP", "£": "GBP",
+}
+# Digits grouped with spaces ('1 000') are only read as one number when the
+# grouping is unambiguous: decimals follow ('1 000,50') or a currency does
+# ('1 000 zł'). Otherwise '100 200' would become 100200.
+_CURRENCY_AHEAD = "|".join(re.escape(c) for c in sorted(CURRENCIES, key=len, reverse=True))
+
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<ordinal>\d+(?:st|nd|rd|th)\b)
+    | (?P<number>
+          \d{1,3}(?:[.,']\d{3})+(?:[.,]\d{1,2})?(?![\d.,]?\d)
+        | \d{1,3}(?:[\ \u00a0]\d{3})+
+          (?: [.,]\d{1,2}(?![\d.,]?\d)
+            | (?=[\ \u00a0]?(?:%s)(?![^\W\d_])) )
+        | \d+(?:[.,]\d{1,2})?(?![\d.,]?\d)
+        | \d+
+      )
+    | (?P<word>[^\W\d_]+)
+    | (?P<symbol>[$€£%%])
+    """
+    % _CURRENCY_AHEAD,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+MINOR_UNITS = {"gr", "grosz", "groszy", "grosze", "cent", "cents", "penny", "pence"}
+
+FRACTIONS = {
+    "all": 1.0, "everything": 1.0, "whole": 1.0, "entire": 1.0,
+    "half": 0.5, "quarter": 0.25, "third": 1 / 3,
+}
+PERCENT_WORDS = {"percent", "per", "%"}
+BALANCE_WORDS = {"balance", "money", "savings", "funds", "account", "cash"}
+# Words allowed between a fraction word and the balance word ('half OF MY balance').
+FILLER_WORDS = {"of", "my", "the", "a", "an", "on", "in", "cent", "current", "available"}
+
+SAME_AS_LAST_RE = re.compile(
+    r"\b(?:same\s+(?:amount|money|sum|as\s+(?:last|before|previous))"
+    r"|as\s+much\s+as\s+(?:last|before)"
+    r"|the\s+usual(?:\s+amount)?)\b",
+    re.IGNORECASE,
+)
+
+Token = Tuple[str, str]  # (kind, lowercased text)
+
+
+def tokenize(message: str) -> List[Token]:
+    return [
+        (m.lastgroup or "", m.group(m.lastgroup or 0).lower())
+        for m in _TOKEN_RE.finditer(message or "")
+    ]
+
+
+def _digits_value(text: str) -> float:
+    """
+    '1 000,50' -> 1000.5, '1.000' -> 1000, '1,000.50' -> 1000.5, '100,5' -> 100.5.
+    A final separator followed by 1-2 digits is decimal; all others group thousands.
+    """
+    text = text.replace("\u00a0", " ")
+    m = re.search(r"[.,](\d{1,2})$", text)
+    if m:
+        whole, frac = text[: m.start()], m.group(1)
+    else:
+        whole, frac = text, ""
+    whole = re.sub(r"[ .,']", "", whole)
+    return float(f"{whole}.{frac}" if frac else whole)
+
+
+def _is_number_word(text: str) -> bool:
+    return text in UNITS or text in TENS or text in SCALES
+
+
+def _read_number_words(tokens: List[Token], i: int) -> Tuple[Optional[float], int]:
+    """
+    Reads a spoken cardinal starting at tokens[i] ('two hundred and fifty',
+    'a thousand', 'twelve point five'). Returns (value, next_index), or
+    (None, i) if tokens[i] does not start a number.
+
+    A units / teens / tens word only continues the number where English
+    grammar allows it ('twenty five', 'hundred and five'); otherwise the
+    number ends before it ('nineteen | ninety', 'twenty five | fifty').
+    """
+    n = len(tokens)
+    start = i
+    total = 0
+    current = 0
+    seen = False
+    # What the previous number word was: None, "unit", "teen", "tens", "scale".
+    last: Optional[str] = None
+
+    while i < n:
+        kind, text = tokens[i]
+        if kind != "word":
+            break
+        if text in ("a", "an") and not seen and i + 1 < n and tokens[i + 1][1] in SCALES:
+            current = 1
+            seen = True
+            last = "unit"
+        elif text in UNITS:
+            value = UNITS[text]
+            if 1 <= value <= 9 and last in (None, "scale", "tens"):
+                last = "unit"
+            elif last in (None, "scale"):
+                last = "teen"
+            else:
+                break
+            current += value
+            seen = True
+        elif text in TENS:
+            if last not in (None, "scale"):
+                break
+            current += TENS[text]
+            seen = True
+            last = "tens"
+        elif text in SCALES and seen:
+            scale = SCALES[text]
+            if scale == 100:
+                if current >= 100:
+                    break
+                current = max(current, 1) * 100
+            else:
+                total += max(current, 1) * scale
+                current = 0
+            last = "scale"
+        elif text == "and" and seen and i + 1 < n and _is_number_word(tokens[i + 1][1]):
+            pass
+        else:
+            break
+        i += 1
+
+    if not seen:
+        return None, start
+
+    return _read_point(tokens, i, float(total + current))
+
+
+def _read_point(tokens: List[Token], i: int, value: float) -> Tuple[float, int]:
+    """
+    Decimals spoken after a whole number: 'twelve point five',
+    '12 point 5', 'twelve point fifty'. Returns (value, next_index).
+    """
+    n = len(tokens)
+    if value != int(value) or i + 1 >= n or tokens[i][1] != "point":
+        return value, i
+
+    j = i + 1
+    kind, text = tokens[j]
+    if kind == "number" and text.isdigit():
+        return float(f"{int(value)}.{text}"), j + 1
+
+    frac_digits = ""
+    while j < n and tokens[j][1] in UNITS and UNITS[tokens[j][1]] < 10:
+        frac_digits += str(UNITS[tokens[j][1]])
+        j += 1
+    if not frac_digits and j < n and tokens[j][1] in TENS:
+        frac_digits = str(TENS[tokens[j][1]])
+        j += 1
+    if frac_digits:
+        return float(f"{int(value)}.{frac_digits}"), j
+    return value, i
+
+
+def _read_currency(tokens: List[Token], i: int) -> Tuple[Optional[str], int]:
+    if i < len(tokens) and tokens[i][1] in CURRENCIES:
+        return CURRENCIES[tokens[i][1]], i + 1
+    return None, i
+
+
+def _read_cardinal(tokens: List[Token], i: int) -> Tuple[Optional[float], int, bool]:
+    """Returns (value, next_index, from_words) for digits or number words at i."""
+    kind, text = tokens[i]
+    if kind == "number":
+        value = _digits_value(text)
+        # '2 thousand', '1.5 million'
+        if i + 1 < len(tokens) and tokens[i + 1][1] in SCALES:
+            return value * SCALES[tokens[i + 1][1]], i + 2, False
+        value, j = _read_point(tokens, i + 1, value)
+        return value, j, False
+    value, j = _read_number_words(tokens, i)
+    return value, j, True
+
+
+def _starts_number(tokens: List[Token], i: int) -> bool:
+    if i >= len(tokens):
+        return False
+    kind, text = tokens[i]
+    return kind == "number" or (kind == "word" and _is_number_word(text))
+
+
+def _reaches_balance_word(tokens: List[Token], i: int) -> bool:
+    """True if tokens[i:] is e.g. 'of my balance' (only filler words before it)."""
+    for kind, text in tokens[i : i + 5]:
+        if text in BALANCE_WORDS:
+            return True
+        if text not in FILLER_WORDS:
+            return False
+    return False
+
+
+def parse_amount(message: str) -> Optional[ParsedAmount]:
+    """
+    Parses the first amount expression in the utterance.
+    Returns None if the utterance contains no amount.
+    """
+    if SAME_AS_LAST_RE.search(message or ""):
+        return ParsedAmount(kind=SAME_AS_LAST)
+
+    tokens = tokenize(message)
+    n = len(tokens)
+    i = 0
+
+    while i < n:
+        kind, text = tokens[i]
+
+        if kind == "ordinal":
+            i += 1
+            continue
+
+        # '$50', '€ 20'
+        if kind == "symbol" and text in CURRENCIES and i + 1 < n:
+            value, j, _ = _read_cardinal(tokens, i + 1)
+            if value is not None:
+                return ParsedAmount(ABSOLUTE, value, CURRENCIES[text])
+
+        # 'half my balance', 'all my money', 'a quarter of my savings'
+        if text in FRACTIONS and _reaches_balance_word(tokens, i + 1):
+            return ParsedAmount(FRACTION_OF_BALANCE, FRACTIONS[text])
+
+        if kind == "number" or (kind == "word" and (_is_number_word(text) or text in ("a", "an"))):
+            value, j, from_words = _read_cardinal(tokens, i)
+            if value is None:
+                i += 1
+                continue
+
+            # Another number right after this one ('twenty five fifty',
+            # 'nineteen ninety', '100 200'): could be several readings, so
+            # none is guessed and the caller is asked for the amount again.
+            if _starts_number(tokens, j):
+                return None
+
+            # 'ten percent of my balance', '10% of my money'
+            if j < n and tokens[j][1] in PERCENT_WORDS:
+                k = j + 1
+                if tokens[j][1] == "per" and k < n and tokens[k][1] == "cent":
+                    k += 1
+                if _reaches_balance_word(tokens, k) and 0 < value <= 100:
+                    return ParsedAmount(FRACTION_OF_BALANCE, value / 100)
+
+            currency, j = _read_currency(tokens, j)
+
+            # A bare 'one' is usually not an amount ('the one for mom').
+            if from_words and value == 1 and currency is None and text != "a":
+                i = j
+                continue
+
+            # 'fifty złoty and twenty groszy'
+            if currency and j + 1 < n and tokens[j][1] == "and":
+                minor, k, _ = _read_cardinal(tokens, j + 1)
+                if minor is not None and minor < 100 and k < n and tokens[k][1] in MINOR_UNITS:
+                    value = round(value + minor / 100, 2)
+
+            return ParsedAmount(ABSOLUTE, value, currency)
+
+        i += 1
+
+    return None
+
+
+def parse_cardinal(message: str) -> Optional[int]:
+    """
+    Returns the first whole number in the utterance, written with digits or
+    words ('show my last three transfers' -> 3). Ordinals are skipped.
+    """
+    tokens = tokenize(message)
+    for i, (kind, text) in enumerate(tokens):
+        if kind == "number" or (kind == "word" and _is_number_word(text)):
+            value, _, _ = _read_cardinal(tokens, i)
+            if value is not None:
+                return int(value)
+    return None
@@ -2,10 +2,10 @@ from typing import Optional
 from fastapi import APIRouter, Depends, Form
 from fastapi.responses import Response
 from sqlalchemy.orm import Session
-from twilio.twiml.voice_response import VoiceResponse, Gather
 
 from ..db import get_db
 from ..banking import get_user
+from ..audio_cache import say_or_play
 from ..config import BACKEND_USER_ID
 from ..voice_auth import VoiceAuthenticator
 
@@ -26,6 +26,8 @@ def auth_voice(
       3. Verify PIN
       4. Redirect to /twilio/voice on success
     """
+    from twilio.twiml.voice_response import VoiceResponse, Gather
+
     user_id = BACKEND_USER_ID
     user = get_user(db, user_id)
     resp = VoiceResponse()
@@ -44,9 +46,9 @@ def auth_voice(
             method="POST",
             speech_timeout="auto",
         )
-        gather.say("Welcome. Please say your full name to begin.")
+        say_or_play(gather, "Welcome. Please say your full name to begin.")
         resp.append(gather)
-        resp.say("No speech detected. Goodbye.")
+        say_or_play(resp, "No speech detected. Goodbye.")
         return Response(str(resp), media_type="application/xml")
 
     response_obj = authenticator.handle(user_id, SpeechResult, user)
@@ -6,10 +6,21 @@ from sqlalchemy import select
 from ..models import Transaction
 from ..db import get_db
 from .. import banking
-from ..schemas import TransactionOut, TransferRequest, AccountOut
+from ..schemas import (
+    TransactionOut,
+    TransferRequest,
+    AccountOut,
+    BatchTransferRequest,
+    BatchTransferResponse,
+    TransferResult,
+)
+from ..responses import FastJSONResponse
 
 router = APIRouter(prefix="/banking", tags=["banking"])
 
+# Upper bound on transfers per batch request.
+MAX_BATCH_TRANSFERS = 10_000
+
 
 @router.post("/transfer", response_model=AccountOut)
 def create_transfer(request: TransferRequest, db: Session = Depends(get_db)):
@@ -31,6 +42,35 @@ def create_transfer(request: TransferRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/transfers/batch", response_model=BatchTransferResponse)
+def create_transfers_batch(request: BatchTransferRequest, db: Session = Depends(get_db)):
+    """
+    Performs many transfers (for one or more accounts) in one DB transaction.
+    Returns a result per transfer, in request order; rejected transfers do
+    not stop the others unless `atomic` is set.
+    """
+    if len(request.transfers) > MAX_BATCH_TRANSFERS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_BATCH_TRANSFERS} transfers per batch.",
+        )
+
+    outcomes = banking.perform_transfers(
+        db,
+        [t.model_dump() for t in request.transfers],
+        atomic=request.atomic,
+    )
+    accepted = sum(1 for o in outcomes if o.ok)
+    return BatchTransferResponse(
+        accepted=accepted,
+        rejected=len(outcomes) - accepted,
+        results=[
+            TransferResult(index=o.index, ok=o.ok, error=o.error, balance=o.balance)
+            for o in outcomes
+        ],
+    )
+
+
 @router.get("/transactions/{user_id}", response_model=List[TransactionOut])
 def get_transaction_history(user_id: str, db: Session = Depends(get_db)):
     """
@@ -40,6 +80,23 @@ def get_transaction_history(user_id: str, db: Session = Depends(get_db)):
     return transactions
 
 
+@router.get(
+    "/transactions/{user_id}/fast",
+    response_model=List[TransactionOut],
+    response_class=FastJSONResponse,
+)
+def get_transaction_history_fast(
+    user_id: str, limit: Optional[int] = None, db: Session = Depends(get_db)
+):
+    """
+    Same payload as /transactions/{user_id}, for large histories:
+    rows are projected straight to dicts and serialized with orjson,
+    without ORM hydration or per-row Pydantic validation.
+    """
+    rows = banking.get_transaction_rows_for_user(db, user_id, limit=limit)
+    return FastJSONResponse(rows)
+
+
 def get_last_transfer_to_contact(
     db: Session,
     user_id: str,
@@ -4,11 +4,13 @@ from sqlalchemy.orm import Session
 from ..db import get_db
 from ..schemas import ChatRequest, ChatResponse
 from ..assistant import process_message
+from ..responses import FastJSONResponse
 
 router = APIRouter(prefix="/assistant", tags=["assistant"])
 
 
-@router.post("/chat", response_model=ChatResponse)
+@router.post("/chat", response_model=ChatResponse, response_class=FastJSONResponse)
 def assistant_chat(req: ChatRequest, db: Session = Depends(get_db)):
+    # Serialized directly (see app/responses.py); the schema stays for the docs.
     reply, intent, _ = process_message(req.message, req.user_id, db)
-    return ChatResponse(reply=reply, intent=intent)
+    return FastJSONResponse({"reply": reply, "intent": intent})
@@ -1,21 +1,19 @@
+import time
 from typing import Optional
 from fastapi import APIRouter, Depends, Form
 from fastapi.responses import Response, JSONResponse
 from sqlalchemy.orm import Session
 
-from twilio.jwt.access_token import AccessToken
-from twilio.jwt.access_token.grants import VoiceGrant
-from twilio.twiml.voice_response import VoiceResponse, Gather
-
+from .. import metrics, speculation, voice_turns
+from ..audio_cache import say_or_play
 from ..db import get_db
-from ..assistant import process_message
 from ..config import (
-    TWILIO_ACCOUNT_SID,
-    TWILIO_API_KEY,
-    TWILIO_API_SECRET,
-    TWIML_APP_SID,
+    TWILIO_VOICE_CONFIGURED,
+    TWILIO_TURN_DEADLINE_SECONDS,
+    TWILIO_SPECULATION,
     BACKEND_USER_ID,
 )
+from ..twilio_tokens import voice_tokens
 from ..banking import get_user
 from ..assistant_utils import pending_transfers
 
@@ -24,34 +22,28 @@ router = APIRouter(prefix="/twilio", tags=["twilio"])
 
 @router.get("/token")
 def twilio_token():
-    """Returns a Twilio Voice SDK token for browser calls."""
-    if not all([TWILIO_ACCOUNT_SID, TWILIO_API_KEY, TWILIO_API_SECRET, TWIML_APP_SID]):
+    """
+    Returns a Twilio Voice SDK token for browser calls.
+    Tokens are cached per identity and reissued shortly before they expire.
+    """
+    if not TWILIO_VOICE_CONFIGURED:
         return JSONResponse(
             status_code=500,
             content={"error": "Missing Twilio configuration."},
         )
 
-    token = AccessToken(
-        TWILIO_ACCOUNT_SID,
-        TWILIO_API_KEY,
-        TWILIO_API_SECRET,
-        identity="web_user",
-    )
-    token.add_grant(VoiceGrant(outgoing_application_sid=TWIML_APP_SID))
-
-    jwt = token.to_jwt()
-    if isinstance(jwt, bytes):
-        jwt = jwt.decode()
-
-    return {"token": jwt}
+    return {"token": voice_tokens.get("web_user")}
 
 
 @router.post("/voice")
 def twilio_voice(
     SpeechResult: Optional[str] = Form(None),
+    CallSid: Optional[str] = Form(None),
     db: Session = Depends(get_db),
 ):
     """Main post-auth banking conversational endpoint."""
+    from twilio.twiml.voice_response import VoiceResponse
+
     user_id = BACKEND_USER_ID
     user = get_user(db, user_id)
 
@@ -64,48 +56,107 @@ def twilio_voice(
 
     if not SpeechResult:
         print("[TWILIO] First entry – no SpeechResult yet")
-        gather = Gather(
-            input="speech",
-            language="en-US",
-            action="/twilio/voice",
-            method="POST",
-            speech_timeout="auto",
-        )
-        gather.say(
+        gather = _gather()
+        say_or_play(
+            gather,
             "Hi, I am your banking assistant. How can I help you today?",
             language="en-US",
         )
         resp.append(gather)
-        resp.say("I didn't hear anything. Goodbye.", language="en-US")
+        say_or_play(resp, "I didn't hear anything. Goodbye.", language="en-US")
         return Response(str(resp), media_type="application/xml")
 
     print(f"[TWILIO] SpeechResult from Twilio: {SpeechResult!r}")
 
-    reply, intent, end_call = process_message(SpeechResult, user_id, db)
+    started = time.monotonic()
+    turn = voice_turns.start(SpeechResult, user_id, CallSid)
+    result = voice_turns.wait(turn, TWILIO_TURN_DEADLINE_SECONDS)
 
-    print(f"[ASSISTANT] intent={intent}, end_call={end_call}, reply={reply!r}")
+    if result is None:
+        metrics.incr("twilio.deadline_exceeded")
+        turn_id = voice_turns.park(turn)
+        print(f"[TWILIO] Turn not ready after {time.monotonic() - started:.1f}s, parked as {turn_id}")
+        return _filler(resp, turn_id, "One moment please.")
 
-    resp.say(reply, language="en-US")
+    return _render_turn(resp, user_id, *result)
 
-    if end_call:
-        resp.hangup()
+
+@router.post("/voice/partial")
+def twilio_voice_partial(
+    StableSpeechResult: Optional[str] = Form(None),
+    CallSid: Optional[str] = Form(None),
+):
+    """
+    Gather's partialResultCallback: classifies the stable part of what the
+    caller has said so far, so /twilio/voice can reuse it (see speculation).
+    """
+    speculation.speculate(CallSid, BACKEND_USER_ID, StableSpeechResult)
+    return Response(status_code=204)
+
+
+@router.post("/voice/result")
+def twilio_voice_result(turn: str):
+    """Serves the reply of a turn that missed the /twilio/voice deadline."""
+    from twilio.twiml.voice_response import VoiceResponse
+
+    resp = VoiceResponse()
+    future = voice_turns.get_parked(turn)
+
+    if future is None:
+        print(f"[TWILIO] Unknown or expired turn {turn}")
+        say_or_play(resp, "Sorry, I lost track of that. Could you say it again?", language="en-US")
+        resp.append(_gather())
         return Response(str(resp), media_type="application/xml")
 
-    in_confirmation_flow = user_id in pending_transfers
-    print(f"[ASSISTANT] in_confirmation_flow={in_confirmation_flow}")
+    result = voice_turns.wait(future, TWILIO_TURN_DEADLINE_SECONDS)
+    if result is None:
+        return _filler(resp, turn, "Still working on it.")
 
-    gather = Gather(
+    voice_turns.release(turn)
+    return _render_turn(resp, BACKEND_USER_ID, *result)
+
+
+def _gather():
+    from twilio.twiml.voice_response import Gather
+
+    partial = {}
+    if TWILIO_SPECULATION:
+        partial = {"partial_result_callback": "/twilio/voice/partial"}
+    return Gather(
         input="speech",
         language="en-US",
         action="/twilio/voice",
         method="POST",
         speech_timeout="auto",
+        **partial,
     )
 
+
+def _filler(resp, turn_id: str, text: str) -> Response:
+    say_or_play(resp, text, language="en-US")
+    resp.redirect(f"/twilio/voice/result?turn={turn_id}", method="POST")
+    return Response(str(resp), media_type="application/xml")
+
+
+def _render_turn(resp, user_id: str, reply: str, intent: Optional[str], end_call: bool) -> Response:
+    print(f"[ASSISTANT] intent={intent}, end_call={end_call}, reply={reply!r}")
+
+    # Fixed replies (e.g. asking to confirm again) may be pre-rendered.
+    say_or_play(resp, reply, language="en-US")
+
+    if end_call:
+        resp.hangup()
+        return Response(str(resp), media_type="application/xml")
+
+    in_confirmation_flow = user_id in pending_transfers
+    print(f"[ASSISTANT] in_confirmation_flow={in_confirmation_flow}")
+
+    gather = _gather()
+
     if not in_confirmation_flow:
         lower_reply = (reply or "").lower()
         if "anything else i can help you with" not in lower_reply:
-            gather.say("You can ask another question.", language="en-US")
+            say_or_play(gather, "You can ask another question.", language="en-US")
 
     resp.append(gather)
 
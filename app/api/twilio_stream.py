@@ -0,0 +1,265 @@
+"""
+Phone calls over Twilio Media Streams: the whole call on one WebSocket.
+
+POST /twilio/voice/stream answers with <Connect><Stream> pointing Twilio at
+/twilio/stream. Twilio then sends the caller's audio as 'media' frames
+(8 kHz mu-law, base64) and plays whatever 'media' frames we send back.
+
+The stream URL ends in the CallSid (/twilio/stream/<CallSid>), so behind
+the multi-worker dispatcher the call lands on the worker that holds the
+caller's conversation state.
+
+Caller audio goes to a streaming recognizer (app/speech.py). Once the
+partial transcript has not changed for STREAM_STABLE_MS of audio, the
+intent classifiers run on it (app/speculation.py), which changes nothing.
+The turn itself starts on the recognizer's final result, since a pause is
+not always the end of the sentence ("yes ... actually no"); it reuses the
+speculation if the final text is the same. The reply is synthesized and sent
+back in chunks followed by a 'mark'; Twilio echoes the mark when playback
+has finished. If the caller starts speaking while a reply is still playing
+(barge-in), a 'clear' message drops the rest of it.
+"""
+
+import asyncio
+import base64
+import json
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import APIRouter, Form, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response
+
+from .. import metrics, speculation, speech, voice_turns
+from ..config import BACKEND_USER_ID, STREAM_STABLE_MS, TWILIO_STREAM_URL
+
+router = APIRouter(prefix="/twilio", tags=["twilio"])
+
+GREETING = "Hi, I am your banking assistant. How can I help you today?"
+ERROR_REPLY = "Sorry, something went wrong. Please say that again."
+
+# Replies are sent in chunks of this many seconds of audio.
+CHUNK_SECONDS = 0.5
+
+
+@router.post("/voice/stream")
+def twilio_voice_stream(request: Request, CallSid: Optional[str] = Form(None)):
+    """TwiML that connects the call to the /twilio/stream/<CallSid> WebSocket."""
+    from twilio.twiml.voice_response import Connect, VoiceResponse
+
+    host = request.headers.get("x-forwarded-host") or request.headers.get("host", "")
+    url = TWILIO_STREAM_URL or f"wss://{host}/twilio/stream"
+    if CallSid:
+        url = f"{url.rstrip('/')}/{CallSid}"
+    resp = VoiceResponse()
+    connect = Connect()
+    connect.stream(url=url)
+    resp.append(connect)
+    return Response(str(resp), media_type="application/xml")
+
+
+@dataclass(eq=False)
+class _Turn:
+    text: str
+    # Turns of one call run in order, each after the previous one.
+    previous: Optional["_Turn"]
+    task: Optional[asyncio.Task] = None
+    # Set once the turn has been handed to voice_turns (process_message).
+    future: Optional[Future] = None
+
+    def cancel(self) -> bool:
+        """Stops the turn if process_message has not started on it yet."""
+        if self.future is not None and not self.future.cancel():
+            return False
+        self.task.cancel()
+        return True
+
+
+class StreamCall:
+    """State of one Media Streams call."""
+
+    def __init__(
+        self,
+        ws: WebSocket,
+        stream_sid: str,
+        call_sid: Optional[str],
+        user_id: str,
+        recognizer: speech.StreamingRecognizer,
+        synthesizer: speech.Synthesizer,
+    ):
+        self.ws = ws
+        self.stream_sid = stream_sid
+        self.call_sid = call_sid
+        self.user_id = user_id
+        self.recognizer = recognizer
+        self.synthesizer = synthesizer
+        self.hung_up = False
+
+        self._send_lock = asyncio.Lock()
+        self._last_turn: Optional[_Turn] = None
+        self._replies = 0
+        # Mark of the reply Twilio is playing, and of the goodbye to hang up after.
+        self._playing: Optional[str] = None
+        self._hangup_after: Optional[str] = None
+
+        # Caller audio received so far (seconds) is the clock for endpointing.
+        self._audio_seconds = 0.0
+        self._partial = ""
+        self._partial_since = 0.0
+        # Partial transcript the classifiers were already started on.
+        self._speculated: Optional[str] = None
+
+    async def _send(self, event: dict) -> None:
+        async with self._send_lock:
+            await self.ws.send_text(json.dumps(event))
+
+    async def start(self) -> None:
+        metrics.incr("twilio_stream.calls")
+        await self._speak(GREETING)
+
+    async def on_audio(self, audio: bytes) -> None:
+        self._audio_seconds += len(audio) / speech.BYTES_PER_SECOND
+        for transcript in self.recognizer.feed(audio):
+            await self._on_transcript(transcript)
+
+        stable_for = self._audio_seconds - self._partial_since
+        if (
+            self._partial
+            and self._partial != self._speculated
+            and stable_for >= STREAM_STABLE_MS / 1000
+        ):
+            self._speculated = self._partial
+            if speculation.speculate(self.call_sid, self.user_id, self._partial):
+                metrics.incr("twilio_stream.early_classifications")
+
+    async def _on_transcript(self, transcript: speech.Transcript) -> None:
+        if transcript.is_final:
+            if transcript.text:
+                self._start_turn(transcript.text)
+            self._partial, self._speculated = "", None
+        elif transcript.text != self._partial:
+            # New words while a reply is playing: the caller is talking over it.
+            if transcript.text and self._playing:
+                await self._barge_in()
+            self._partial, self._partial_since = transcript.text, self._audio_seconds
+
+    async def _barge_in(self) -> None:
+        print(f"[STREAM] barge-in during {self._playing}")
+        metrics.incr("twilio_stream.barge_in")
+        self._playing = None
+        self._hangup_after = None
+        await self._send({"event": "clear", "streamSid": self.stream_sid})
+
+    def _start_turn(self, text: str) -> _Turn:
+        turn = _Turn(text, self._last_turn)
+        turn.task = asyncio.create_task(self._run_turn(turn))
+        self._last_turn = turn
+        return turn
+
+    async def _run_turn(self, turn: _Turn) -> None:
+        previous = turn.previous
+        while previous is not None:
+            await asyncio.gather(previous.task, return_exceptions=True)
+            # A cancelled turn did not run; wait for the one before it.
+            previous = previous.previous if previous.task.cancelled() else None
+
+        print(f"[STREAM] turn: {turn.text!r}")
+        started = time.monotonic()
+        metrics.incr("twilio_stream.turns")
+        turn.future = voice_turns.start(turn.text, self.user_id, self.call_sid)
+        try:
+            reply, _, end_call = await asyncio.wrap_future(turn.future)
+        except Exception as e:
+            print(f"[STREAM] turn failed: {e}")
+            reply, end_call = ERROR_REPLY, False
+        metrics.observe("twilio_stream.turn_seconds", time.monotonic() - started)
+        await self._speak(reply, started, hangup=end_call)
+
+    async def _speak(self, text: str, started: Optional[float] = None, hangup: bool = False) -> None:
+        audio = await asyncio.to_thread(self.synthesizer.synthesize, text)
+        self._replies += 1
+        mark = f"reply-{self._replies}"
+        self._playing = mark
+
+        chunk = int(CHUNK_SECONDS * speech.BYTES_PER_SECOND)
+        for i in range(0, len(audio), chunk):
+            if self._playing != mark:
+                return
+            payload = base64.b64encode(audio[i : i + chunk]).decode("ascii")
+            await self._send(
+                {"event": "media", "streamSid": self.stream_sid, "media": {"payload": payload}}
+            )
+            if i == 0 and started is not None:
+                metrics.observe("twilio_stream.first_audio_seconds", time.monotonic() - started)
+        await self._send({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": mark}})
+        if hangup:
+            self._hangup_after = mark
+
+    async def on_mark(self, name: str) -> None:
+        if name == self._playing:
+            self._playing = None
+        if name == self._hangup_after:
+            print("[STREAM] goodbye played, hanging up")
+            self.hung_up = True
+            await self.ws.close()
+
+    def finish(self) -> None:
+        """
+        Ends the call: nobody would hear the reply of a turn that has not
+        started yet, and it might still confirm a transfer, so such turns
+        and words left in the recognizer are dropped.
+        """
+        turn = self._last_turn
+        while turn is not None:
+            if turn.cancel():
+                print(f"[STREAM] call ended, dropped turn {turn.text!r}")
+            turn = turn.previous
+        for transcript in self.recognizer.close():
+            if transcript.text:
+                print(f"[STREAM] call ended, ignoring {transcript.text!r}")
+
+
+@router.websocket("/stream")
+@router.websocket("/stream/{call_sid}")
+async def twilio_stream(ws: WebSocket, call_sid: Optional[str] = None):
+    await ws.accept()
+    call: Optional[StreamCall] = None
+    try:
+        while call is None or not call.hung_up:
+            message = json.loads(await ws.receive_text())
+            event = message.get("event")
+
+            if event == "start":
+                start = message.get("start") or {}
+                try:
+                    recognizer = speech.make_recognizer()
+                    synthesizer = speech.make_synthesizer()
+                except (ValueError, OSError) as e:
+                    print(f"[STREAM] cannot start: {e}")
+                    await ws.close(code=1011)
+                    return
+                call = StreamCall(
+                    ws,
+                    message.get("streamSid") or start.get("streamSid"),
+                    start.get("callSid") or call_sid,
+                    BACKEND_USER_ID,
+                    recognizer,
+                    synthesizer,
+                )
+                print(f"[STREAM] call {call.call_sid} started (stream {call.stream_sid})")
+                await call.start()
+            elif event == "media" and call is not None:
+                media = message.get("media") or {}
+                if media.get("track", "inbound") == "inbound":
+                    await call.on_audio(base64.b64decode(media.get("payload", "")))
+            elif event == "mark" and call is not None:
+                await call.on_mark((message.get("mark") or {}).get("name"))
+            elif event == "stop":
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if call is not None:
+            call.finish()
+            print(f"[STREAM] call {call.call_sid} ended")
@@ -1,20 +1,33 @@
+import time
+from dataclasses import asdict
 from typing import Optional, Tuple, List
 
 from sqlalchemy.orm import Session
 
-from . import banking
+from . import (
+    admission,
+    banking,
+    dialog_planner,
+    event_log,
+    metrics,
+    prompts,
+    scheduler,
+    speculation,
+    spending,
+    turn_recorder,
+)
 from .llm import (
-    detect_intent,
     ask_llm,
     extract_recipient,
     refers_to_same_amount_as_last_time,
-    detect_confirmation_or_end,
+    llm_available,
 )
+from .amount_parser import SAME_AS_LAST, parse_amount
 from .assistant_utils import (
     conversation_history,
     store_history,
-    extract_amount,
     extract_history_limit,
+    extract_recurrence,
     format_amount_pln,
     pending_transfers,
     PendingTransfer,
@@ -22,11 +35,61 @@ from .assistant_utils import (
 
 
 def process_message(
-    message: str, user_id: str, db: Session
+    message: str, user_id: str, db: Session, call_id: Optional[str] = None
+) -> Tuple[str, Optional[str], bool]:
+    """
+    Runs one assistant turn (see _process_message), reports the
+    LLM input tokens it cost, appends a 'turn' event to the event log
+    (call_id: Twilio CallSid, if any) and records the turn when
+    TURN_RECORD_PATH is set.
+    """
+    started = time.perf_counter()
+    call_token = event_log.current_call.set(call_id)
+    # Answers to a pending transfer's confirmation question go first.
+    admission_tokens = admission.start_turn(user_id, urgent=user_id in pending_transfers)
+    turn = prompts.start_turn()
+    recording = turn_recorder.start(
+        db,
+        user_id,
+        message,
+        conversation_history[user_id],
+        pending_transfers.get(user_id),
+        dialog_planner.current_state(user_id),
+    )
+    result = None
+    try:
+        result = _process_message(message, user_id, db, call_id)
+        return result
+    finally:
+        turn_recorder.finish(recording, result)
+        sent = prompts.end_turn(turn)
+        print(f"[TOKENS] turn total={sum(sent.values())}, per_call={sent}")
+        pending = pending_transfers.get(user_id)
+        reply, intent, end_call = result if result is not None else (None, None, None)
+        event_log.emit(
+            "turn",
+            user_id,
+            message=message,
+            intent=intent,
+            reply=reply,
+            end_call=end_call,
+            error=result is None,
+            pending=asdict(pending) if pending is not None else None,
+            llm_tokens=sum(sent.values()),
+            latency_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+        event_log.current_call.reset(call_token)
+        admission.end_turn(admission_tokens)
+
+
+def _process_message(
+    message: str, user_id: str, db: Session, call_id: Optional[str] = None
 ) -> Tuple[str, Optional[str], bool]:
     """
     Main assistant logic:
-    - intent detection
+    - intent detection (only the classifier calls the dialogue state
+      needs, see dialog_planner; on phone calls possibly already made
+      on the caller's partial speech, see speculation)
     - money transfer (with confirmation steps)
     - balance check
     - transaction history
@@ -36,13 +99,26 @@ def process_message(
     """
     history = conversation_history[user_id]
 
-    dialog_act = detect_confirmation_or_end(message, history)
+    # While the LLM circuit is open every llm.py call is answered by
+    # offline_rules (keyword intents/confirmations, deterministic contact
+    # matching, canned fallback reply) without waiting on the provider.
+    if not llm_available():
+        metrics.incr("assistant.degraded_turns")
+        print("[DEGRADED] LLM unavailable – rule-only turn")
+
+    plan = dialog_planner.TurnPlan(
+        user_id, message, history, speculated=speculation.take(call_id, user_id, message)
+    )
+    # Turns that end mid-transfer set the state again below.
+    dialog_planner.set_state(user_id, dialog_planner.IDLE)
 
-    user = banking.get_user(db, user_id)
-    account = banking.get_account_for_user(db, user_id)
+    user = banking.get_user_snapshot(db, user_id)
+    account = banking.get_account_snapshot(db, user_id)
 
-    if user_id in pending_transfers:
+    if plan.state == dialog_planner.CONFIRMING:
+        dialog_act = plan.dialog_act()
         pending = pending_transfers[user_id]
+        pending_intent = "schedule_transfer" if pending.schedule_rule else "make_transfer"
 
         print(
             f"[PENDING] dialog_act={dialog_act}, "
@@ -56,19 +132,57 @@ def process_message(
                 "Okay, I will not make this transfer. "
                 "Thank you for using our banking assistant. Goodbye."
             )
-            return store_history(user_id, message, reply), "make_transfer", True
+            return store_history(user_id, message, reply), pending_intent, True
 
         if dialog_act == "confirm":
             if pending.confirmation_stage == 1:
                 pending.confirmation_stage = 2
                 amount_text = format_amount_pln(pending.amount)
+                if pending.schedule_rule:
+                    reply = (
+                        f"I will set up a standing order of {amount_text} to "
+                        f"{pending.recipient_name} with title '{pending.title}', "
+                        f"{scheduler.describe_rule(pending.schedule_rule)}. "
+                        "Do you finally confirm this standing order?"
+                    )
+                    print(f"[PENDING] Moved to stage 2 (standing order), reply={reply!r}")
+                    return store_history(user_id, message, reply), pending_intent, False
                 reply = (
                     f"I will execute a transfer of {amount_text} to "
                     f"{pending.recipient_name} with title '{pending.title}'. "
                     "Do you finally confirm this transfer?"
                 )
                 print(f"[PENDING] Moved to stage 2, reply={reply!r}")
-                return store_history(user_id, message, reply), "make_transfer", False
+                return store_history(user_id, message, reply), pending_intent, False
+
+            if pending.confirmation_stage == 2 and pending.schedule_rule:
+                try:
+                    order = scheduler.create_scheduled_transfer(
+                        db,
+                        user_id=pending.user_id,
+                        amount=pending.amount,
+                        recipient_name=pending.recipient_name,
+                        recipient_iban=pending.recipient_iban,
+                        title=pending.title,
+                        rule=pending.schedule_rule,
+                    )
+                except ValueError as e:
+                    reply = str(e)
+                    del pending_transfers[user_id]
+                    print(f"[PENDING] create_scheduled_transfer error: {reply}")
+                    return store_history(user_id, message, reply), pending_intent, False
+                banking.remember_alias(db, user_id, pending.recipient_label, pending.contact_id)
+
+                amount_text = format_amount_pln(pending.amount)
+                reply = (
+                    f"Your standing order of {amount_text} to {pending.recipient_name} "
+                    f"{scheduler.describe_rule(order.rule)} has been set up. "
+                    f"The first transfer will be made on {order.next_run_at:%B} {order.next_run_at.day}. "
+                    "Is there anything else I can help you with?"
+                )
+                print(f"[PENDING] Standing order #{order.id} created, reply={reply!r}")
+                del pending_transfers[user_id]
+                return store_history(user_id, message, reply), pending_intent, False
 
             if pending.confirmation_stage == 2:
                 try:
@@ -86,9 +200,10 @@ def process_message(
                     print(f"[PENDING] perform_transfer error: {reply}")
                     return (
                         store_history(user_id, message, reply),
-                        "make_transfer",
+                        pending_intent,
                         False,
                     )
+                banking.remember_alias(db, user_id, pending.recipient_label, pending.contact_id)
 
                 amount_text = format_amount_pln(pending.amount)
                 reply = (
@@ -99,7 +214,7 @@ def process_message(
                 )
                 print(f"[PENDING] Transfer executed, reply={reply!r}")
                 del pending_transfers[user_id]
-                return store_history(user_id, message, reply), "make_transfer", False
+                return store_history(user_id, message, reply), pending_intent, False
 
         if dialog_act == "reject":
             del pending_transfers[user_id]
@@ -108,16 +223,17 @@ def process_message(
                 "What else would you like to do?"
             )
             print("[PENDING] Transfer rejected by user")
-            return store_history(user_id, message, reply), "make_transfer", False
+            return store_history(user_id, message, reply), pending_intent, False
 
         reply = (
             "Please clearly confirm if you want to make this transfer, "
             "or say that you do not want it."
         )
         print("[PENDING] Unclear confirmation, asking again")
-        return store_history(user_id, message, reply), "make_transfer", False
+        return store_history(user_id, message, reply), pending_intent, False
 
-    intent = detect_intent(message, history)
+    intent = plan.intent()
+    dialog_act = plan.dialog_act(intent)
     print(f"[INTENT] message={message!r}, intent={intent!r}, dialog_act={dialog_act!r}")
 
     if intent == "make_transfer":
@@ -128,12 +244,18 @@ def process_message(
 
         print(f"[MAKE_TRANSFER] user_id={user_id}, message={message!r}")
 
+        schedule_rule = extract_recurrence(message)
+        if schedule_rule:
+            intent = "schedule_transfer"
+            print(f"[MAKE_TRANSFER] standing order requested, rule={schedule_rule!r}")
+
         recipient_label = extract_recipient(message, history)
         print(f"[MAKE_TRANSFER] extracted recipient_label={recipient_label!r}")
 
         if not recipient_label:
             reply = "I didn't understand who the transfer should be sent to. "
             print("[MAKE_TRANSFER] No recipient detected")
+            dialog_planner.set_state(user_id, dialog_planner.AWAITING_RECIPIENT)
             return store_history(user_id, message, reply), intent, False
 
         contact = banking.resolve_contact(db, user_id, recipient_label)
@@ -148,6 +270,7 @@ def process_message(
                 "Please add them as a saved contact in your banking app."
             )
             print("[MAKE_TRANSFER] Contact not resolved")
+            dialog_planner.set_state(user_id, dialog_planner.AWAITING_RECIPIENT)
             return store_history(user_id, message, reply), intent, False
 
         recipient_name = contact.full_name
@@ -155,18 +278,36 @@ def process_message(
         title = contact.default_title or f"Transfer to {contact.full_name}"
         pretty_label = f"{contact.full_name} ({contact.nickname})"
 
-        amount = extract_amount(message)
+        parsed_amount = parse_amount(message)
+        amount = (
+            parsed_amount.resolve(account.balance) if parsed_amount is not None else None
+        )
         used_last_amount = False
         last_title = title
 
-        print(f"[MAKE_TRANSFER] initial parsed amount={amount}")
+        print(f"[MAKE_TRANSFER] parsed amount={parsed_amount}, resolved={amount}")
 
-        if amount is None or amount <= 0:
-            print(
-                "[MAKE_TRANSFER] No valid amount detected, "
-                "checking 'same amount as last time'..."
+        if parsed_amount is not None and parsed_amount.currency not in (
+            None,
+            account.currency,
+        ):
+            reply = (
+                f"I can only send transfers in {account.currency} from this account. "
+                "Please tell me the amount again."
             )
-            same_amt = refers_to_same_amount_as_last_time(message, history)
+            print(f"[MAKE_TRANSFER] Unsupported currency {parsed_amount.currency}")
+            dialog_planner.set_state(user_id, dialog_planner.AWAITING_AMOUNT)
+            return store_history(user_id, message, reply), intent, False
+
+        if amount is None or amount <= 0:
+            if parsed_amount is not None and parsed_amount.kind == SAME_AS_LAST:
+                same_amt = True
+            else:
+                print(
+                    "[MAKE_TRANSFER] No valid amount detected, "
+                    "checking 'same amount as last time'..."
+                )
+                same_amt = refers_to_same_amount_as_last_time(message, history)
             print(f"[MAKE_TRANSFER] refers_to_same_amount_as_last_time={same_amt}")
             if same_amt:
                 last_tx = banking.get_last_transfer_to_contact(
@@ -189,6 +330,7 @@ def process_message(
                 "but I couldn't detect the amount. "
             )
             print("[MAKE_TRANSFER] Still no valid amount, asking user again")
+            dialog_planner.set_state(user_id, dialog_planner.AWAITING_AMOUNT)
             return store_history(user_id, message, reply), intent, False
 
         pending = PendingTransfer(
@@ -199,12 +341,22 @@ def process_message(
             title=title,
             currency=account.currency,
             confirmation_stage=1,
+            schedule_rule=schedule_rule,
+            recipient_label=recipient_label,
+            contact_id=contact.id,
         )
         pending_transfers[user_id] = pending
 
         amount_text = format_amount_pln(amount)
 
-        if used_last_amount:
+        if schedule_rule:
+            first_run = scheduler.next_run(schedule_rule, scheduler.utcnow())
+            reply = (
+                f"You want to transfer {amount_text} to {pretty_label} "
+                f"with title '{title}' {scheduler.describe_rule(schedule_rule)}, "
+                f"starting on {first_run:%B} {first_run.day}. Do you confirm?"
+            )
+        elif used_last_amount:
             reply = (
                 f"Last time you paid {amount_text} to {recipient_name} "
                 f"for '{last_title}'. Do you confirm repeating this transfer?"
@@ -273,6 +425,9 @@ def process_message(
         context += f"User: {user.name}\n"
     if account:
         context += f"Balance: {account.balance:.2f} {account.currency} "
+        summary = spending.spending_context(db, user_id, currency=account.currency)
+        if summary:
+            context += "\n" + summary
 
     print(f"[OTHER] Falling back to LLM, context={context!r}")
     reply = ask_llm(message, context)
@@ -1,7 +1,11 @@
-from typing import Dict, List, Tuple
+import re
+from typing import Dict, List, Optional, Tuple
 from collections import defaultdict
 from dataclasses import dataclass
-import re
+from datetime import datetime, timezone
+
+from .amount_parser import ABSOLUTE, parse_amount, parse_cardinal
+from .prompts import compact_reply
 
 ConversationHistory = Dict[str, List[Tuple[str, str]]]
 conversation_history: ConversationHistory = defaultdict(list)
@@ -11,10 +15,12 @@ def store_history(user_id: str, user_msg: str, reply: str) -> str:
     """
     Stores the last user message and assistant reply
     in the history for a given user. We keep only ~10 turns.
+    Long replies are stored compacted (see prompts.compact_reply);
+    the full reply is returned unchanged.
     """
     history = conversation_history[user_id]
     history.append(("user", user_msg))
-    history.append(("assistant", reply))
+    history.append(("assistant", compact_reply(reply)))
     if len(history) > 20:
         del history[:-20]
     return reply
@@ -22,19 +28,15 @@ def store_history(user_id: str, user_msg: str, reply: str) -> str:
 
 def extract_amount(message: str) -> float:
     """
-    Very simple amount parser from text.
-    Looks for the first number in the text:
-    - 100
-    - 100,50
-    - 100.50
+    Returns the absolute amount mentioned in the utterance
+    ('send 50 PLN', 'two hundred and fifty złoty', '1 000,50'), or 0.0.
+    Relative amounts ('half my balance', 'same as last time') need account
+    context; use amount_parser.parse_amount for those.
     """
-    m = re.search(r"(\d+[,.]?\d*)", message.replace(" ", ""))
-    if not m:
-        return 0.0
-    try:
-        return float(m.group(1).replace(",", "."))
-    except ValueError:
+    parsed = parse_amount(message)
+    if parsed is None or parsed.kind != ABSOLUTE:
         return 0.0
+    return parsed.value
 
 
 def format_amount_pln(amount: float) -> str:
@@ -49,16 +51,11 @@ def format_amount_pln(amount: float) -> str:
 def extract_history_limit(message: str, default: int = 3, max_limit: int = 10) -> int:
     """
     Extracts from the utterance how many last transfers to show.
-    Examples: 'show last 3 transfers', 'give me 5 last transactions'.
+    Examples: 'show last 3 transfers', 'give me five last transactions'.
     If no number found -> default.
     """
-    m = re.search(r"(\d+)", message)
-    if not m:
-        return default
-
-    try:
-        n = int(m.group(1))
-    except ValueError:
+    n = parse_cardinal(message)
+    if n is None:
         return default
 
     if n <= 0:
@@ -67,6 +64,46 @@ def extract_history_limit(message: str, default: int = 3, max_limit: int = 10) -
     return min(n, max_limit)
 
 
+_WEEKDAY_NAMES = ["sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday"]
+_MONTHLY_RE = re.compile(r"\b(every|each) month\b|\bmonthly\b")
+_WEEKLY_RE = re.compile(r"\b(every|each) week\b|\bweekly\b")
+_DAILY_RE = re.compile(r"\b(every|each) day\b|\bdaily\b")
+_WEEKDAY_RE = re.compile(r"\b(every|each|on) (" + "|".join(_WEEKDAY_NAMES) + r")s?\b")
+_DAY_OF_MONTH_RE = re.compile(r"\bon (the |day )?(\d{1,2})(st|nd|rd|th)?\b")
+
+# Hour (UTC) at which standing orders created by voice are executed.
+STANDING_ORDER_HOUR = 9
+
+
+def extract_recurrence(message: str, now: Optional[datetime] = None) -> Optional[str]:
+    """
+    Returns a scheduler rule (see app/scheduler.py) for utterances like
+    'pay the rent every month', 'monthly on the 10th', 'every friday',
+    or None for a one-off transfer.
+    """
+    text = (message or "").lower()
+    now = now or datetime.now(timezone.utc)
+
+    weekday = _WEEKDAY_RE.search(text)
+    if weekday and (weekday.group(1) != "on" or _WEEKLY_RE.search(text)):
+        return f"cron:0 {STANDING_ORDER_HOUR} * * {_WEEKDAY_NAMES.index(weekday.group(2))}"
+
+    if _MONTHLY_RE.search(text):
+        day_match = _DAY_OF_MONTH_RE.search(text)
+        day = int(day_match.group(2)) if day_match else now.day
+        # Days 29-31 do not exist in every month.
+        day = min(max(day, 1), 28)
+        return f"cron:0 {STANDING_ORDER_HOUR} {day} * *"
+
+    if _WEEKLY_RE.search(text):
+        return f"cron:0 {STANDING_ORDER_HOUR} * * {now.isoweekday() % 7}"
+
+    if _DAILY_RE.search(text):
+        return f"cron:0 {STANDING_ORDER_HOUR} * * *"
+
+    return None
+
+
 @dataclass
 class PendingTransfer:
     user_id: str
@@ -76,6 +113,12 @@ class PendingTransfer:
     title: str
     currency: str
     confirmation_stage: int = 0
+    # Scheduler rule when the customer asked for a standing order.
+    schedule_rule: Optional[str] = None
+    # What the customer called the recipient and the contact it resolved to;
+    # remembered as an alias once the transfer is confirmed.
+    recipient_label: Optional[str] = None
+    contact_id: Optional[int] = None
 
 
 pending_transfers: Dict[str, PendingTransfer] = {}
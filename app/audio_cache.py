@@ -0,0 +1,177 @@
+"""
+Pre-rendered audio for the fixed phone prompts.
+
+Twilio synthesizes every <Say> when the call reaches it. The lines that
+never change (greetings, the VoiceAuthenticator prompts, "Please clearly
+confirm ...") are rendered once, offline, with a TTS engine from
+app/speech.py and stored in AUDIO_CACHE_DIR as 8 kHz mu-law WAV files (the
+phone network's own format, so Twilio plays them without transcoding),
+named by a hash of the text:
+
+    python -m app.audio_cache build                  # pyttsx3
+    python -m app.audio_cache build --engine silence # placeholder clips
+    python -m app.audio_cache list
+
+GET /audio/<hash>.wav serves them (ETag, Range) and say_or_play() puts a
+<Play> of the clip into the TwiML where one exists for the exact text, and
+a <Say> otherwise.
+"""
+
+import argparse
+import hashlib
+import json
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from . import speech
+from .config import AUDIO_CACHE_DIR
+from .http_cache import StaticAsset
+
+MANIFEST = "manifest.json"
+
+# Fixed prompts worth pre-rendering. A text that is not listed (or no longer
+# matches exactly) is simply spoken with <Say>.
+STATIC_PROMPTS = (
+    # /twilio/voice
+    "Hi, I am your banking assistant. How can I help you today?",
+    "I didn't hear anything. Goodbye.",
+    "One moment please.",
+    "Still working on it.",
+    "You can ask another question.",
+    "Sorry, I lost track of that. Could you say it again?",
+    "Please clearly confirm if you want to make this transfer, "
+    "or say that you do not want it.",
+    "Okay, I will not make this transfer. What else would you like to do?",
+    # /auth/voice (VoiceAuthenticator)
+    "Welcome. Please say your full name to begin.",
+    "No speech detected. Goodbye.",
+    "Name confirmed. Please say the last four digits of your ID.",
+    "I did not recognize that name. Please repeat your full name.",
+    "ID digits confirmed. Now say your four-digit PIN.",
+    "Those digits do not match our records. Please repeat the last four digits of your ID.",
+    "Incorrect PIN. Please repeat your four-digit PIN.",
+    "Authentication successful. Redirecting you now.",
+    "Authentication failed. Ending session for your security.",
+)
+
+# Clips are revalidated by ETag after this, so a rebuild reaches Twilio's cache.
+CACHE_CONTROL = "public, max-age=3600"
+
+_clips: Dict[str, StaticAsset] = {}
+
+
+def clip_key(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()[:16]
+
+
+def mulaw_wav(audio: bytes) -> bytes:
+    """8 kHz mono mu-law samples in a WAV container (format tag 7)."""
+
+    def chunk(name: bytes, data: bytes) -> bytes:
+        return name + struct.pack("<I", len(data)) + data + b"\0" * (len(data) % 2)
+
+    fmt = struct.pack(
+        "<HHIIHHH", 7, 1, speech.SAMPLE_RATE, speech.BYTES_PER_SECOND, 1, 8, 0
+    )
+    body = (
+        b"WAVE"
+        + chunk(b"fmt ", fmt)
+        + chunk(b"fact", struct.pack("<I", len(audio)))
+        + chunk(b"data", audio)
+    )
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def load(directory: str = AUDIO_CACHE_DIR) -> int:
+    """Makes the clips listed in the directory's manifest available."""
+    _clips.clear()
+    path = Path(directory) / MANIFEST
+    if not path.exists():
+        return 0
+    for key, entry in json.loads(path.read_text(encoding="utf-8")).items():
+        clip = Path(directory) / entry["file"]
+        if clip.exists():
+            _clips[key] = StaticAsset(
+                str(clip), "audio/wav", cache_control=CACHE_CONTROL, compress=False
+            )
+    print(f"[AUDIO] {len(_clips)} pre-rendered prompts in {directory}")
+    return len(_clips)
+
+
+def get(name: str) -> Optional[StaticAsset]:
+    """The clip served as /audio/<name> ('<hash>.wav'), if any."""
+    key, _, ext = name.partition(".")
+    return _clips.get(key) if ext == "wav" else None
+
+
+def clip_url(text: str) -> Optional[str]:
+    key = clip_key(text or "")
+    return f"/audio/{key}.wav" if key in _clips else None
+
+
+def say_or_play(verb, text: str, **say_kwargs) -> None:
+    """Adds <Play> of the pre-rendered clip of `text` to a VoiceResponse /
+    Gather, or <Say> if there is none."""
+    url = clip_url(text)
+    if url is not None:
+        verb.play(url)
+    else:
+        verb.say(text, **say_kwargs)
+
+
+def build(directory: str, engine: str, force: bool = False) -> None:
+    out = Path(directory)
+    out.mkdir(parents=True, exist_ok=True)
+    manifest_path = out / MANIFEST
+    manifest = {}
+    if manifest_path.exists() and not force:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+
+    synthesizer = speech.make_synthesizer(engine)
+    rendered = 0
+    for text in STATIC_PROMPTS:
+        key = clip_key(text)
+        name = f"{key}.wav"
+        if key in manifest and (out / name).exists():
+            continue
+        started = time.perf_counter()
+        data = mulaw_wav(synthesizer.synthesize(text))
+        (out / name).write_bytes(data)
+        manifest[key] = {"file": name, "text": text, "engine": engine}
+        rendered += 1
+        elapsed = time.perf_counter() - started
+        print(f"[AUDIO] {name} {len(data):>7} bytes {elapsed:5.2f}s  {text!r}")
+
+    # Clips of prompts that were removed from STATIC_PROMPTS stay on disk
+    # but are no longer listed.
+    wanted = {clip_key(text) for text in STATIC_PROMPTS}
+    manifest = {key: entry for key, entry in manifest.items() if key in wanted}
+    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    print(f"[AUDIO] rendered {rendered}, {len(manifest)} prompts in {out}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-render fixed phone prompts.")
+    parser.add_argument("--dir", default=AUDIO_CACHE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build")
+    build_cmd.add_argument("--engine", default="pyttsx3", help="TTS engine (see app/speech.py)")
+    build_cmd.add_argument("--force", action="store_true", help="re-render every prompt")
+    sub.add_parser("list")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.dir, args.engine, args.force)
+        return
+
+    path = Path(args.dir) / MANIFEST
+    manifest = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    for text in STATIC_PROMPTS:
+        entry = manifest.get(clip_key(text))
+        print(f"{entry['file'] if entry else '-':<22} {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
-from typing import Optional, Sequence
-
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import insert, select
 
-from .models import User, Account, Transaction, Contact
+from . import event_log, metrics, notifications, singleflight, spending
+from .models import User, Account, Transaction, Contact, ContactAlias
 from .llm import match_contact_label
 
 
@@ -17,16 +24,128 @@ def get_account_for_user(db: Session, user_id: str) -> Optional[Account]:
     return db.execute(stmt).scalar_one_or_none()
 
 
+_reads = singleflight.Group("db")
+
+
+def _shared_row(db: Session, model: Any, column: Any, value: Any) -> Optional[Dict[str, Any]]:
+    """
+    One row as a dict; concurrent identical reads share one query. A caller
+    may get a row read just before another request's commit, so this is
+    only for rows that turns do not change (users), not for balances.
+    """
+    stmt = select(model.__table__).where(column == value)
+    key = (id(db.get_bind()), model.__tablename__, value)
+    return _reads.do(key, lambda: db.execute(stmt).mappings().first())
+
+
+def get_user_snapshot(db: Session, user_id: str) -> Optional[User]:
+    """
+    Detached copy of the user for read-only use (not added to the session).
+    """
+    row = _shared_row(db, User, User.id, user_id)
+    return User(**row) if row is not None else None
+
+
+def get_account_snapshot(db: Session, user_id: str) -> Optional[Account]:
+    """
+    Detached copy of the user's account for read-only use (balance checks,
+    LLM context). Writes must go through get_account_for_user, as
+    perform_transfer does. Read in this session, never shared: the balance
+    must reflect every transfer committed before the turn.
+    """
+    stmt = select(Account.__table__).where(Account.user_id == user_id)
+    row = db.execute(stmt).mappings().first()
+    return Account(**row) if row is not None else None
+
+
+_ALIAS_STRIP_RE = re.compile(r"[^\w\s]")
+
+_alias_lock = threading.Lock()
+_alias_lookups = 0
+_alias_hits = 0
+
+
+def normalize_alias(label: Optional[str]) -> str:
+    """Lowercase, punctuation dropped, whitespace collapsed."""
+    return " ".join(_ALIAS_STRIP_RE.sub(" ", (label or "").lower()).split())
+
+
+def _count_alias_lookup(hit: bool) -> None:
+    global _alias_lookups, _alias_hits
+    with _alias_lock:
+        _alias_lookups += 1
+        _alias_hits += hit
+        rate = _alias_hits / _alias_lookups
+    metrics.incr("contacts.alias_hits" if hit else "contacts.alias_misses")
+    metrics.gauge("contacts.alias_hit_rate", rate)
+
+
+def lookup_alias(db: Session, user_id: str, label: str) -> Optional[Contact]:
+    """The contact a learned alias points to (one indexed lookup), if any."""
+    stmt = (
+        select(Contact)
+        .join(ContactAlias, ContactAlias.contact_id == Contact.id)
+        .where(
+            ContactAlias.user_id == user_id,
+            ContactAlias.alias == normalize_alias(label),
+            Contact.user_id == user_id,
+        )
+    )
+    return db.execute(stmt).scalars().first()
+
+
+def remember_alias(
+    db: Session, user_id: str, label: Optional[str], contact_id: Optional[int]
+) -> None:
+    """
+    Stores `label` as an alias of the contact after a confirmed transfer.
+    Labels that already match the nickname or full name are skipped.
+    Commits on its own; losing a race with another worker is harmless.
+    """
+    alias = normalize_alias(label)
+    if not alias or contact_id is None:
+        return
+    contact = db.get(Contact, contact_id)
+    if contact is None or contact.user_id != user_id:
+        return
+    if alias in (normalize_alias(contact.nickname), normalize_alias(contact.full_name)):
+        return
+
+    stmt = select(ContactAlias).where(
+        ContactAlias.user_id == user_id, ContactAlias.alias == alias
+    )
+    existing = db.execute(stmt).scalar_one_or_none()
+    if existing is not None:
+        if existing.contact_id == contact_id:
+            return
+        existing.contact_id = contact_id
+    else:
+        db.add(ContactAlias(user_id=user_id, alias=alias, contact_id=contact_id))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return
+    print(f"[RESOLVE_CONTACT] Learned alias {alias!r} -> contact #{contact_id}")
+
+
 def resolve_contact(db: Session, user_id: str, label: str) -> Optional[Contact]:
     """
     Uses LLM (match_contact_label) to map a phrase from speech to one of the contacts.
-    If the label exactly matches nickname or full_name (case-insensitive),
-    that contact is chosen without using the LLM.
+    An alias learned from an earlier confirmed transfer (remember_alias) is
+    checked first; if the label exactly matches nickname or full_name
+    (case-insensitive), that contact is chosen without using the LLM.
     """
     label = (label or "").strip()
     if not label:
         return None
 
+    learned = lookup_alias(db, user_id, label)
+    if learned is not None:
+        _count_alias_lookup(True)
+        print(f"[RESOLVE_CONTACT] Alias match for label={label!r} -> {learned.full_name!r}")
+        return learned
+
     stmt = select(Contact).where(Contact.user_id == user_id)
     contacts = db.execute(stmt).scalars().all()
     if not contacts:
@@ -42,6 +161,10 @@ def resolve_contact(db: Session, user_id: str, label: str) -> Optional[Contact]:
             )
             return c
 
+    # Exact matches are never stored as aliases, so only the labels that
+    # get here count towards the alias hit rate.
+    _count_alias_lookup(False)
+
     contact_dicts = [
         {"nickname": c.nickname, "full_name": c.full_name} for c in contacts
     ]
@@ -73,7 +196,9 @@ def perform_transfer(
 ) -> Account:
     """
     Performs a transfer (subtracts balance) and creates a transaction record
-    with full recipient data.
+    with full recipient data. Spending aggregates and the confirmation SMS
+    (outbox row, see app/notifications.py) are written in the same DB
+    transaction.
     """
     account = get_account_for_user(db, user_id)
     if account is None:
@@ -101,13 +226,182 @@ def perform_transfer(
         amount=amount,
     )
     db.add(new_transaction)
+    spending.record_transfer(db, user_id, recipient_name, title, amount)
+    notifications.enqueue(
+        db,
+        user_id,
+        notifications.transfer_confirmation_text(
+            amount, account.currency, recipient_name, title
+        ),
+    )
 
     db.commit()
+    notifications.wake()
     db.refresh(account)
 
+    event_log.emit(
+        "transfer",
+        user_id,
+        amount=amount,
+        currency=account.currency,
+        recipient_name=recipient_name,
+        recipient_iban=recipient_iban,
+        title=title,
+        balance=account.balance,
+    )
+
     return account
 
 
+@dataclass
+class TransferOutcome:
+    index: int
+    ok: bool
+    error: Optional[str] = None
+    balance: Optional[float] = None
+
+
+def _validate_transfer(
+    account: Optional[Account], balance: float, item: Mapping[str, Any]
+) -> Optional[str]:
+    """Same checks, in the same order, as perform_transfer."""
+    amount = item.get("amount") or 0
+    if account is None:
+        return "No account found for this user."
+    if amount <= 0:
+        return "Transfer amount must be positive."
+    if balance < amount:
+        return "Insufficient funds on the account."
+    if not item.get("recipient_name"):
+        return "Recipient name is missing."
+    if not item.get("recipient_iban"):
+        return "Recipient IBAN is missing."
+    return None
+
+
+def perform_transfers(
+    db: Session,
+    transfers: Sequence[Mapping[str, Any]],
+    atomic: bool = False,
+    chunk_size: int = 500,
+    commit: bool = True,
+) -> List[TransferOutcome]:
+    """
+    Batch version of perform_transfer for standing orders and payout runs.
+
+    Each item has the perform_transfer arguments (user_id, amount,
+    recipient_name, recipient_iban, title). Accounts are loaded with one
+    SELECT per chunk of users, items are validated in order against running
+    balances, and all accepted items are written in a single DB transaction:
+    balance updates, one bulk INSERT of transactions, the spending
+    aggregates and the confirmation notifications. With atomic=True nothing
+    is written if any item is rejected.
+
+    Account rows are locked (SELECT ... FOR UPDATE, in user_id order to avoid
+    deadlocks) on databases that support it. With commit=False the caller
+    commits, e.g. together with its own bookkeeping.
+    """
+    user_ids = sorted({item.get("user_id") for item in transfers if item.get("user_id")})
+    accounts: Dict[str, Account] = {}
+    for i in range(0, len(user_ids), chunk_size):
+        stmt = (
+            select(Account)
+            .where(Account.user_id.in_(user_ids[i : i + chunk_size]))
+            .order_by(Account.user_id)
+            .with_for_update()
+        )
+        for account in db.execute(stmt).scalars():
+            accounts[account.user_id] = account
+
+    balances = {user_id: account.balance for user_id, account in accounts.items()}
+    outcomes: List[TransferOutcome] = []
+    accepted: List[Mapping[str, Any]] = []
+
+    for index, item in enumerate(transfers):
+        user_id = item.get("user_id")
+        error = _validate_transfer(accounts.get(user_id), balances.get(user_id, 0.0), item)
+        if error:
+            outcomes.append(TransferOutcome(index=index, ok=False, error=error))
+            continue
+        balances[user_id] -= item["amount"]
+        outcomes.append(TransferOutcome(index=index, ok=True, balance=balances[user_id]))
+        accepted.append(item)
+
+    if not accepted or (atomic and len(accepted) != len(transfers)):
+        if atomic:
+            for outcome in outcomes:
+                if outcome.ok:
+                    outcome.ok, outcome.balance = False, None
+                    outcome.error = "Not executed: another transfer in the batch was rejected."
+        return outcomes
+
+    now = datetime.now(timezone.utc)
+    for user_id in {item["user_id"] for item in accepted}:
+        accounts[user_id].balance = balances[user_id]
+
+    db.execute(
+        insert(Transaction),
+        [
+            {
+                "sender_id": item["user_id"],
+                "recipient_name": item["recipient_name"],
+                "recipient_iban": item["recipient_iban"],
+                "title": item.get("title") or "",
+                "amount": item["amount"],
+                "timestamp": now,
+            }
+            for item in accepted
+        ],
+    )
+
+    deltas: Dict[str, Dict[spending.Bucket, Tuple[float, int]]] = defaultdict(dict)
+    for item in accepted:
+        user_deltas = deltas[item["user_id"]]
+        for bucket in spending.buckets_for(item["recipient_name"], item.get("title"), now):
+            total, count = user_deltas.get(bucket, (0.0, 0))
+            user_deltas[bucket] = (total + item["amount"], count + 1)
+    spending.apply_deltas_many(db, deltas)
+
+    notifications.enqueue_many(
+        db,
+        [
+            notifications.notification_row(
+                item["user_id"],
+                notifications.transfer_confirmation_text(
+                    item["amount"],
+                    accounts[item["user_id"]].currency,
+                    item["recipient_name"],
+                    item.get("title"),
+                ),
+            )
+            for item in accepted
+        ],
+    )
+
+    if commit:
+        db.commit()
+        notifications.wake()
+        _emit_transfer_events(accepted, balances, source="batch")
+    return outcomes
+
+
+def _emit_transfer_events(
+    items: Sequence[Mapping[str, Any]], balances: Mapping[str, float], **extra: Any
+) -> None:
+    """'transfer' audit events for committed batch items."""
+    for item in items:
+        event_log.emit(
+            "transfer",
+            item["user_id"],
+            amount=item["amount"],
+            recipient_name=item["recipient_name"],
+            recipient_iban=item["recipient_iban"],
+            title=item.get("title"),
+            balance=balances.get(item["user_id"]),
+            **extra,
+        )
+
+
 def get_transactions_for_user(
     db: Session,
     user_id: str,
@@ -129,6 +423,37 @@ def get_transactions_for_user(
     return db.execute(stmt).scalars().all()
 
 
+def get_transaction_rows_for_user(
+    db: Session,
+    user_id: str,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Same query as get_transactions_for_user, but selects plain columns and
+    returns dicts, skipping ORM object construction and the identity map.
+    Meant for read-only bulk responses.
+    """
+    t = Transaction.__table__.c
+    stmt = (
+        select(
+            t.id,
+            t.sender_id,
+            t.recipient_name,
+            t.recipient_iban,
+            t.title,
+            t.amount,
+            t.timestamp,
+        )
+        .where(t.sender_id == user_id)
+        .order_by(t.timestamp.desc())
+    )
+
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+
 def get_last_transfer_to_contact(
     db: Session,
     user_id: str,
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, TypeVar
+
+from . import metrics
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the upstream while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker for calls to a slow or flaky upstream.
+
+    - CLOSED: calls go through; the outcome of the last `window` calls is kept.
+      A call counts as failed if it raised or took longer than
+      `slow_call_seconds` (callers with slower calls pass their own). Once at least `min_calls` are recorded and the
+      failed share reaches `failure_rate`, the circuit opens.
+    - OPEN: calls are rejected immediately with CircuitOpenError.
+      After `open_seconds` the circuit goes half-open.
+    - HALF_OPEN: at most `half_open_probes` calls run at a time as probes.
+      That many successful probes close the circuit; any failed probe
+      opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 3.0,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 2,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, state: str) -> None:
+        print(f"[BREAKER] {self.name}: {self._state} -> {state}")
+        metrics.incr(f"breaker.{self.name}.{state}")
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state in (HALF_OPEN, CLOSED):
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if state == CLOSED:
+            self._outcomes.clear()
+
+    def _before_call(self) -> bool:
+        """Returns True if the call is a half-open probe."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == OPEN:
+                metrics.incr(f"breaker.{self.name}.rejected")
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            if self._state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    metrics.incr(f"breaker.{self.name}.rejected")
+                    raise CircuitOpenError(f"{self.name} circuit is half-open")
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def _record(self, ok: bool, probe: bool) -> None:
+        with self._lock:
+            if probe and self._state == HALF_OPEN:
+                self._probes_in_flight -= 1
+                if not ok:
+                    self._transition(OPEN)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._transition(CLOSED)
+                return
+
+            if self._state != CLOSED:
+                return
+
+            self._outcomes.append(ok)
+            if len(self._outcomes) >= self.min_calls:
+                failed = self._outcomes.count(False) / len(self._outcomes)
+                if failed >= self.failure_rate:
+                    self._transition(OPEN)
+
+    def call(
+        self,
+        fn: Callable[..., T],
+        *args,
+        slow_call_seconds: Optional[float] = None,
+        **kwargs,
+    ) -> T:
+        if slow_call_seconds is None:
+            slow_call_seconds = self.slow_call_seconds
+        probe = self._before_call()
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self._record(False, probe)
+            raise
+        elapsed = time.monotonic() - started
+        if elapsed > slow_call_seconds:
+            metrics.incr(f"breaker.{self.name}.slow_calls")
+        self._record(elapsed <= slow_call_seconds, probe)
+        return result
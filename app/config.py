@@ -1,14 +1,117 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+# LLM upstream: per-request timeout and SDK retries.
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+# Circuit breaker: calls slower than this count as failures; once open,
+# the breaker waits this long before probing the upstream again.
+LLM_SLOW_CALL_SECONDS = float(os.getenv("LLM_SLOW_CALL_SECONDS", "3"))
+LLM_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+# Force the rule-only degraded mode (no LLM calls at all).
+LLM_OFFLINE = os.getenv("LLM_OFFLINE", "false").lower() in ("1", "true", "yes")
+# Micro-batching of short classifier calls across concurrent turns (see
+# llm.MicroBatcher): collection window in milliseconds (0 = off) and the
+# largest number of items packed into one completion.
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "0"))
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "16"))
+# Admission control (app/admission.py): the provider's requests / tokens per
+# minute (0 = no limit), how many LLM calls one user may have in flight
+# (0 = no cap), and how long a call may queue before it falls back to rules.
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "0"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "0"))
+LLM_PER_USER_CONCURRENCY = int(os.getenv("LLM_PER_USER_CONCURRENCY", "0"))
+LLM_ADMISSION_TIMEOUT_SECONDS = float(os.getenv("LLM_ADMISSION_TIMEOUT_SECONDS", "5"))
+# Per-function model / timeout / max_tokens overrides as JSON (see
+# app/model_router.py), and whether to pick among a function's candidate
+# models by measured latency and error rate.
+LLM_ROUTES = os.getenv("LLM_ROUTES", "")
+LLM_ROUTING_ADAPTIVE = os.getenv("LLM_ROUTING_ADAPTIVE", "false").lower() in ("1", "true", "yes")
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
+# Create the schema and seed demo data on app startup (dev convenience).
+# In production run `python -m app.seed` once instead.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_API_KEY = os.getenv("TWILIO_API_KEY")
 TWILIO_API_SECRET = os.getenv("TWILIO_API_SECRET")
 TWIML_APP_SID = os.getenv("TWIML_APP_SID")
 
+# Validated once at import; /twilio/token only checks this flag.
+TWILIO_VOICE_CONFIGURED = all(
+    [TWILIO_ACCOUNT_SID, TWILIO_API_KEY, TWILIO_API_SECRET, TWIML_APP_SID]
+)
+
+# Voice SDK access tokens: lifetime, and how long before expiry a cached
+# token is replaced by a fresh one (seconds).
+TWILIO_TOKEN_TTL = int(os.getenv("TWILIO_TOKEN_TTL", "3600"))
+TWILIO_TOKEN_REFRESH_MARGIN = int(os.getenv("TWILIO_TOKEN_REFRESH_MARGIN", "300"))
+
+# /twilio/voice answers with a filler + <Redirect> if the assistant has not
+# replied within this many seconds (Twilio gives up on slow webhooks); the
+# turn keeps running and its reply is served on the redirect.
+TWILIO_TURN_DEADLINE_SECONDS = float(os.getenv("TWILIO_TURN_DEADLINE_SECONDS", "2.5"))
+
+# Have Twilio post partial speech results (/twilio/voice/partial) and run
+# the intent classifiers on them before the caller has finished speaking
+# (see app/speculation.py). Costs extra LLM calls when the speculation misses.
+TWILIO_SPECULATION = os.getenv("TWILIO_SPECULATION", "false").lower() in ("1", "true", "yes")
+
+# Media Streams calls (/twilio/voice/stream + /twilio/stream, see
+# app/speech.py): streaming ASR and TTS engines ('<name>' or '<name>:<arg>'),
+# how long a partial transcript must stay unchanged (ms of caller audio)
+# before the intent classifiers run on it (the turn itself waits for the
+# final transcript), and the public
+# wss:// URL of /twilio/stream (derived from the request's Host if unset;
+# the call's CallSid is appended).
+STREAM_ASR = os.getenv("STREAM_ASR", "")
+STREAM_TTS = os.getenv("STREAM_TTS", "silence")
+STREAM_STABLE_MS = float(os.getenv("STREAM_STABLE_MS", "400"))
+TWILIO_STREAM_URL = os.getenv("TWILIO_STREAM_URL")
+
+# Scheduled transfers worker (python -m app.scheduler): how often to look
+# for due items, how many to claim at once, and how long a claim is held
+# before another worker may take the items over.
+SCHEDULER_POLL_SECONDS = float(os.getenv("SCHEDULER_POLL_SECONDS", "5"))
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "200"))
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "60"))
+
+# Outbound notifications (app/notifications.py). NOTIFY_SENDER: 'log',
+# 'file:<path>' (NDJSON, for tests) or 'twilio' (SMS from TWILIO_SMS_FROM).
+NOTIFY_SENDER = os.getenv("NOTIFY_SENDER", "log")
+NOTIFY_DISPATCHER = os.getenv("NOTIFY_DISPATCHER", "true").lower() in ("1", "true", "yes")
+NOTIFY_POLL_SECONDS = float(os.getenv("NOTIFY_POLL_SECONDS", "1"))
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "100"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_SMS_FROM = os.getenv("TWILIO_SMS_FROM")
+
+# Append-only audit log of turns and transfers (app/event_log.py), a
+# separate SQLite file written by a background thread. Off unless a path
+# is configured.
+EVENT_LOG_PATH = os.getenv("EVENT_LOG_PATH", "")
+
 BACKEND_USER_ID = os.getenv("BACKEND_USER_ID", "user-1")
+
+# Landing page: a filesystem path or 'resource:<package>/<name>'.
+INDEX_HTML_PATH = os.getenv(
+    "INDEX_HTML_PATH", str(Path(__file__).resolve().parent.parent / "index.html")
+)
+# Dev mode: reload index.html when the file changes.
+INDEX_HTML_WATCH = os.getenv("INDEX_HTML_WATCH", "false").lower() in ("1", "true", "yes")
+
+# Pre-rendered audio for fixed phone prompts (python -m app.audio_cache
+# build), served under /audio/ and played instead of <Say> when present.
+AUDIO_CACHE_DIR = os.getenv(
+    "AUDIO_CACHE_DIR", str(Path(__file__).resolve().parent.parent / "audio_cache")
+)
+
+# Append every assistant turn to this NDJSON file for offline replay
+# (python -m app.replay). Disabled when empty.
+TURN_RECORD_PATH = os.getenv("TURN_RECORD_PATH", "")
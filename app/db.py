@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from .config import DATABASE_URL
@@ -19,3 +19,25 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def is_migrated() -> bool:
+    """
+    Fast "already migrated" check: a single catalog query that verifies
+    every mapped table exists.
+    """
+    from . import models  # noqa: F401  (registers tables on Base.metadata)
+
+    existing = set(inspect(engine).get_table_names())
+    return all(name in existing for name in Base.metadata.tables)
+
+
+def init_db() -> bool:
+    """
+    Creates the schema if it is missing.
+    Returns True if anything had to be created.
+    """
+    if is_migrated():
+        return False
+    Base.metadata.create_all(bind=engine)
+    return True
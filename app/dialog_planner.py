@@ -0,0 +1,149 @@
+"""
+Dialogue states and the classifier calls each of them needs.
+
+Every turn starts in one state:
+  - confirming          a transfer is waiting for the customer's yes / no
+  - awaiting_amount     the last reply asked for the transfer amount again
+  - awaiting_recipient  the last reply could not tell who to send money to
+  - idle                anything else
+
+PLANS says, per state, when the two classifiers run:
+  - detect_confirmation_or_end: ALWAYS, or UNLESS_TRANSFER (outside a
+    pending transfer only 'end_call' is used, and the transfer branch never
+    reads it, so it runs after detect_intent and only for other intents)
+  - detect_intent: ALWAYS, NEVER (the pending-transfer branch decides on the
+    dialog act alone), or UNLESS_AMOUNT (a short amount-only answer to
+    "how much?" continues the transfer)
+
+TurnPlan evaluates the classifiers lazily under these rules and counts the
+calls it skipped per state (planner.<state>.saved_calls in /metrics). It
+can also be handed the results of a speculative run on the same words
+(app/speculation.py), which are then used instead of calling the LLM.
+"""
+
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from . import metrics, offline_rules
+from .amount_parser import parse_amount
+from .assistant_utils import pending_transfers
+from .llm import detect_confirmation_or_end, detect_intent
+
+IDLE = "idle"
+CONFIRMING = "confirming"
+AWAITING_AMOUNT = "awaiting_amount"
+AWAITING_RECIPIENT = "awaiting_recipient"
+
+ALWAYS = "always"
+NEVER = "never"
+UNLESS_TRANSFER = "unless_transfer"
+UNLESS_AMOUNT = "unless_amount"
+
+# An amount-only answer is short, e.g. "fifty", "make it 120 zloty please".
+MAX_AMOUNT_ONLY_WORDS = 6
+
+
+@dataclass(frozen=True)
+class StatePlan:
+    dialog_act: str
+    intent: str
+
+
+PLANS: Dict[str, StatePlan] = {
+    CONFIRMING: StatePlan(dialog_act=ALWAYS, intent=NEVER),
+    AWAITING_AMOUNT: StatePlan(dialog_act=UNLESS_TRANSFER, intent=UNLESS_AMOUNT),
+    AWAITING_RECIPIENT: StatePlan(dialog_act=UNLESS_TRANSFER, intent=ALWAYS),
+    IDLE: StatePlan(dialog_act=UNLESS_TRANSFER, intent=ALWAYS),
+}
+
+# State left behind by the previous turn (confirming is derived from
+# pending_transfers); missing means idle.
+dialog_states: Dict[str, str] = {}
+
+
+def current_state(user_id: str) -> str:
+    if user_id in pending_transfers:
+        return CONFIRMING
+    return dialog_states.get(user_id, IDLE)
+
+
+def set_state(user_id: str, state: str) -> None:
+    if state == IDLE:
+        dialog_states.pop(user_id, None)
+    else:
+        dialog_states[user_id] = state
+
+
+def is_amount_only(message: str) -> bool:
+    """True for a short utterance that names an amount and nothing else we act on."""
+    if len((message or "").split()) > MAX_AMOUNT_ONLY_WORDS:
+        return False
+    if parse_amount(message) is None:
+        return False
+    return offline_rules.rule_intent(message) in ("make_transfer", "other")
+
+
+class TurnPlan:
+    def __init__(
+        self,
+        user_id: str,
+        message: str,
+        history: Optional[List[Tuple[str, str]]],
+        speculated: Optional[Future] = None,
+        speculative: bool = False,
+    ):
+        self.message = message
+        self.history = history
+        self.state = current_state(user_id)
+        self.plan = PLANS[self.state]
+        # Classifier results of this plan, by llm.py function name.
+        self.results: Dict[str, str] = {}
+        self._speculated = speculated
+        self._speculative = speculative
+        if not speculative:
+            metrics.incr(f"planner.{self.state}.turns")
+
+    def _skip(self, fn_name: str) -> None:
+        if self._speculative:
+            return
+        metrics.incr(f"planner.{self.state}.saved_calls")
+        print(f"[PLANNER] state={self.state}: skipped {fn_name}")
+
+    def _classify(self, fn_name: str, fn) -> str:
+        if self._speculated is not None:
+            try:
+                speculated = self._speculated.result()
+            except Exception as e:
+                print(f"[PLANNER] speculation failed, classifying again: {e}")
+                speculated = {}
+            if fn_name in speculated:
+                metrics.incr("speculation.saved_calls")
+                self.results[fn_name] = speculated[fn_name]
+                return speculated[fn_name]
+        self.results[fn_name] = fn(self.message, self.history)
+        return self.results[fn_name]
+
+    def dialog_act(self, intent: Optional[str] = None) -> str:
+        rule = self.plan.dialog_act
+        if rule == NEVER or (rule == UNLESS_TRANSFER and intent == "make_transfer"):
+            self._skip("detect_confirmation_or_end")
+            return "none"
+        return self._classify("detect_confirmation_or_end", detect_confirmation_or_end)
+
+    def intent(self) -> str:
+        rule = self.plan.intent
+        if rule == NEVER:
+            raise RuntimeError(f"state {self.state} does not classify intents")
+        if rule == UNLESS_AMOUNT and is_amount_only(self.message):
+            self._skip("detect_intent")
+            return "make_transfer"
+        return self._classify("detect_intent", detect_intent)
+
+    def classify(self) -> Dict[str, str]:
+        """Runs every classifier the turn will need, as process_message would."""
+        if self.plan.intent == NEVER:
+            self.dialog_act()
+        else:
+            self.dialog_act(self.intent())
+        return self.results
@@ -0,0 +1,211 @@
+"""
+Sticky request dispatcher for the multi-worker mode (see app/serve.py).
+
+Conversation state (pending transfers, history, voice-auth steps) lives in
+the memory of the worker process that handled the call, so every webhook of
+one call must reach the same worker. Twilio sends the CallSid with every
+webhook of a call, so the dispatcher hashes it to pick the worker:
+
+  - form posts (Twilio webhooks)  -> CallSid
+  - JSON bodies (/assistant/chat) -> user_id
+  - Media Streams WebSockets       -> CallSid (/twilio/stream/<CallSid>)
+  - anything else                  -> the request path
+
+The dispatcher is a plain ASGI app that forwards requests over HTTP to the
+worker processes listening on local ports. WebSocket connections are
+relayed message by message to the worker picked the same way, so a Media
+Streams call reaches the worker that answered its /twilio/voice/stream
+webhook and keeps the caller's conversation state.
+"""
+
+import asyncio
+import json
+import zlib
+from typing import List, Optional
+from urllib.parse import parse_qs
+
+import httpx
+
+# Hop-by-hop headers are not forwarded (RFC 9110, section 7.6.1).
+HOP_BY_HOP = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+    "host",
+    "content-length",
+}
+
+
+# Media Streams WebSocket paths end in the call's CallSid.
+STREAM_PATH_PREFIX = "/twilio/stream/"
+
+
+def affinity_key(path: str, query: bytes, content_type: str, body: bytes) -> str:
+    """Returns the value that decides which worker handles the request."""
+    params = parse_qs(query.decode("latin-1"))
+    if "CallSid" in params:
+        return params["CallSid"][0]
+
+    if path.startswith(STREAM_PATH_PREFIX) and path[len(STREAM_PATH_PREFIX):]:
+        return path[len(STREAM_PATH_PREFIX):]
+
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        form = parse_qs(body.decode("utf-8", "replace"))
+        if "CallSid" in form:
+            return form["CallSid"][0]
+
+    if content_type.startswith("application/json") and body:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and data.get("user_id"):
+            return str(data["user_id"])
+
+    return path
+
+
+def pick_worker(key: str, workers: int) -> int:
+    return zlib.crc32(key.encode("utf-8")) % workers
+
+
+class StickyDispatcher:
+    def __init__(self, backends: List[str], timeout: float = 30.0):
+        if not backends:
+            raise ValueError("At least one backend is required.")
+        self.backends = backends
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._client = httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=None, max_keepalive_connections=256),
+                )
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._client is not None:
+                    await self._client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+
+        headers = [
+            (k.decode("latin-1"), v.decode("latin-1"))
+            for k, v in scope["headers"]
+            if k.decode("latin-1").lower() not in HOP_BY_HOP
+        ]
+        content_type = next((v for k, v in headers if k.lower() == "content-type"), "")
+        client_host = (scope.get("client") or ("", 0))[0]
+        headers.append(("x-forwarded-for", client_host))
+        host = next((v for k, v in scope["headers"] if k == b"host"), b"")
+        if host:
+            headers.append(("x-forwarded-host", host.decode("latin-1")))
+
+        query = scope.get("query_string", b"")
+        key = affinity_key(scope["path"], query, content_type, body)
+        backend = self.backends[pick_worker(key, len(self.backends))]
+
+        url = backend + scope.get("raw_path", scope["path"].encode()).decode("latin-1")
+        if query:
+            url += "?" + query.decode("latin-1")
+
+        request = self._client.build_request(scope["method"], url, headers=headers, content=body)
+        try:
+            response = await self._client.send(request, stream=True)
+        except httpx.HTTPError as e:
+            print(f"[DISPATCH] backend {backend} failed: {e}")
+            await send({"type": "http.response.start", "status": 502, "headers": []})
+            await send({"type": "http.response.body", "body": b"Bad gateway"})
+            return
+
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": response.status_code,
+                    "headers": [
+                        (k.encode("latin-1"), v.encode("latin-1"))
+                        for k, v in response.headers.multi_items()
+                        if k.lower() not in HOP_BY_HOP - {"content-length"}
+                    ],
+                }
+            )
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await response.aclose()
+
+    async def _websocket(self, scope, receive, send) -> None:
+        import websockets
+
+        query = scope.get("query_string", b"")
+        key = affinity_key(scope["path"], query, "", b"")
+        backend = self.backends[pick_worker(key, len(self.backends))]
+        url = "ws" + backend[len("http"):] + scope["path"]
+        if query:
+            url += "?" + query.decode("latin-1")
+
+        if (await receive())["type"] != "websocket.connect":
+            return
+        try:
+            upstream = await websockets.connect(url, max_size=None)
+        except (OSError, websockets.WebSocketException) as e:
+            print(f"[DISPATCH] backend {backend} failed: {e}")
+            await send({"type": "websocket.close", "code": 1011})
+            return
+        await send({"type": "websocket.accept"})
+
+        async def client_to_backend() -> None:
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                data = message.get("text")
+                await upstream.send(data if data is not None else message.get("bytes", b""))
+
+        async def backend_to_client() -> None:
+            try:
+                async for data in upstream:
+                    key = "text" if isinstance(data, str) else "bytes"
+                    await send({"type": "websocket.send", key: data})
+            except websockets.ConnectionClosed:
+                pass
+            await send({"type": "websocket.close", "code": upstream.close_code or 1000})
+
+        tasks = [
+            asyncio.ensure_future(client_to_backend()),
+            asyncio.ensure_future(backend_to_client()),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await upstream.close()
@@ -0,0 +1,312 @@
+"""
+Append-only audit log of assistant turns and transfers.
+
+process_message, perform_transfer(s) and the standing-order flow call
+emit(), which only puts the event on an in-memory queue. A background
+thread writes queued events in batches (one SQLite transaction per batch)
+to a separate database file (EVENT_LOG_PATH; no log when it is unset), so
+the voice turn never waits for disk I/O.
+
+The `events` table is indexed by user and by call, UPDATE/DELETE are
+refused by triggers, and every row carries a SHA-256 hash chained to the
+previous row, so edits made behind the triggers' back show up in
+`verify`. Several processes can append to the same file: the chain head
+is read inside each batch's write transaction.
+
+Usage:
+    python -m app.event_log query --user user-1 --type turn --limit 20
+    python -m app.event_log query --call CA123 --since 2025-01-01
+    python -m app.event_log verify
+"""
+
+import argparse
+import atexit
+import contextvars
+import hashlib
+import json
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import metrics
+from .config import EVENT_LOG_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT NOT NULL,
+    type TEXT NOT NULL,
+    user_id TEXT,
+    call_id TEXT,
+    data TEXT NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_events_user ON events (user_id, ts);
+CREATE INDEX IF NOT EXISTS ix_events_call ON events (call_id, ts);
+CREATE TRIGGER IF NOT EXISTS events_no_update BEFORE UPDATE ON events
+BEGIN SELECT RAISE(ABORT, 'events are append-only'); END;
+CREATE TRIGGER IF NOT EXISTS events_no_delete BEFORE DELETE ON events
+BEGIN SELECT RAISE(ABORT, 'events are append-only'); END;
+"""
+
+GENESIS_HASH = "0" * 64
+
+current_call: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "event_log_call", default=None
+)
+
+_disabled = False
+_writer: Optional["EventLogWriter"] = None
+_writer_lock = threading.Lock()
+_STOP = object()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _row_hash(prev: str, ts: str, type_: str, user_id, call_id, data: str) -> str:
+    payload = "\x1f".join([prev, ts, type_, user_id or "", call_id or "", data])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EventLogWriter:
+    """Background thread group-committing queued events to SQLite."""
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 1000,
+        flush_interval: float = 0.2,
+        max_queue: int = 100_000,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, event: Tuple) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            metrics.incr("event_log.dropped")
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """Blocks until everything emitted so far is written."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout: float = 10.0) -> None:
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        conn = _connect(self.path)
+        stopping = False
+        while not stopping:
+            batch: List[Tuple] = []
+            waiters: List[threading.Event] = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stopping or waiters or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write(conn, batch)
+                except Exception as e:
+                    metrics.incr("event_log.write_errors")
+                    print(f"[EVENT_LOG] failed to write {len(batch)} events: {e}")
+            for waiter in waiters:
+                waiter.set()
+        conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: List[Tuple]) -> None:
+        started = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT hash FROM events ORDER BY id DESC LIMIT 1").fetchone()
+            prev = row[0] if row else GENESIS_HASH
+            rows = []
+            for ts, type_, user_id, call_id, data in batch:
+                text = json.dumps(data, ensure_ascii=False, default=str, sort_keys=True)
+                prev = _row_hash(prev, ts, type_, user_id, call_id, text)
+                rows.append((ts, type_, user_id, call_id, text, prev))
+            conn.executemany(
+                "INSERT INTO events (ts, type, user_id, call_id, data, hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        metrics.incr("event_log.written", len(batch))
+        metrics.observe("event_log.batch_seconds", time.perf_counter() - started)
+
+
+def enabled() -> bool:
+    return bool(EVENT_LOG_PATH) and not _disabled
+
+
+def disable() -> None:
+    """Turns emit() into a no-op (offline replays, benchmarks)."""
+    global _disabled
+    _disabled = True
+
+
+def get_writer() -> "EventLogWriter":
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = EventLogWriter(EVENT_LOG_PATH)
+                atexit.register(close)
+    return _writer
+
+
+def emit(type_: str, user_id: Optional[str] = None, **data: Any) -> None:
+    """
+    Queues one event; never blocks. The call id is taken from the current
+    turn (see process_message). `data` is serialized on the writer thread,
+    so pass values that are not mutated afterwards.
+    """
+    if not enabled():
+        return
+    ts = datetime.now(timezone.utc).isoformat(timespec="microseconds")
+    get_writer().emit((ts, type_, user_id, current_call.get(), data))
+
+
+def flush() -> None:
+    if _writer is not None:
+        _writer.flush()
+
+
+def close() -> None:
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+
+def query(
+    path: str = EVENT_LOG_PATH,
+    user_id: Optional[str] = None,
+    call_id: Optional[str] = None,
+    type_: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """Events matching all given filters, oldest first (the last `limit`)."""
+    clauses, params = [], []
+    for column, value in (("user_id", user_id), ("call_id", call_id), ("type", type_)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until:
+        clauses.append("ts < ?")
+        params.append(until)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    conn = _connect(path)
+    try:
+        rows = conn.execute(
+            f"SELECT id, ts, type, user_id, call_id, data FROM events {where} "
+            "ORDER BY ts DESC, id DESC LIMIT ?",
+            [*params, limit],
+        ).fetchall()
+    finally:
+        conn.close()
+
+    return [
+        {
+            "id": id_,
+            "ts": ts,
+            "type": type_,
+            "user_id": user_id,
+            "call_id": call_id,
+            "data": json.loads(data),
+        }
+        for id_, ts, type_, user_id, call_id, data in reversed(rows)
+    ]
+
+
+def verify(path: str = EVENT_LOG_PATH) -> Tuple[int, Optional[int]]:
+    """Recomputes the hash chain; returns (events checked, first bad id or None)."""
+    conn = _connect(path)
+    try:
+        prev = GENESIS_HASH
+        count = 0
+        for id_, ts, type_, user_id, call_id, data, stored in conn.execute(
+            "SELECT id, ts, type, user_id, call_id, data, hash FROM events ORDER BY id"
+        ):
+            prev = _row_hash(prev, ts, type_, user_id, call_id, data)
+            if prev != stored:
+                return count, id_
+            count += 1
+        return count, None
+    finally:
+        conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Query the assistant event log.")
+    parser.add_argument("--path", default=EVENT_LOG_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    q = sub.add_parser("query", help="print matching events as NDJSON")
+    q.add_argument("--user")
+    q.add_argument("--call")
+    q.add_argument("--type")
+    q.add_argument("--since", help="ISO timestamp (UTC), inclusive")
+    q.add_argument("--until", help="ISO timestamp (UTC), exclusive")
+    q.add_argument("--limit", type=int, default=100)
+
+    sub.add_parser("verify", help="check the hash chain")
+    args = parser.parse_args(argv)
+    if not args.path:
+        parser.error("set EVENT_LOG_PATH or pass --path")
+
+    if args.command == "query":
+        for event in query(
+            args.path, args.user, args.call, args.type, args.since, args.until, args.limit
+        ):
+            print(json.dumps(event, ensure_ascii=False))
+        return
+
+    count, bad = verify(args.path)
+    if bad is None:
+        print(f"[EVENT_LOG] OK: {count} events, hash chain intact")
+    else:
+        print(f"[EVENT_LOG] hash chain broken at event id {bad} (after {count} good events)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
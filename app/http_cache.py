@@ -0,0 +1,248 @@
+import gzip
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from importlib import resources
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli  # optional dependency
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
+
+def make_etag(data: bytes) -> str:
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """
+    Evaluates If-None-Match / If-Modified-Since against the current version.
+    If-None-Match wins when both are present (RFC 9110).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        wanted = etag.strip('"')
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            # Encoded variants carry a suffix ("<hash>-gz"), all share the hash.
+            if candidate.strip('"').split("-")[0] == wanted:
+                return True
+        return False
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= int(since)
+
+    return False
+
+
+def pick_encoding(accept_encoding: str, available: Dict[str, bytes]) -> Optional[str]:
+    """
+    Chooses 'br' or 'gzip' from the Accept-Encoding header, or None for identity.
+    Codings with q=0 are treated as refused.
+    """
+    accepted: Dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        if not part.strip():
+            continue
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+
+    for encoding in ("br", "gzip"):
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if encoding in available and q > 0:
+            return encoding
+    return None
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte (inclusive) of a single 'bytes=' range, or None to
+    serve the whole body (no Range header, or one we ignore: other units,
+    several ranges, syntax errors). Raises RangeNotSatisfiable when the
+    range lies outside the body.
+    """
+    header = (header or "").strip()
+    if not header.lower().startswith("bytes="):
+        return None
+    first, sep, last = header[len("bytes="):].strip().partition("-")
+    if not sep or "," in last:
+        return None
+    try:
+        start = int(first) if first else None
+        end = int(last) if last else None
+    except ValueError:
+        return None
+
+    if start is None:
+        # Suffix range: the last `end` bytes.
+        if not end or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - end, 0), size - 1
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+@dataclass
+class _Snapshot:
+    body: bytes
+    etag: str
+    mtime: float
+    variants: Dict[str, bytes]
+
+
+class StaticAsset:
+    """
+    A small file served from memory.
+
+    The file is read once, hashed for an ETag and pre-compressed with gzip
+    (and brotli when the `brotli` package is installed; `compress=False` for
+    already compressed media). Conditional requests get a 304 and no body,
+    and single byte ranges of the uncompressed body a 206 (If-Range is
+    honoured). With `watch=True` (dev mode) the file's mtime is
+    re-checked at most every `check_interval` seconds and the cache is
+    rebuilt when it changes.
+
+    `source` is either a filesystem path or 'resource:<package>/<name>'
+    for a file shipped inside a Python package.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        media_type: str,
+        watch: bool = False,
+        check_interval: float = 1.0,
+        cache_control: str = "no-cache",
+        compress: bool = True,
+    ):
+        self.source = source
+        self.media_type = media_type
+        self.watch = watch
+        self.check_interval = check_interval
+        self.cache_control = cache_control
+        self.compress = compress
+        self._snapshot: Optional[_Snapshot] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _read(self) -> _Snapshot:
+        if self.source.startswith("resource:"):
+            package, _, name = self.source[len("resource:"):].partition("/")
+            data = resources.files(package).joinpath(name).read_bytes()
+            mtime = time.time()
+        else:
+            path = Path(self.source)
+            data = path.read_bytes()
+            mtime = path.stat().st_mtime
+
+        variants = {}
+        if self.compress:
+            variants["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                variants["br"] = brotli.compress(data)
+
+        print(f"[STATIC] Loaded {self.source} ({len(data)} bytes)")
+        return _Snapshot(body=data, etag=make_etag(data), mtime=mtime, variants=variants)
+
+    def _stale(self) -> bool:
+        if not self.watch or self.source.startswith("resource:"):
+            return False
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        try:
+            return Path(self.source).stat().st_mtime != self._snapshot.mtime
+        except OSError:
+            return False
+
+    def load(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and not self._stale():
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or snapshot is self._snapshot:
+                self._snapshot = self._read()
+            return self._snapshot
+
+    def response(self, request: Request) -> Response:
+        snapshot = self.load()
+        encoding = pick_encoding(
+            request.headers.get("accept-encoding", ""), snapshot.variants
+        )
+
+        etag = snapshot.etag
+        if encoding:
+            suffix = "gz" if encoding == "gzip" else encoding
+            etag = f'{etag[:-1]}-{suffix}"'
+
+        headers = {
+            "ETag": etag,
+            "Last-Modified": http_date(snapshot.mtime),
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+            "Accept-Ranges": "bytes",
+        }
+
+        if is_not_modified(request, snapshot.etag, snapshot.mtime):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return Response(
+                content=snapshot.variants[encoding], media_type=self.media_type, headers=headers
+            )
+
+        body = snapshot.body
+        if_range = request.headers.get("if-range")
+        if if_range is None or if_range.strip() in (snapshot.etag, headers["Last-Modified"]):
+            try:
+                byte_range = parse_range(request.headers.get("range"), len(body))
+            except RangeNotSatisfiable:
+                headers["Content-Range"] = f"bytes */{len(body)}"
+                return Response(status_code=416, headers=headers)
+            if byte_range is not None:
+                start, end = byte_range
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+                return Response(
+                    content=body[start : end + 1],
+                    status_code=206,
+                    media_type=self.media_type,
+                    headers=headers,
+                )
+
+        return Response(content=body, media_type=self.media_type, headers=headers)
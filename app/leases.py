@@ -0,0 +1,76 @@
+"""
+Lease-based claiming of work rows shared by several worker processes
+(scheduled transfers, notification outbox).
+
+A claimable model has `id`, `locked_by` and `locked_until` columns. Claiming
+selects candidate ids (FOR UPDATE SKIP LOCKED where the database supports
+it), then sets a unique lease token with a conditional UPDATE that only
+touches rows that are still free, and reads back the rows carrying the
+token. Rows of a worker that died become free again when the lease expires.
+
+A worker whose batch may outlive the lease calls hold() before acting on
+the rows and makes its final update conditional on the token, so rows that
+another worker re-claimed in the meantime are not processed twice.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, List, Sequence, Set
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+
+def claim(
+    db: Session,
+    model: Any,
+    conditions: Sequence[Any],
+    order_by: Any,
+    worker_id: str,
+    limit: int,
+    lease_seconds: int,
+    now: datetime,
+) -> List[Any]:
+    """Leases up to `limit` rows matching `conditions` and returns them."""
+    free = or_(model.locked_until.is_(None), model.locked_until < now)
+
+    candidates = (
+        select(model.id)
+        .where(*conditions, free)
+        .order_by(order_by)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    ids = list(db.execute(candidates).scalars())
+    if not ids:
+        db.rollback()
+        return []
+
+    # Another worker may have read (or just processed) the same candidates;
+    # only rows that are still free and still match get our lease token.
+    token = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+    db.execute(
+        update(model)
+        .where(model.id.in_(ids), free, *conditions)
+        .values(locked_by=token, locked_until=now + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    return list(db.execute(select(model).where(model.locked_by == token)).scalars())
+
+
+def hold(db: Session, model: Any, ids: Sequence[int], token: str, now: datetime) -> Set[int]:
+    """
+    Ids of the rows whose lease `token` still holds at `now`. The rows are
+    written (a no-op UPDATE) so they stay locked until the caller's
+    transaction ends and no other worker can re-claim them meanwhile.
+    """
+    held = [model.id.in_(ids), model.locked_by == token, model.locked_until > now]
+    db.execute(
+        update(model)
+        .where(*held)
+        .values(locked_by=token)
+        .execution_options(synchronize_session=False)
+    )
+    return set(db.execute(select(model.id).where(*held)).scalars())
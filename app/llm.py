@@ -1,14 +1,47 @@
-from typing import List, Tuple, Optional, Dict
-
-from groq import Groq
-from .config import GROQ_API_KEY
-
-if not GROQ_API_KEY:
-    raise RuntimeError("Missing GROQ_API_KEY in .env – set it before running.")
-
-client = Groq(api_key=GROQ_API_KEY)
-
-DEFAULT_MODEL = "llama-3.1-8b-instant"
+import json
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, List, Tuple, Optional, Dict
+
+from . import (
+    admission,
+    metrics,
+    model_router,
+    offline_rules,
+    prompts,
+    singleflight,
+    turn_recorder,
+)
+from .circuit_breaker import OPEN, CircuitBreaker, CircuitOpenError
+from .config import (
+    GROQ_API_KEY,
+    LLM_BATCH_MAX_SIZE,
+    LLM_BATCH_WINDOW_MS,
+    LLM_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_SLOW_CALL_SECONDS,
+    LLM_BREAKER_OPEN_SECONDS,
+    LLM_OFFLINE,
+)
+from .prompts import format_history
+
+if TYPE_CHECKING:
+    from groq import Groq
+
+_client: Optional["Groq"] = None
+_replay_source: Optional[Callable[[str, Dict], str]] = None
+_client_lock = threading.Lock()
+
+# The LLM cannot answer right now (breaker open, or the admission queue is
+# full): the classifiers answer from offline_rules instead of waiting again.
+UNAVAILABLE_ERRORS = (CircuitOpenError, admission.AdmissionTimeout)
+
+llm_breaker = CircuitBreaker(
+    "llm",
+    slow_call_seconds=LLM_SLOW_CALL_SECONDS,
+    open_seconds=LLM_BREAKER_OPEN_SECONDS,
+)
 
 __all__ = [
     "detect_intent",
@@ -17,8 +50,376 @@ __all__ = [
     "match_contact_label",
     "refers_to_same_amount_as_last_time",
     "detect_confirmation_or_end",
+    "get_client",
+    "llm_available",
 ]
 
+# System prompts are module constants built on prompts.SHARED_PREFIX, so the
+# exact same prefix is sent on every call and can be cached by the provider.
+
+INTENT_SYSTEM_PROMPT = prompts.system_prompt(
+    "You are an intent classifier in a banking voice assistant.\n"
+    "Based on the conversation, return ONLY one word:\n"
+    "- make_transfer  if the customer wants to make a transfer or send money\n"
+    "- check_balance  if the customer asks about balance, account status, how much money they have\n"
+    "- show_history   if the customer asks about transfer history, recent transactions\n"
+    "- other          if the utterance does not match the above\n\n"
+    "Take conversation history into account, e.g. if the customer previously talked about a transfer,\n"
+    "and now only says an amount ('50'), the intent is still make_transfer.\n\n"
+    "Do not add any explanations, comments or extra text.\n"
+    "Respond with the intent label only."
+)
+
+RECIPIENT_SYSTEM_PROMPT = prompts.system_prompt(
+    "You are a data extractor in a banking assistant.\n"
+    "Based on the customer's utterance, extract the transfer recipient name.\n"
+    "Return ONLY the recipient name/description (e.g. 'John Smith', 'my neighbor', 'child support fund').\n"
+    "Remove amounts, currencies and unnecessary words.\n"
+    "If the utterance does NOT contain recipient information, return exactly: NONE.\n"
+    "Do not add any comments, explanations or other words."
+)
+
+CONTACT_MATCH_SYSTEM_PROMPT = prompts.system_prompt(
+    "You are a module that matches the transfer recipient to saved contacts.\n"
+    "The customer uses phrases such as 'to my mom', 'for my grandson', "
+    "'to the child support fund', etc.\n\n"
+    "You get:\n"
+    "- a PHRASE from the customer describing the recipient\n"
+    "- a LIST of contacts, each having 'nickname' and full name\n\n"
+    "Your task:\n"
+    "- choose the contact that best matches the customer's phrase\n"
+    "- return EXACTLY the 'nickname' value of the chosen contact\n"
+    "- if no contact fits reasonably, return exactly: NONE\n\n"
+    "Do not add any explanations, comments or extra text."
+)
+
+SAME_AMOUNT_SYSTEM_PROMPT = prompts.system_prompt(
+    "You are a classifier in a banking assistant.\n"
+    "Decide if the customer is asking to use the SAME AMOUNT as in a previous transfer.\n"
+    "Examples that mean YES:\n"
+    "- 'for the same amount as last time'\n"
+    "- 'for the same amount I made this time'\n"
+    "- 'same amount as the last transfer to my mom'\n\n"
+    "Examples that mean NO:\n"
+    "- 'send 50 PLN to my mom'\n"
+    "- 'send all my money to my mom'\n"
+    "- 'send half of my balance to my mom'\n"
+    "- 'send some money to my mom'\n\n"
+    "Return EXACTLY one word: YES or NO."
+)
+
+DIALOG_ACT_SYSTEM_PROMPT = prompts.system_prompt(
+    "You are a classifier in a banking voice assistant.\n"
+    "Your task is to classify the customer's LAST sentence into one of four labels:\n"
+    "- confirm   -> the customer clearly confirms the previous action or proposal\n"
+    "- reject    -> the customer clearly rejects or cancels the previous action or proposal\n"
+    "- end_call  -> the customer clearly finishes the conversation (e.g. 'thank you, that's all')\n"
+    "- none      -> anything else\n\n"
+    "Use the conversation history to understand what is being confirmed or rejected.\n"
+    "Return EXACTLY ONE WORD: confirm, reject, end_call, or none.\n\n"
+    "Examples:\n"
+    "U: Yes, please do it.       -> confirm\n"
+    "U: Okay, go ahead.          -> confirm\n"
+    "U: No, cancel that.         -> reject\n"
+    "U: I don't want that.       -> reject\n"
+    "U: Thank you, that's all.   -> end_call\n"
+    "U: Thanks, goodbye.         -> end_call\n"
+    "U: Tell me a joke.          -> none\n"
+)
+
+ASK_SYSTEM_PROMPT = prompts.system_prompt(
+    "You are a helpful virtual banking assistant. "
+    "You respond briefly and clearly in English. "
+    "For questions about past spending use only the spending summary "
+    "in the customer context."
+)
+
+
+def get_client() -> "Groq":
+    """
+    Returns the shared Groq client, creating it on first use.
+    Importing `groq` and building the client is deferred so that importing
+    the app (and booting a fresh replica) does not pay for it.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not GROQ_API_KEY:
+                    raise RuntimeError(
+                        "Missing GROQ_API_KEY in .env – set it before running."
+                    )
+                from groq import Groq
+
+                _client = Groq(
+                    api_key=GROQ_API_KEY,
+                    timeout=LLM_TIMEOUT_SECONDS,
+                    max_retries=LLM_MAX_RETRIES,
+                )
+    return _client
+
+
+def llm_available() -> bool:
+    """
+    False while the LLM circuit breaker is open (or LLM_OFFLINE is set);
+    the assistant then runs on offline_rules only.
+    """
+    return not LLM_OFFLINE and llm_breaker.state != OPEN
+
+
+# Charged against LLM_TPM_LIMIT for calls without max_tokens.
+DEFAULT_OUTPUT_TOKENS = 200
+
+
+def _create(request: Dict, fn_name: Optional[str] = None) -> str:
+    """
+    One provider call, admitted by app/admission.py (rate limits, priority)
+    and made through the circuit breaker with the function's route timeout;
+    returns the answer text. The model's latency / errors feed the router.
+    """
+    router = model_router.router
+    tokens = sum(prompts.count_tokens(m["content"]) for m in request["messages"])
+    tokens += request.get("max_tokens") or DEFAULT_OUTPUT_TOKENS
+    # An open breaker fails fast instead of taking an admission slot first.
+    if llm_breaker.state == OPEN:
+        metrics.incr(f"breaker.{llm_breaker.name}.rejected")
+        raise CircuitOpenError(f"{llm_breaker.name} circuit is open")
+    with admission.controller.admit(
+        tokens, admission.priority_for(fn_name), admission.current_user.get()
+    ):
+        route = router.route_for(fn_name)
+        started = time.monotonic()
+        try:
+            completion = llm_breaker.call(
+                get_client().chat.completions.create,
+                slow_call_seconds=route.slow_call_seconds,
+                timeout=route.timeout,
+                **request,
+            )
+        except CircuitOpenError:
+            raise
+        except Exception:
+            router.record(fn_name, request["model"], time.monotonic() - started, ok=False)
+            raise
+        router.record(fn_name, request["model"], time.monotonic() - started, ok=True)
+    return completion.choices[0].message.content or ""
+
+
+# Classifiers whose answer is a single short label; only these are batched.
+BATCHABLE_FUNCTIONS = ("detect_intent", "detect_confirmation_or_end")
+
+BATCH_INSTRUCTIONS = (
+    "\n\nBATCH MODE: the user message contains several independent items, each "
+    "starting with 'ITEM <n>:'. Handle every item on its own, exactly as "
+    "instructed above, and answer with one line per item in the form "
+    "'<n>: <answer>'. Do not add any other text."
+)
+
+_BATCH_LINE_RE = re.compile(
+    r"^\s*(?:item\s*)?(\d+)\s*[:.)\-]\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE
+)
+
+
+class _BatchItem:
+    __slots__ = ("user_prompt", "max_tokens", "done", "content", "error")
+
+    def __init__(self, user_prompt: str, max_tokens: Optional[int]):
+        self.user_prompt = user_prompt
+        self.max_tokens = max_tokens
+        self.done = threading.Event()
+        self.content: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class _Batch:
+    __slots__ = ("items", "full")
+
+    def __init__(self):
+        self.items: List[_BatchItem] = []
+        self.full = threading.Event()
+
+
+def parse_batch_answer(content: str, size: int) -> Dict[int, str]:
+    """{item number: answer} for the well-formed lines of a batched answer."""
+    answers: Dict[int, str] = {}
+    seen = set()
+    for match in _BATCH_LINE_RE.finditer(content or ""):
+        n = int(match.group(1))
+        if not 1 <= n <= size:
+            continue
+        if n in seen:
+            answers.pop(n, None)
+        else:
+            answers[n] = match.group(2)
+        seen.add(n)
+    return answers
+
+
+class MicroBatcher:
+    """
+    Packs concurrent calls of the same classifier into one completion.
+
+    The first caller of a function opens a batch and waits up to `window`
+    seconds (less if `max_size` callers join); it then sends all items as
+    one numbered prompt and hands every caller its line of the answer.
+    Callers whose line is missing or malformed get None and make their own
+    single call; a failed batch call raises in every caller.
+    """
+
+    def __init__(
+        self, window_seconds: float, max_size: int, send: Callable[[Dict, str], str]
+    ):
+        self.window_seconds = window_seconds
+        self.max_size = max_size
+        self.send = send
+        self._lock = threading.Lock()
+        self._open: Dict[str, _Batch] = {}
+
+    def submit(
+        self, fn_name: str, system_prompt: str, user_prompt: str, max_tokens: Optional[int]
+    ) -> Optional[str]:
+        item = _BatchItem(user_prompt, max_tokens)
+        with self._lock:
+            batch = self._open.get(fn_name)
+            leader = batch is None
+            if leader:
+                batch = self._open[fn_name] = _Batch()
+            batch.items.append(item)
+            if len(batch.items) >= self.max_size:
+                del self._open[fn_name]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window_seconds)
+            with self._lock:
+                if self._open.get(fn_name) is batch:
+                    del self._open[fn_name]
+            try:
+                self._run(fn_name, system_prompt, batch.items)
+            finally:
+                # Followers wait for this without a deadline of their own.
+                for other in batch.items:
+                    other.done.set()
+        else:
+            # Bounded by the leader's call: admission, breaker and route timeout.
+            item.done.wait()
+
+        if item.error is not None:
+            raise item.error
+        return item.content
+
+    def _run(self, fn_name: str, system_prompt: str, items: List[_BatchItem]) -> None:
+        if len(items) == 1:
+            items[0].done.set()
+            return
+
+        metrics.incr(f"llm.{fn_name}.batches")
+        metrics.observe(f"llm.{fn_name}.batch_size", len(items))
+        request = {
+            "model": model_router.router.choose(fn_name),
+            "messages": [
+                {"role": "system", "content": system_prompt + BATCH_INSTRUCTIONS},
+                {
+                    "role": "user",
+                    "content": "\n\n".join(
+                        f"ITEM {n}:\n{item.user_prompt}" for n, item in enumerate(items, 1)
+                    ),
+                },
+            ],
+            "temperature": 0.0,
+            "max_tokens": sum((item.max_tokens or 5) + 4 for item in items),
+        }
+        try:
+            answers = parse_batch_answer(self.send(request, fn_name), len(items))
+        except Exception as e:
+            for item in items:
+                item.error = e
+        else:
+            missing = 0
+            for n, item in enumerate(items, 1):
+                item.content = answers.get(n)
+                missing += item.content is None
+            if missing:
+                metrics.incr(f"llm.{fn_name}.batch_fallbacks", missing)
+        for item in items:
+            item.done.set()
+
+
+_batcher: Optional[MicroBatcher] = None
+
+# Identical requests in flight at the same time (e.g. a Twilio webhook retry
+# of a turn that is still running) share one upstream call.
+_in_flight = singleflight.Group("llm")
+
+
+def set_batching(window_ms: float, max_size: int = LLM_BATCH_MAX_SIZE) -> None:
+    """(Re)configures classifier micro-batching; window_ms <= 0 turns it off."""
+    global _batcher
+    _batcher = MicroBatcher(window_ms / 1000, max_size, _create) if window_ms > 0 else None
+
+
+set_batching(LLM_BATCH_WINDOW_MS)
+
+
+def _complete(
+    fn_name: str,
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float = 0.0,
+    max_tokens: Optional[int] = None,
+) -> str:
+    """
+    Sends one chat completion and returns the raw text of the answer.
+    All llm.py functions go through here; errors propagate to the caller.
+    Model, timeout and (unless given) max_tokens come from the function's
+    route in app/model_router.py.
+    Raises CircuitOpenError without calling the provider while the
+    breaker is open. Concurrent identical requests share one upstream
+    call, and classifier calls may share one completion with other turns'
+    calls when micro-batching is on (LLM_BATCH_WINDOW_MS).
+    """
+    if max_tokens is None:
+        max_tokens = model_router.router.route_for(fn_name).max_tokens
+    request = {
+        "model": model_router.router.choose(fn_name),
+        "messages": prompts.build_messages(fn_name, system_prompt, user_prompt),
+        "temperature": temperature,
+    }
+    if max_tokens is not None:
+        request["max_tokens"] = max_tokens
+
+    if _replay_source is not None:
+        return _replay_source(fn_name, request)
+
+    if LLM_OFFLINE:
+        raise CircuitOpenError("LLM_OFFLINE is set")
+
+    def send() -> str:
+        content = None
+        if _batcher is not None and fn_name in BATCHABLE_FUNCTIONS:
+            content = _batcher.submit(fn_name, system_prompt, user_prompt, max_tokens)
+        if content is None:
+            content = _create(request, fn_name)
+        return content
+
+    try:
+        content = _in_flight.do(json.dumps(request, sort_keys=True), send)
+    except Exception as e:
+        turn_recorder.record_llm(fn_name, None, error=f"{type(e).__name__}: {e}")
+        raise
+
+    turn_recorder.record_llm(fn_name, content)
+    return content
+
+
+def set_replay_source(source: Optional[Callable[[str, Dict], str]]) -> None:
+    """
+    Replaces the provider with `source(fn_name, request) -> content`
+    (used by app/replay.py to feed recorded answers). None restores Groq.
+    """
+    global _replay_source
+    _replay_source = source
+
 
 def detect_intent(message: str, history: Optional[List[Tuple[str, str]]] = None) -> str:
     """
@@ -69,28 +470,7 @@ def detect_intent(message: str, history: Optional[List[Tuple[str, str]]] = None)
 
     # ===== STANDARD LLM-BASED INTENT DETECTION =====
 
-    history_text = ""
-    if history:
-        last_turns = history[-6:]
-        lines = []
-        for role, msg in last_turns:
-            who = "Customer" if role == "user" else "Assistant"
-            lines.append(f"{who}: {msg}")
-        history_text = "\n".join(lines)
-
-    system_prompt = (
-        "You are an intent classifier in a banking voice assistant.\n"
-        "The customer speaks English. "
-        "Based on the conversation, return ONLY one word:\n"
-        "- make_transfer  if the customer wants to make a transfer or send money\n"
-        "- check_balance  if the customer asks about balance, account status, how much money they have\n"
-        "- show_history   if the customer asks about transfer history, recent transactions\n"
-        "- other          if the utterance does not match the above\n\n"
-        "Take conversation history into account, e.g. if the customer previously talked about a transfer,\n"
-        "and now only says an amount ('50'), the intent is still make_transfer.\n\n"
-        "Do not add any explanations, comments or extra text.\n"
-        "Respond with the intent label only."
-    )
+    history_text = format_history(history, "detect_intent")
 
     if history_text:
         user_prompt = (
@@ -102,17 +482,13 @@ def detect_intent(message: str, history: Optional[List[Tuple[str, str]]] = None)
         user_prompt = message
 
     try:
-        completion = client.chat.completions.create(
-            model=DEFAULT_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+        content = _complete(
+            "detect_intent",
+            INTENT_SYSTEM_PROMPT,
+            user_prompt,
             temperature=0.0,
-            max_tokens=5,
         )
 
-        content = completion.choices[0].message.content or ""
         intent_raw = content.strip().lower()
 
         mapping: Dict[str, str] = {
@@ -132,6 +508,9 @@ def detect_intent(message: str, history: Optional[List[Tuple[str, str]]] = None)
         )
         return intent_final
 
+    except UNAVAILABLE_ERRORS as e:
+        print("[WARN] detect_intent LLM unavailable, using rules:", e)
+        return offline_rules.rule_intent(message)
     except Exception as e:
         print("[WARN] detect_intent LLM error:", e)
         return "other"
@@ -167,23 +546,7 @@ def extract_recipient(
 
     # ===== STANDARD LLM-BASED EXTRACTION =====
 
-    history_text = ""
-    if history:
-        last_turns = history[-6:]
-        lines = []
-        for role, msg in last_turns:
-            who = "Customer" if role == "user" else "Assistant"
-            lines.append(f"{who}: {msg}")
-        history_text = "\n".join(lines)
-
-    system_prompt = (
-        "You are a data extractor in a banking assistant.\n"
-        "Based on the customer's utterance, extract the transfer recipient name.\n"
-        "Return ONLY the recipient name/description (e.g. 'John Smith', 'my neighbor', 'child support fund').\n"
-        "Remove amounts, currencies and unnecessary words.\n"
-        "If the utterance does NOT contain recipient information, return exactly: NONE.\n"
-        "Do not add any comments, explanations or other words."
-    )
+    history_text = format_history(history, "extract_recipient")
 
     if history_text:
         user_prompt = (
@@ -195,17 +558,13 @@ def extract_recipient(
         user_prompt = message
 
     try:
-        completion = client.chat.completions.create(
-            model=DEFAULT_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+        content = _complete(
+            "extract_recipient",
+            RECIPIENT_SYSTEM_PROMPT,
+            user_prompt,
             temperature=0.0,
-            max_tokens=20,
         )
 
-        content = completion.choices[0].message.content or ""
         recipient_raw = content.strip()
 
         if not recipient_raw:
@@ -216,33 +575,26 @@ def extract_recipient(
 
         return recipient_raw
 
+    except UNAVAILABLE_ERRORS as e:
+        print("[WARN] extract_recipient LLM unavailable, using rules:", e)
+        return offline_rules.rule_recipient(message)
     except Exception as e:
         print("[WARN] extract_recipient LLM error:", e)
         return None
 
 
 def ask_llm(message: str, context: str) -> str:
-    prompt = (
-        "You are a virtual banking assistant. "
-        "You respond briefly and clearly in English.\n\n"
+    user_prompt = (
         f"Customer context:\n{context}\n\n"
         f"Customer question: {message}\n"
     )
 
-    completion = client.chat.completions.create(
-        model=DEFAULT_MODEL,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a helpful banking assistant speaking English.",
-            },
-            {"role": "user", "content": prompt},
-        ],
-        temperature=0.3,
-    )
-
-    content = completion.choices[0].message.content or ""
-    return content.strip()
+    try:
+        content = _complete("ask_llm", ASK_SYSTEM_PROMPT, user_prompt, temperature=0.3)
+    except Exception as e:
+        print("[WARN] ask_llm LLM error, using fallback reply:", e)
+        return offline_rules.FALLBACK_REPLY
+    return content.strip() or offline_rules.FALLBACK_REPLY
 
 
 def match_contact_label(label: str, contacts: List[Dict[str, str]]) -> Optional[str]:
@@ -271,20 +623,6 @@ def match_contact_label(label: str, contacts: List[Dict[str, str]]) -> Optional[
         lines.append(f"- nickname: {nick}, name: {full}")
     contacts_text = "\n".join(lines)
 
-    system_prompt = (
-        "You are a module that matches the transfer recipient to saved contacts.\n"
-        "The customer speaks English and uses phrases such as 'to my mom', 'for my grandson', "
-        "'to the child support fund', etc.\n\n"
-        "You get:\n"
-        "- a PHRASE from the customer describing the recipient\n"
-        "- a LIST of contacts, each having 'nickname' and full name\n\n"
-        "Your task:\n"
-        "- choose the contact that best matches the customer's phrase\n"
-        "- return EXACTLY the 'nickname' value of the chosen contact\n"
-        "- if no contact fits reasonably, return exactly: NONE\n\n"
-        "Do not add any explanations, comments or extra text."
-    )
-
     user_prompt = (
         f"CUSTOMER PHRASE: {label}\n\n"
         f"CONTACT LIST:\n{contacts_text}\n\n"
@@ -292,17 +630,13 @@ def match_contact_label(label: str, contacts: List[Dict[str, str]]) -> Optional[
     )
 
     try:
-        completion = client.chat.completions.create(
-            model=DEFAULT_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+        content = _complete(
+            "match_contact_label",
+            CONTACT_MATCH_SYSTEM_PROMPT,
+            user_prompt,
             temperature=0.0,
-            max_tokens=10,
         )
 
-        content = completion.choices[0].message.content or ""
         raw = content.strip()
 
         if not raw:
@@ -313,6 +647,9 @@ def match_contact_label(label: str, contacts: List[Dict[str, str]]) -> Optional[
 
         return raw
 
+    except UNAVAILABLE_ERRORS as e:
+        print("[WARN] match_contact_label LLM unavailable, using rules:", e)
+        return offline_rules.rule_match_contact(label, contacts)
     except Exception as e:
         print("[WARN] match_contact_label LLM error:", e)
         return None
@@ -330,29 +667,7 @@ def refers_to_same_amount_as_last_time(
       - 'same amount as the last transfer to my mom'
     """
 
-    history_text = ""
-    if history:
-        last_turns = history[-6:]
-        lines = []
-        for role, msg in last_turns:
-            who = "Customer" if role == "user" else "Assistant"
-            lines.append(f"{who}: {msg}")
-        history_text = "\n".join(lines)
-
-    system_prompt = (
-        "You are a classifier in a banking assistant.\n"
-        "Decide if the customer is asking to use the SAME AMOUNT as in a previous transfer.\n"
-        "Examples that mean YES:\n"
-        "- 'for the same amount as last time'\n"
-        "- 'for the same amount I made this time'\n"
-        "- 'same amount as the last transfer to my mom'\n\n"
-        "Examples that mean NO:\n"
-        "- 'send 50 PLN to my mom'\n"
-        "- 'send all my money to my mom'\n"
-        "- 'send half of my balance to my mom'\n"
-        "- 'send some money to my mom'\n\n"
-        "Return EXACTLY one word: YES or NO."
-    )
+    history_text = format_history(history, "refers_to_same_amount_as_last_time")
 
     if history_text:
         user_prompt = (
@@ -367,17 +682,14 @@ def refers_to_same_amount_as_last_time(
         )
 
     try:
-        completion = client.chat.completions.create(
-            model=DEFAULT_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+        content = _complete(
+            "refers_to_same_amount_as_last_time",
+            SAME_AMOUNT_SYSTEM_PROMPT,
+            user_prompt,
             temperature=0.0,
-            max_tokens=3,
         )
 
-        content = (completion.choices[0].message.content or "").strip().upper()
+        content = content.strip().upper()
         return content == "YES"
     except Exception as e:
         print("[WARN] refers_to_same_amount_as_last_time LLM error:", e)
@@ -398,34 +710,7 @@ def detect_confirmation_or_end(
     Return ONLY one of: confirm, reject, end_call, none
     """
 
-    history_text = ""
-    if history:
-        last_turns = history[-6:]
-        lines = []
-        for role, msg in last_turns:
-            who = "Customer" if role == "user" else "Assistant"
-            lines.append(f"{who}: {msg}")
-        history_text = "\n".join(lines)
-
-    system_prompt = (
-        "You are a classifier in a banking voice assistant.\n"
-        "The customer speaks English.\n"
-        "Your task is to classify the customer's LAST sentence into one of four labels:\n"
-        "- confirm   -> the customer clearly confirms the previous action or proposal\n"
-        "- reject    -> the customer clearly rejects or cancels the previous action or proposal\n"
-        "- end_call  -> the customer clearly finishes the conversation (e.g. 'thank you, that's all')\n"
-        "- none      -> anything else\n\n"
-        "Use the conversation history to understand what is being confirmed or rejected.\n"
-        "Return EXACTLY ONE WORD: confirm, reject, end_call, or none.\n\n"
-        "Examples:\n"
-        "U: Yes, please do it.       -> confirm\n"
-        "U: Okay, go ahead.          -> confirm\n"
-        "U: No, cancel that.         -> reject\n"
-        "U: I don't want that.       -> reject\n"
-        "U: Thank you, that's all.   -> end_call\n"
-        "U: Thanks, goodbye.         -> end_call\n"
-        "U: Tell me a joke.          -> none\n"
-    )
+    history_text = format_history(history, "detect_confirmation_or_end")
 
     if history_text:
         user_prompt = (
@@ -437,16 +722,13 @@ def detect_confirmation_or_end(
         user_prompt = message
 
     try:
-        completion = client.chat.completions.create(
-            model=DEFAULT_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+        content = _complete(
+            "detect_confirmation_or_end",
+            DIALOG_ACT_SYSTEM_PROMPT,
+            user_prompt,
             temperature=0.0,
-            max_tokens=5,
         )
-        content = (completion.choices[0].message.content or "").strip().lower()
+        content = content.strip().lower()
 
         mapping = {
             "confirm": "confirm",
@@ -464,6 +746,11 @@ def detect_confirmation_or_end(
 
         return mapping.get(content, "none")
 
+    except UNAVAILABLE_ERRORS as e:
+        print("[WARN] detect_confirmation_or_end LLM unavailable, using rules:", e)
+        return offline_rules.rule_dialog_act(message)
     except Exception as e:
+        # A failed call must not confirm a pending transfer on a regex
+        # guess; "none" makes the assistant ask again.
         print("[WARN] detect_confirmation_or_end LLM error:", e)
         return "none"
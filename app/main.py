@@ -1,18 +1,26 @@
-from pathlib import Path
-
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 
-from .db import Base, engine, get_db
-from .seed import seed_demo_data
+from .config import (
+    AUTO_MIGRATE,
+    INDEX_HTML_PATH,
+    INDEX_HTML_WATCH,
+    NOTIFY_DISPATCHER,
+    TWILIO_VOICE_CONFIGURED,
+)
+from . import audio_cache, event_log, metrics, notifications
+from .db import SessionLocal, init_db, is_migrated
+from .http_cache import StaticAsset
 from .api import chat, twilio, banking as banking_api
-from .api import auth_voice
-
-Base.metadata.create_all(bind=engine)
+from .api import auth_voice, twilio_stream
 
 app = FastAPI(title="Collab Voice Assistant")
 
+index_page = StaticAsset(
+    INDEX_HTML_PATH, "text/html; charset=utf-8", watch=INDEX_HTML_WATCH
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -24,8 +32,36 @@ app.add_middleware(
 
 @app.on_event("startup")
 def startup() -> None:
-    with next(get_db()) as db:
-        seed_demo_data(db)
+    """
+    Schema creation and seeding are an explicit step (`python -m app.seed`),
+    so replicas boot without touching the DB. AUTO_MIGRATE=true restores the
+    old behaviour for local development.
+    """
+    index_page.load()
+    audio_cache.load()
+
+    if not TWILIO_VOICE_CONFIGURED:
+        print("[WARN] Twilio configuration is incomplete – /twilio/token is disabled.")
+
+    if AUTO_MIGRATE:
+        from .seed import seed_demo_data
+
+        init_db()
+        with SessionLocal() as db:
+            seed_demo_data(db)
+
+    # The outbox table must exist, or every poll would fail.
+    if NOTIFY_DISPATCHER:
+        if is_migrated():
+            notifications.start_dispatcher()
+        else:
+            print("[WARN] Database is not migrated – notification dispatcher not started.")
+
+
+@app.on_event("shutdown")
+def shutdown() -> None:
+    notifications.stop_dispatcher()
+    event_log.close()
 
 
 @app.get("/health")
@@ -33,17 +69,33 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def get_metrics():
+    """In-process counters (LLM calls, tokens sent, ...) for this worker."""
+    return metrics.snapshot()
+
+
 @app.get("/", response_class=HTMLResponse)
-def serve_index():
+def serve_index(request: Request):
     """
-    Returns index.html (Twilio Voice SDK frontend).
-    Assumes index.html is in the project root directory.
+    Returns index.html (Twilio Voice SDK frontend) from memory,
+    with ETag / Last-Modified revalidation and gzip/brotli variants.
+    The file location is configured by INDEX_HTML_PATH.
     """
-    index_path = Path("index.html")
-    return index_path.read_text(encoding="utf-8")
+    return index_page.response(request)
+
+
+@app.get("/audio/{name}")
+def serve_audio(name: str, request: Request):
+    """Pre-rendered phone prompts (python -m app.audio_cache build)."""
+    clip = audio_cache.get(name)
+    if clip is None:
+        raise HTTPException(status_code=404, detail="Unknown audio clip.")
+    return clip.response(request)
 
 
 app.include_router(auth_voice.router)
 app.include_router(chat.router)
 app.include_router(twilio.router)
+app.include_router(twilio_stream.router)
 app.include_router(banking_api.router)
@@ -0,0 +1,53 @@
+import threading
+from collections import defaultdict
+from typing import Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = defaultdict(int)
+_observations: Dict[str, Dict[str, float]] = {}
+_gauges: Dict[str, float] = {}
+
+
+def incr(name: str, value: float = 1) -> None:
+    """Adds `value` to a monotonically increasing counter."""
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name: str, value: float) -> None:
+    """Records one sample (e.g. a latency or a size): count / sum / max."""
+    with _lock:
+        obs = _observations.get(name)
+        if obs is None:
+            obs = _observations[name] = {"count": 0, "sum": 0.0, "max": value}
+        obs["count"] += 1
+        obs["sum"] += value
+        if value > obs["max"]:
+            obs["max"] = value
+
+
+def gauge(name: str, value: float) -> None:
+    """Sets a value that can go up and down (e.g. a queue depth)."""
+    with _lock:
+        _gauges[name] = value
+
+
+def snapshot() -> Dict[str, object]:
+    """Returns a JSON-serializable copy of all metrics."""
+    with _lock:
+        observations = {
+            name: {**obs, "avg": obs["sum"] / obs["count"] if obs["count"] else 0.0}
+            for name, obs in _observations.items()
+        }
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "observations": observations,
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _observations.clear()
+        _gauges.clear()
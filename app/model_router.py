@@ -0,0 +1,149 @@
+"""
+Per-function model routing for llm.py.
+
+ROUTES gives every llm.py function its candidate models (in order of
+preference), request timeout, max_tokens and the latency above which the
+circuit breaker counts a call as failed: the one-word classifiers run
+on the small instant model, and only the free-form ask_llm answer uses a
+larger one. LLM_ROUTES (JSON) overrides entries, e.g.
+
+    LLM_ROUTES='{"ask_llm": {"models": ["llama-3.1-8b-instant"], "timeout": 5}}'
+    LLM_ROUTES='{"detect_intent": "llama-3.1-8b-instant"}'   # models only
+
+By default the first candidate is always used. With LLM_ROUTING_ADAPTIVE
+the router keeps a rolling (EWMA) latency and error rate per function and
+model (a 5-token classifier answer says nothing about a 200-token one) and
+sends each call to the fastest healthy candidate, occasionally trying the
+others so their numbers stay current.
+"""
+
+import json
+import random
+import threading
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, Tuple
+
+from . import metrics
+from .config import LLM_ROUTES, LLM_ROUTING_ADAPTIVE, LLM_TIMEOUT_SECONDS
+
+SMALL_MODEL = "llama-3.1-8b-instant"
+LARGE_MODEL = "llama-3.3-70b-versatile"
+
+# Weight of the newest sample in the rolling averages.
+EWMA_ALPHA = 0.2
+# Candidates failing more often than this are skipped while others are healthy.
+MAX_ERROR_RATE = 0.3
+# Share of calls sent to a random other candidate in adaptive mode.
+EXPLORE_PROBABILITY = 0.05
+
+
+@dataclass(frozen=True)
+class Route:
+    models: Tuple[str, ...]
+    timeout: float
+    max_tokens: Optional[int] = None
+    # None: the breaker's own threshold (LLM_SLOW_CALL_SECONDS).
+    slow_call_seconds: Optional[float] = None
+
+
+CLASSIFIER_TIMEOUT_SECONDS = 4.0
+# Long free-form answers of the large model routinely take a few seconds.
+ASK_SLOW_CALL_SECONDS = 6.0
+
+ROUTES: Dict[str, Route] = {
+    "detect_intent": Route((SMALL_MODEL,), CLASSIFIER_TIMEOUT_SECONDS, 5),
+    "detect_confirmation_or_end": Route((SMALL_MODEL,), CLASSIFIER_TIMEOUT_SECONDS, 5),
+    "refers_to_same_amount_as_last_time": Route((SMALL_MODEL,), CLASSIFIER_TIMEOUT_SECONDS, 3),
+    "extract_recipient": Route((SMALL_MODEL,), CLASSIFIER_TIMEOUT_SECONDS, 20),
+    "match_contact_label": Route((SMALL_MODEL,), CLASSIFIER_TIMEOUT_SECONDS, 10),
+    "ask_llm": Route(
+        (LARGE_MODEL, SMALL_MODEL), LLM_TIMEOUT_SECONDS, 200, ASK_SLOW_CALL_SECONDS
+    ),
+}
+
+DEFAULT_ROUTE = Route((SMALL_MODEL,), LLM_TIMEOUT_SECONDS)
+
+
+def apply_overrides(routes: Dict[str, Route], text: str) -> Dict[str, Route]:
+    """routes with the entries of an LLM_ROUTES JSON document applied."""
+    routes = dict(routes)
+    for fn_name, spec in (json.loads(text) if text else {}).items():
+        route = routes.get(fn_name, DEFAULT_ROUTE)
+        if isinstance(spec, str):
+            spec = {"models": [spec]}
+        if not isinstance(spec, dict) or not spec.get("models", route.models):
+            raise ValueError(f"LLM_ROUTES: invalid entry for {fn_name!r}: {spec!r}")
+        routes[fn_name] = replace(
+            route,
+            models=tuple(spec.get("models", route.models)),
+            timeout=float(spec.get("timeout", route.timeout)),
+            max_tokens=spec.get("max_tokens", route.max_tokens),
+            slow_call_seconds=spec.get("slow_call_seconds", route.slow_call_seconds),
+        )
+    return routes
+
+
+ROUTES = apply_overrides(ROUTES, LLM_ROUTES)
+
+
+class ModelStats:
+    """Rolling latency and error rate of one model for one function."""
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+
+    def record(self, latency: float, ok: bool) -> None:
+        if ok and self.latency is None:
+            self.latency = latency
+        elif ok:
+            self.latency = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+        failed = 0.0 if ok else 1.0
+        self.error_rate = EWMA_ALPHA * failed + (1 - EWMA_ALPHA) * self.error_rate
+
+
+class ModelRouter:
+    def __init__(self, routes: Dict[str, Route], adaptive: bool = LLM_ROUTING_ADAPTIVE):
+        self.routes = routes
+        self.adaptive = adaptive
+        self._stats: Dict[Tuple[str, str], ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def route_for(self, fn_name: Optional[str]) -> Route:
+        return self.routes.get(fn_name or "", DEFAULT_ROUTE)
+
+    def choose(self, fn_name: str) -> str:
+        models = self.route_for(fn_name).models
+        if not self.adaptive or len(models) == 1:
+            return models[0]
+
+        if random.random() < EXPLORE_PROBABILITY:
+            return random.choice(models)
+        with self._lock:
+            stats = [(model, self._stats.get((fn_name, model))) for model in models]
+        # Models without measurements are tried first, in preference order.
+        for model, s in stats:
+            if s is None:
+                return model
+        healthy = [
+            (s.latency if s.latency is not None else float("inf"), model)
+            for model, s in stats
+            if s.error_rate <= MAX_ERROR_RATE
+        ]
+        if healthy:
+            return min(healthy)[1]
+        return min((s.error_rate, model) for model, s in stats)[1]
+
+    def record(self, fn_name: Optional[str], model: str, latency: float, ok: bool) -> None:
+        fn_name = fn_name or ""
+        with self._lock:
+            stats = self._stats.setdefault((fn_name, model), ModelStats())
+            stats.record(latency, ok)
+            ewma_latency, error_rate = stats.latency, stats.error_rate
+        metrics.incr(f"llm.model.{model}.{'calls' if ok else 'errors'}")
+        if ewma_latency is not None:
+            metrics.gauge(f"llm.model.{model}.{fn_name}.ewma_latency_seconds", ewma_latency)
+        metrics.gauge(f"llm.model.{model}.{fn_name}.error_rate", error_rate)
+
+
+router = ModelRouter(ROUTES)
@@ -1,5 +1,16 @@
 from typing import Optional
-from sqlalchemy import String, Float, Integer, ForeignKey, DateTime
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+    delete,
+    event,
+)
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -42,6 +53,40 @@ class Contact(Base):
     default_title: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
 
+class ContactAlias(Base):
+    """
+    Phrase a customer used for one of their contacts ('my grandson michael'),
+    learned from confirmed transfers; resolve_contact checks it before
+    asking the LLM. Keyed by (user_id, alias); alias is normalized
+    (see banking.normalize_alias).
+    """
+
+    __tablename__ = "contact_aliases"
+    __table_args__ = (UniqueConstraint("user_id", "alias", name="uq_contact_alias"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[str] = mapped_column(ForeignKey("users.id"), nullable=False)
+    alias: Mapped[str] = mapped_column(String, nullable=False)
+    contact_id: Mapped[int] = mapped_column(
+        ForeignKey("contacts.id", ondelete="CASCADE"), nullable=False
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+@event.listens_for(Contact, "after_insert")
+@event.listens_for(Contact, "after_update")
+@event.listens_for(Contact, "after_delete")
+def _forget_learned_aliases(mapper, connection, target: Contact) -> None:
+    """
+    A new, renamed or removed contact can change what a phrase should
+    resolve to, so the user's learned aliases are dropped (ORM changes only;
+    bulk Core writes to contacts must clear them themselves).
+    """
+    connection.execute(delete(ContactAlias).where(ContactAlias.user_id == target.user_id))
+
+
 class Transaction(Base):
     __tablename__ = "transactions"
 
@@ -54,3 +99,85 @@ class Transaction(Base):
     timestamp: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
+
+
+class SpendingAggregate(Base):
+    """
+    Running total of a user's outgoing transfers, maintained by
+    banking.perform_transfer (see app/spending.py):
+      - dimension 'recipient', period 'YYYY',    key = recipient name
+      - dimension 'category',  period 'YYYY',    key = category of the title
+      - dimension 'month',     period 'YYYY-MM', key = '*'
+    """
+
+    __tablename__ = "spending_aggregates"
+    __table_args__ = (
+        UniqueConstraint("user_id", "dimension", "period", "key", name="uq_spending_bucket"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[str] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    dimension: Mapped[str] = mapped_column(String, nullable=False)
+    period: Mapped[str] = mapped_column(String, nullable=False)
+    key: Mapped[str] = mapped_column(String, nullable=False)
+    total: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ScheduledTransfer(Base):
+    """
+    Standing order executed by the scheduler worker (app/scheduler.py).
+
+    rule: 'interval:<seconds>' or 'cron:<min> <hour> <day> <month> <weekday>' (UTC).
+    locked_by / locked_until: lease taken by the worker executing the item.
+    """
+
+    __tablename__ = "scheduled_transfers"
+    __table_args__ = (Index("ix_scheduled_transfers_due", "active", "next_run_at"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[str] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    recipient_name: Mapped[str] = mapped_column(String, nullable=False)
+    recipient_iban: Mapped[str] = mapped_column(String, nullable=False)
+    title: Mapped[str] = mapped_column(String, nullable=False)
+    amount: Mapped[float] = mapped_column(Float, nullable=False)
+    rule: Mapped[str] = mapped_column(String, nullable=False)
+    next_run_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    runs: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_run_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    locked_by: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    locked_until: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class Notification(Base):
+    """
+    Outbox row for a customer notification (e.g. transfer confirmation SMS).
+    Written in the same DB transaction as the transfer and delivered later
+    by the dispatcher in app/notifications.py.
+    status: 'pending' -> 'sent', or 'failed' after NOTIFY_MAX_ATTEMPTS.
+    """
+
+    __tablename__ = "notifications"
+    __table_args__ = (Index("ix_notifications_due", "status", "next_attempt_at"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[str] = mapped_column(ForeignKey("users.id"), nullable=False)
+    channel: Mapped[str] = mapped_column(String, nullable=False, default="sms")
+    body: Mapped[str] = mapped_column(String, nullable=False)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    locked_by: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    locked_until: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
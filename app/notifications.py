@@ -0,0 +1,318 @@
+"""
+Outbound customer notifications through an outbox table (models.Notification).
+
+Transfers only INSERT a notification row in their own DB transaction; the
+voice turn never waits for an SMS gateway. A background dispatcher thread
+(started with the app, or python -m app.notifications) claims pending rows
+in batches (lease-based, see app/leases.py, so every web worker can run
+one), hands them to a pluggable sender and marks them sent, or retries
+with exponential backoff and gives up after NOTIFY_MAX_ATTEMPTS.
+
+Delivery is at-least-once: a worker that dies after sending but before
+committing leaves the rows to be sent again when the lease expires.
+
+Senders (NOTIFY_SENDER): 'log' (print), 'file:<path>' (NDJSON, for tests)
+and 'twilio' (SMS).
+"""
+
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from . import leases, metrics
+from .config import (
+    NOTIFY_BATCH_SIZE,
+    NOTIFY_MAX_ATTEMPTS,
+    NOTIFY_POLL_SECONDS,
+    NOTIFY_SENDER,
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    TWILIO_SMS_FROM,
+)
+from .db import SessionLocal
+from .models import Notification, User
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+SMS = "sms"
+
+# First retry after this many seconds, doubling with every attempt.
+RETRY_BASE_SECONDS = 5
+LEASE_SECONDS = 60
+
+_wake = threading.Event()
+
+
+@dataclass
+class OutgoingMessage:
+    id: int
+    channel: str
+    to: Optional[str]
+    body: str
+
+
+class LogSender:
+    """Prints notifications instead of sending them (default)."""
+
+    def send_batch(self, messages: List[OutgoingMessage]) -> List[Optional[str]]:
+        for m in messages:
+            print(f"[NOTIFY] {m.channel} to {m.to}: {m.body}")
+        return [None] * len(messages)
+
+
+class FileSender:
+    """Appends notifications to an NDJSON file; a stand-in for tests."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages: List[OutgoingMessage]) -> List[Optional[str]]:
+        lines = "".join(json.dumps(asdict(m), ensure_ascii=False) + "\n" for m in messages)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        return [None] * len(messages)
+
+
+class TwilioSmsSender:
+    """Sends SMS through the Twilio REST API, one request per message."""
+
+    def __init__(self, from_number: Optional[str] = TWILIO_SMS_FROM):
+        if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and from_number):
+            raise RuntimeError(
+                "NOTIFY_SENDER=twilio needs TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN "
+                "and TWILIO_SMS_FROM"
+            )
+        from twilio.rest import Client
+
+        self.client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        self.from_number = from_number
+
+    def send_batch(self, messages: List[OutgoingMessage]) -> List[Optional[str]]:
+        errors: List[Optional[str]] = []
+        for m in messages:
+            try:
+                self.client.messages.create(to=m.to, from_=self.from_number, body=m.body)
+                errors.append(None)
+            except Exception as e:
+                errors.append(str(e))
+        return errors
+
+
+def make_sender(spec: str = NOTIFY_SENDER):
+    if spec == "log":
+        return LogSender()
+    if spec.startswith("file:"):
+        return FileSender(spec[len("file:"):])
+    if spec == "twilio":
+        return TwilioSmsSender()
+    raise ValueError(f"Unknown NOTIFY_SENDER {spec!r}")
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(dt: datetime) -> datetime:
+    """SQLite returns naive datetimes; all stored times are UTC."""
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def transfer_confirmation_text(
+    amount: float, currency: str, recipient_name: str, title: Optional[str]
+) -> str:
+    return (
+        f"VERA: your transfer of {amount:.2f} {currency} to {recipient_name} "
+        f"('{title or ''}') has been ordered."
+    )
+
+
+def notification_row(user_id: str, body: str, channel: str = SMS) -> Dict[str, Any]:
+    now = utcnow()
+    return {
+        "user_id": user_id,
+        "channel": channel,
+        "body": body,
+        "status": PENDING,
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+    }
+
+
+def enqueue(db: Session, user_id: str, body: str, channel: str = SMS) -> None:
+    """Adds a notification to the caller's transaction (no commit)."""
+    db.add(Notification(**notification_row(user_id, body, channel)))
+
+
+def enqueue_many(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Bulk version of enqueue for notification_row() dicts (no commit)."""
+    if rows:
+        db.execute(insert(Notification), rows)
+
+
+def wake() -> None:
+    """Tells the in-process dispatcher that new rows were committed."""
+    _wake.set()
+
+
+def deliver_batch(
+    db: Session,
+    sender,
+    worker_id: str,
+    limit: int = NOTIFY_BATCH_SIZE,
+    max_attempts: int = NOTIFY_MAX_ATTEMPTS,
+) -> int:
+    """Claims, sends and records one batch; returns how many were handled."""
+    now = utcnow()
+    items = leases.claim(
+        db,
+        Notification,
+        [Notification.status == PENDING, Notification.next_attempt_at <= now],
+        Notification.next_attempt_at,
+        worker_id,
+        limit,
+        LEASE_SECONDS,
+        now,
+    )
+    if not items:
+        return 0
+
+    user_ids = {n.user_id for n in items}
+    phones = dict(db.execute(select(User.id, User.phone).where(User.id.in_(user_ids))).all())
+    messages = [OutgoingMessage(n.id, n.channel, phones.get(n.user_id), n.body) for n in items]
+
+    started = time.perf_counter()
+    sendable = [m for m in messages if m.to]
+    try:
+        sent_errors = sender.send_batch(sendable) if sendable else []
+    except Exception as e:
+        sent_errors = [f"{type(e).__name__}: {e}"] * len(sendable)
+    errors = dict(zip((m.id for m in sendable), sent_errors))
+    metrics.observe("notify.batch_seconds", time.perf_counter() - started)
+
+    done = utcnow()
+    for n in items:
+        error = errors.get(n.id, "No phone number for user.")
+        n.attempts += 1
+        n.locked_by = None
+        n.locked_until = None
+        n.last_error = error
+        if error is None:
+            n.status = SENT
+            n.sent_at = done
+            metrics.incr("notify.sent")
+            lag = done - _aware(n.created_at)
+            metrics.observe("notify.delivery_lag_seconds", lag.total_seconds())
+        elif n.attempts >= max_attempts:
+            n.status = FAILED
+            metrics.incr("notify.failed")
+            print(f"[NOTIFY] #{n.id} gave up after {n.attempts} attempts: {error}")
+        else:
+            n.next_attempt_at = done + timedelta(
+                seconds=RETRY_BASE_SECONDS * 2 ** (n.attempts - 1)
+            )
+            metrics.incr("notify.retried")
+    db.commit()
+    return len(items)
+
+
+class NotificationDispatcher:
+    """Background thread delivering the outbox."""
+
+    def __init__(
+        self,
+        sender,
+        worker_id: str,
+        poll_seconds: float = NOTIFY_POLL_SECONDS,
+        batch_size: int = NOTIFY_BATCH_SIZE,
+    ):
+        self.sender = sender
+        self.worker_id = worker_id
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="notification-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        _wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with SessionLocal() as db:
+                    handled = deliver_batch(db, self.sender, self.worker_id, self.batch_size)
+            except Exception as e:
+                print(f"[NOTIFY] dispatcher error: {e}")
+                handled = 0
+            if handled < self.batch_size:
+                _wake.wait(self.poll_seconds)
+                _wake.clear()
+
+
+dispatcher: Optional[NotificationDispatcher] = None
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def start_dispatcher() -> None:
+    global dispatcher
+    if dispatcher is None:
+        dispatcher = NotificationDispatcher(make_sender(), default_worker_id())
+        dispatcher.start()
+
+
+def stop_dispatcher() -> None:
+    global dispatcher
+    if dispatcher is not None:
+        dispatcher.stop()
+        dispatcher = None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Deliver pending notifications.")
+    parser.add_argument("--once", action="store_true", help="drain due notifications and exit")
+    parser.add_argument("--batch-size", type=int, default=NOTIFY_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    sender = make_sender()
+    worker_id = default_worker_id()
+
+    if args.once:
+        total = 0
+        while True:
+            with SessionLocal() as db:
+                handled = deliver_batch(db, sender, worker_id, args.batch_size)
+            total += handled
+            if handled == 0:
+                break
+        print(f"[NOTIFY] handled {total} notifications")
+        return
+
+    NotificationDispatcher(sender, worker_id, batch_size=args.batch_size)._run()
+
+
+if __name__ == "__main__":
+    main()
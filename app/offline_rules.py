@@ -0,0 +1,100 @@
+"""
+Rule-only replacements for the llm.py classifiers.
+
+Used when the LLM provider is unavailable (circuit open, LLM_OFFLINE=true)
+or a call fails. They are cruder than the LLM but answer instantly, so the
+assistant keeps working for the common flows: transfers to saved contacts,
+confirmations, balance and history.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from .amount_parser import parse_amount
+
+FALLBACK_REPLY = (
+    "I'm sorry, I can't answer that right now. "
+    "I can still make a transfer to your saved contacts, "
+    "tell you your balance or read your recent transfers."
+)
+
+_CONFIRM_RE = re.compile(
+    r"\b(yes|yeah|yep|sure|okay|ok|confirm|confirmed|correct|go ahead|do it|"
+    r"that's right|right|please do)\b"
+)
+_REJECT_RE = re.compile(
+    r"\b(no|nope|cancel|don't|do not|stop|never mind|nevermind|wrong)\b"
+)
+_END_RE = re.compile(
+    r"\b(bye|goodbye|that's all|that is all|nothing else|end the call|hang up)\b"
+)
+
+_BALANCE_RE = re.compile(r"\b(balance|how much (money )?(do )?i have|account status)\b")
+_HISTORY_RE = re.compile(
+    r"\b(history|recent transfers|last transfers|transactions|last \w+ transfers|"
+    r"show my (last )?transfers)\b"
+)
+_TRANSFER_RE = re.compile(r"\b(send|pay|paid|transfer|wire|give)\b")
+
+
+def rule_dialog_act(message: str) -> str:
+    """Same labels as llm.detect_confirmation_or_end."""
+    text = (message or "").lower()
+    if _END_RE.search(text):
+        return "end_call"
+    if _REJECT_RE.search(text):
+        return "reject"
+    if _CONFIRM_RE.search(text):
+        return "confirm"
+    return "none"
+
+
+def rule_intent(message: str) -> str:
+    """Same labels as llm.detect_intent."""
+    text = (message or "").lower()
+    if _TRANSFER_RE.search(text):
+        return "make_transfer"
+    if _HISTORY_RE.search(text):
+        return "show_history"
+    if _BALANCE_RE.search(text):
+        return "check_balance"
+    if parse_amount(text) is not None:
+        return "make_transfer"
+    return "other"
+
+
+def rule_match_contact(label: str, contacts: List[Dict[str, str]]) -> Optional[str]:
+    """
+    Deterministic version of llm.match_contact_label: returns the nickname
+    of the contact whose nickname, full name, first name or last name
+    appears in the label. Nicknames win over names; ambiguous -> None.
+    """
+    words = set(re.findall(r"[^\W\d_]+", (label or "").lower()))
+    if not words:
+        return None
+
+    def nickname_hit(c: Dict[str, str]) -> bool:
+        parts = (c.get("nickname") or "").lower().replace("_", " ").split()
+        return bool(parts) and all(p in words for p in parts)
+
+    hits = [c for c in contacts if nickname_hit(c)]
+    if len(hits) == 1:
+        return hits[0]["nickname"]
+
+    name_hits = [
+        c
+        for c in contacts
+        if any(part in words for part in (c.get("full_name") or "").lower().split())
+    ]
+    if len(name_hits) == 1:
+        return name_hits[0]["nickname"]
+
+    return None
+
+
+def rule_recipient(message: str) -> Optional[str]:
+    """
+    Without an LLM, the whole utterance is the recipient label;
+    rule_match_contact then looks for a known contact in it.
+    """
+    return (message or "").strip() or None
@@ -0,0 +1,136 @@
+"""
+Prompt assembly for all llm.py calls.
+
+- Every system prompt starts with the same SHARED_PREFIX, and the task text
+  after it never changes between calls, so the provider can prefix-cache it.
+  Anything per-turn (history, the customer's sentence) goes in the user message.
+- Each function gets its own history window (HISTORY_WINDOWS).
+- Long assistant replies are compacted before they are stored in the
+  conversation history (compact_reply), so they don't inflate later prompts.
+- Tokens sent are counted per call and per turn, and checked against a
+  per-function budget.
+"""
+
+import contextvars
+import math
+from typing import Dict, List, Optional, Tuple
+
+from . import metrics
+
+try:
+    import tiktoken  # optional dependency
+
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # pragma: no cover - depends on environment
+    _encoding = None
+
+SHARED_PREFIX = (
+    "You are part of VERA, the voice assistant of a bank.\n"
+    "The customer speaks English and talks to you over the phone.\n\n"
+)
+
+# How many history entries (user + assistant messages) each function sees.
+HISTORY_WINDOWS: Dict[str, int] = {
+    "detect_intent": 4,
+    "extract_recipient": 4,
+    "refers_to_same_amount_as_last_time": 4,
+    "detect_confirmation_or_end": 2,
+    "ask_llm": 0,
+    "match_contact_label": 0,
+}
+DEFAULT_HISTORY_WINDOW = 6
+
+# Soft input-token budget per call; exceeding it is logged and counted.
+TOKEN_BUDGETS: Dict[str, int] = {
+    "detect_intent": 500,
+    "extract_recipient": 450,
+    "refers_to_same_amount_as_last_time": 450,
+    "detect_confirmation_or_end": 450,
+    "match_contact_label": 600,
+    "ask_llm": 800,
+}
+
+# Longest assistant reply kept verbatim in the conversation history.
+MAX_STORED_REPLY_CHARS = 200
+
+_turn_tokens: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar(
+    "turn_tokens", default=None
+)
+
+
+def system_prompt(task: str) -> str:
+    return SHARED_PREFIX + task
+
+
+def format_history(history: Optional[List[Tuple[str, str]]], fn_name: str) -> str:
+    """Renders the last HISTORY_WINDOWS[fn_name] history entries as a transcript."""
+    window = HISTORY_WINDOWS.get(fn_name, DEFAULT_HISTORY_WINDOW)
+    if not history or window <= 0:
+        return ""
+
+    lines = []
+    for role, msg in history[-window:]:
+        who = "Customer" if role == "user" else "Assistant"
+        lines.append(f"{who}: {msg}")
+    return "\n".join(lines)
+
+
+def compact_reply(reply: str, max_chars: int = MAX_STORED_REPLY_CHARS) -> str:
+    """
+    Shortens an assistant reply for the conversation history.
+    Multi-line replies (e.g. transfer lists) are folded into one line and
+    anything over `max_chars` is cut at a word boundary.
+    """
+    lines = [line.strip() for line in (reply or "").splitlines() if line.strip()]
+    text = " ".join(
+        line if line[-1] in ".:!?" or i == len(lines) - 1 else line + "."
+        for i, line in enumerate(lines)
+    )
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut + " …"
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when installed, else a ~4 chars/token estimate."""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def build_messages(fn_name: str, system: str, user: str) -> List[Dict[str, str]]:
+    """
+    Builds the chat messages for one call and accounts for the tokens sent.
+    """
+    tokens = count_tokens(system) + count_tokens(user)
+
+    metrics.incr(f"llm.{fn_name}.calls")
+    metrics.incr(f"llm.{fn_name}.input_tokens", tokens)
+
+    budget = TOKEN_BUDGETS.get(fn_name)
+    if budget is not None and tokens > budget:
+        metrics.incr(f"llm.{fn_name}.over_budget")
+        print(f"[TOKENS] {fn_name} sent {tokens} tokens (budget {budget})")
+
+    turn = _turn_tokens.get()
+    if turn is not None:
+        turn[fn_name] = turn.get(fn_name, 0) + tokens
+
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
+
+
+def start_turn() -> contextvars.Token:
+    return _turn_tokens.set({})
+
+
+def end_turn(token: contextvars.Token) -> Dict[str, int]:
+    """Returns {fn_name: tokens} sent during the turn and records the total."""
+    sent = _turn_tokens.get() or {}
+    _turn_tokens.reset(token)
+    total = sum(sent.values())
+    metrics.observe("llm.turn_input_tokens", total)
+    return sent
@@ -0,0 +1,239 @@
+"""
+Offline replay of recorded assistant turns (see app/turn_recorder.py).
+
+Each recorded turn is re-run through process_message against a private
+in-memory SQLite database rebuilt from the turn's DB snapshot, with the
+recorded LLM answers fed back instead of calling Groq. The replayed
+(reply, intent, end_call) is compared with the recorded one.
+
+Turns are independent, so they are spread over a process pool.
+
+Usage:
+    python -m app.replay turns.ndjson --workers 8 --show-diffs 20
+
+Exits with status 1 if any turn behaves differently.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from . import event_log, llm, turn_recorder
+from .assistant import process_message
+from .assistant_utils import PendingTransfer, conversation_history, pending_transfers
+from .dialog_planner import dialog_states
+from .db import Base
+from .models import Account, Contact, ContactAlias, SpendingAggregate, Transaction, User
+
+SNAPSHOT_TABLES = [
+    ("users", User),
+    ("accounts", Account),
+    ("contacts", Contact),
+    ("transactions", Transaction),
+    ("spending_aggregates", SpendingAggregate),
+    ("contact_aliases", ContactAlias),
+]
+
+
+class ReplayMissingAnswer(RuntimeError):
+    """The replayed turn asked for an LLM answer that was not recorded."""
+
+
+@dataclass
+class ReplayResult:
+    index: int
+    matched: bool
+    latency_ms: float
+    recorded_latency_ms: float
+    diffs: List[str] = field(default_factory=list)
+    extra_calls: List[str] = field(default_factory=list)
+    unused_answers: int = 0
+    error: Optional[str] = None
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _load_snapshot(db: Session, snapshot: Dict[str, List[Dict[str, Any]]]) -> None:
+    for key, model in SNAPSHOT_TABLES:
+        rows = snapshot.get(key) or []
+        if not rows:
+            continue
+        date_columns = [
+            c.key for c in model.__table__.columns if c.type.python_type is datetime
+        ]
+        for row in rows:
+            for col in date_columns:
+                if isinstance(row.get(col), str):
+                    row[col] = datetime.fromisoformat(row[col])
+        db.execute(insert(model), rows)
+    db.commit()
+
+
+def _pending_from_dict(data: Optional[Dict[str, Any]]) -> Optional[PendingTransfer]:
+    if not data:
+        return None
+    known = {f.name for f in fields(PendingTransfer)}
+    return PendingTransfer(**{k: v for k, v in data.items() if k in known})
+
+
+def replay_turn(index: int, record: Dict[str, Any]) -> ReplayResult:
+    user_id = record["user_id"]
+    # Replays must not add turns or transfers to the audit log.
+    event_log.disable()
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+
+    answers: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+    for entry in record.get("llm", []):
+        answers[entry["fn"]].append(entry)
+    extra_calls: List[str] = []
+
+    def source(fn_name: str, request: Dict[str, Any]) -> str:
+        queue = answers.get(fn_name)
+        if not queue:
+            extra_calls.append(fn_name)
+            raise ReplayMissingAnswer(fn_name)
+        entry = queue.popleft()
+        if "error" in entry:
+            # The classifiers fall back to offline_rules only when the LLM
+            # was unavailable, so those errors have to replay as themselves.
+            for error_type in llm.UNAVAILABLE_ERRORS:
+                if entry["error"].startswith(f"{error_type.__name__}:"):
+                    raise error_type(entry["error"])
+            raise RuntimeError(entry["error"])
+        return entry["content"] or ""
+
+    conversation_history.clear()
+    pending_transfers.clear()
+    dialog_states.clear()
+    conversation_history[user_id] = [tuple(e) for e in record.get("history", [])]
+    pending = _pending_from_dict(record.get("pending"))
+    if pending is not None:
+        pending_transfers[user_id] = pending
+    if record.get("state") not in (None, "idle", "confirming"):
+        dialog_states[user_id] = record["state"]
+
+    llm.set_replay_source(source)
+    try:
+        with Session(engine) as db:
+            _load_snapshot(db, record.get("db", {}))
+            started = time.perf_counter()
+            try:
+                reply, intent, end_call = process_message(record["message"], user_id, db)
+                error = None
+            except Exception as e:
+                reply, intent, end_call = None, None, None
+                error = f"{type(e).__name__}: {e}"
+            latency_ms = (time.perf_counter() - started) * 1000
+    finally:
+        llm.set_replay_source(None)
+        engine.dispose()
+
+    expected = record.get("result") or {}
+    diffs = []
+    for key, actual in (("reply", reply), ("intent", intent), ("end_call", end_call)):
+        if expected.get(key) != actual:
+            diffs.append(f"{key}: recorded={expected.get(key)!r} replayed={actual!r}")
+
+    return ReplayResult(
+        index=index,
+        matched=not diffs and error is None,
+        latency_ms=latency_ms,
+        recorded_latency_ms=record.get("latency_ms", 0.0),
+        diffs=diffs,
+        extra_calls=extra_calls,
+        unused_answers=sum(len(q) for q in answers.values()),
+        error=error,
+    )
+
+
+def _replay_quietly(args) -> ReplayResult:
+    index, record = args
+    with contextlib.redirect_stdout(io.StringIO()):
+        return replay_turn(index, record)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run(path: str, workers: int, chunksize: int = 64) -> List[ReplayResult]:
+    jobs = list(enumerate(iter_records(path)))
+    if workers <= 1:
+        return [_replay_quietly(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_replay_quietly, jobs, chunksize=chunksize))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded assistant turns.")
+    parser.add_argument("path", help="NDJSON file written with TURN_RECORD_PATH")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--show-diffs", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if turn_recorder.enabled():
+        parser.error("unset TURN_RECORD_PATH when replaying")
+
+    started = time.perf_counter()
+    results = run(args.path, args.workers)
+    elapsed = time.perf_counter() - started
+
+    failed = [r for r in results if not r.matched]
+    latencies = [r.latency_ms for r in results]
+    recorded = [r.recorded_latency_ms for r in results]
+
+    print(f"[REPLAY] {len(results)} turns in {elapsed:.1f}s with {args.workers} workers")
+    print(f"[REPLAY] matched {len(results) - len(failed)}, different {len(failed)}")
+    print(
+        f"[REPLAY] replay latency p50={_percentile(latencies, 0.5):.2f}ms "
+        f"p95={_percentile(latencies, 0.95):.2f}ms "
+        f"(recorded p50={_percentile(recorded, 0.5):.0f}ms "
+        f"p95={_percentile(recorded, 0.95):.0f}ms)"
+    )
+    print(
+        f"[REPLAY] LLM calls not made anymore: {sum(r.unused_answers for r in results)}, "
+        f"new LLM calls: {sum(len(r.extra_calls) for r in results)}"
+    )
+
+    for r in failed[: args.show_diffs]:
+        print(f"--- turn #{r.index}")
+        if r.error:
+            print(f"    error: {r.error}")
+        for diff in r.diffs:
+            print(f"    {diff}")
+        if r.extra_calls:
+            print(f"    unrecorded LLM calls: {', '.join(r.extra_calls)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
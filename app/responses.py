@@ -0,0 +1,38 @@
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson  # optional dependency
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serializes plain Python data (dicts, lists, datetimes) to JSON bytes,
+    using orjson when it is installed and the stdlib otherwise.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response that skips Pydantic validation and FastAPI's
+    jsonable_encoder. Content must already be plain dicts / lists.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
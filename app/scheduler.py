@@ -0,0 +1,367 @@
+"""
+Scheduled and recurring transfers (models.ScheduledTransfer).
+
+Rules (all times UTC):
+  - 'interval:<seconds>'
+  - 'cron:<minute> <hour> <day of month> <month> <day of week>'
+    (numbers, '*', lists, ranges and '/step'; weekday 0 or 7 = Sunday)
+
+The worker (python -m app.scheduler) repeatedly
+  1. claims up to SCHEDULER_BATCH_SIZE due items: an indexed query on
+     (active, next_run_at), then a lease (locked_by / locked_until) on the
+     rows nobody else holds (see app/leases.py),
+  2. executes the claimed transfers with banking.perform_transfers and
+     advances next_run_at / releases the lease in the same DB transaction.
+
+Several workers can run against the same database: a row is executed by
+the worker whose lease token is on it, and an item whose worker died is
+picked up again once its lease expires.
+"""
+
+import argparse
+import os
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import inspect, true, update
+from sqlalchemy.orm import Session
+
+from . import banking, event_log, leases, metrics
+from .config import SCHEDULER_BATCH_SIZE, SCHEDULER_LEASE_SECONDS, SCHEDULER_POLL_SECONDS
+from .db import SessionLocal
+from .models import ScheduledTransfer
+
+INTERVAL = "interval"
+CRON = "cron"
+
+# (minute, hour, day of month, month, day of week) value ranges.
+CRON_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _utc(dt: datetime) -> datetime:
+    """SQLite returns naive datetimes; all stored times are UTC."""
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _parse_cron_field(text: str, lo: int, hi: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+        if part == "*":
+            start, end = lo, hi
+        elif "-" in part:
+            a, b = part.split("-", 1)
+            start, end = int(a), int(b)
+        else:
+            start = int(part)
+            end = hi if step > 1 else start
+        if step < 1 or start < lo or end > hi or start > end:
+            raise ValueError(f"Invalid cron field {text!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+@dataclass(frozen=True)
+class CronRule:
+    minutes: Tuple[int, ...]
+    hours: Tuple[int, ...]
+    days: Set[int]
+    months: Set[int]
+    weekdays: Set[int]  # 0 = Sunday
+    any_day: bool
+    any_weekday: bool
+
+    def day_matches(self, d: datetime) -> bool:
+        if d.month not in self.months:
+            return False
+        dom = d.day in self.days
+        dow = (d.isoweekday() % 7) in self.weekdays
+        # Standard cron: if both fields are restricted, either may match.
+        if self.any_day:
+            return dow
+        if self.any_weekday:
+            return dom
+        return dom or dow
+
+    def next_after(self, after: datetime) -> datetime:
+        start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(366 * 5):
+            if self.day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError("Cron rule never fires")
+
+
+def parse_cron(expr: str) -> CronRule:
+    parts = expr.split()
+    if len(parts) != 5:
+        raise ValueError(f"Cron rule needs 5 fields: {expr!r}")
+    minutes, hours, days, months, weekdays = (
+        _parse_cron_field(text, lo, hi) for text, (lo, hi) in zip(parts, CRON_FIELDS)
+    )
+    return CronRule(
+        minutes=tuple(sorted(minutes)),
+        hours=tuple(sorted(hours)),
+        days=days,
+        months=months,
+        weekdays={d % 7 for d in weekdays},
+        any_day=parts[2] == "*",
+        any_weekday=parts[4] == "*",
+    )
+
+
+def parse_rule(rule: str) -> Tuple[str, object]:
+    """Validates a rule; returns (kind, seconds or CronRule)."""
+    kind, _, spec = (rule or "").partition(":")
+    if kind == INTERVAL:
+        seconds = int(spec)
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        return INTERVAL, seconds
+    if kind == CRON:
+        return CRON, parse_cron(spec)
+    raise ValueError(f"Unknown schedule rule {rule!r}")
+
+
+def next_run(rule: str, previous: datetime, now: Optional[datetime] = None) -> datetime:
+    """
+    First run strictly after `now` (default: `previous`). Runs missed while
+    no worker was up are skipped, not executed in a burst.
+    """
+    previous = _utc(previous)
+    now = _utc(now) if now is not None else previous
+    kind, spec = parse_rule(rule)
+    if kind == INTERVAL:
+        if previous > now:
+            return previous
+        skipped = int((now - previous).total_seconds() // spec) + 1
+        return previous + timedelta(seconds=spec * skipped)
+    return spec.next_after(max(previous, now))
+
+
+def describe_rule(rule: str) -> str:
+    """Spoken form of the rules created by voice ('every month on day 5')."""
+    kind, spec = parse_rule(rule)
+    if kind == INTERVAL:
+        return f"every {spec} seconds"
+    fields = rule.partition(":")[2].split()
+    if fields[2] != "*" and fields[4] == "*":
+        return f"every month on day {fields[2]}"
+    if fields[4] != "*" and fields[2] == "*":
+        return f"every week on {WEEKDAYS[(int(fields[4]) - 1) % 7]}"
+    if fields[2] == "*" and fields[4] == "*":
+        return "every day"
+    return "on schedule " + " ".join(fields)
+
+
+def create_scheduled_transfer(
+    db: Session,
+    user_id: str,
+    amount: float,
+    recipient_name: str,
+    recipient_iban: str,
+    title: str,
+    rule: str,
+    first_run_at: Optional[datetime] = None,
+) -> ScheduledTransfer:
+    if amount <= 0:
+        raise ValueError("Transfer amount must be positive.")
+    now = utcnow()
+    item = ScheduledTransfer(
+        user_id=user_id,
+        amount=amount,
+        recipient_name=recipient_name,
+        recipient_iban=recipient_iban,
+        title=title,
+        rule=rule,
+        next_run_at=first_run_at or next_run(rule, now),
+        active=True,
+        runs=0,
+    )
+    db.add(item)
+    db.commit()
+    db.refresh(item)
+    event_log.emit(
+        "standing_order_created",
+        user_id,
+        scheduled_transfer_id=item.id,
+        amount=amount,
+        recipient_name=recipient_name,
+        recipient_iban=recipient_iban,
+        title=title,
+        rule=rule,
+        first_run_at=_utc(item.next_run_at).isoformat(),
+    )
+    return item
+
+
+def claim_due(
+    db: Session, worker_id: str, limit: int, lease_seconds: int, now: Optional[datetime] = None
+) -> List[ScheduledTransfer]:
+    """Leases up to `limit` due items to this worker and returns them."""
+    now = now or utcnow()
+    return leases.claim(
+        db,
+        ScheduledTransfer,
+        [ScheduledTransfer.active == true(), ScheduledTransfer.next_run_at <= now],
+        ScheduledTransfer.next_run_at,
+        worker_id,
+        limit,
+        lease_seconds,
+        now,
+    )
+
+
+def execute_claimed(db: Session, items: List[ScheduledTransfer]) -> Dict[str, int]:
+    """
+    Runs the claimed transfers as one batch and reschedules them; the
+    transfers and the schedule updates are committed together, and only
+    while this worker's lease on the items still holds.
+    """
+    if not items:
+        return {"ok": 0, "failed": 0}
+
+    now = utcnow()
+    # The token as loaded by the claim: reading the attribute after an
+    # expiring commit would reload it and could return another worker's.
+    token = inspect(items[0]).dict.get("locked_by")
+    held = leases.hold(db, ScheduledTransfer, [item.id for item in items], token, now)
+    lost = [item for item in items if item.id not in held]
+    if lost:
+        print(f"[SCHEDULER] lease expired on {len(lost)} items, skipping them")
+        metrics.incr("scheduler.lease_lost", len(lost))
+        items = [item for item in items if item.id in held]
+        if not items:
+            db.rollback()
+            return {"ok": 0, "failed": 0}
+
+    outcomes = banking.perform_transfers(
+        db,
+        [
+            {
+                "user_id": item.user_id,
+                "amount": item.amount,
+                "recipient_name": item.recipient_name,
+                "recipient_iban": item.recipient_iban,
+                "title": item.title,
+            }
+            for item in items
+        ],
+        commit=False,
+    )
+
+    ok = 0
+    for item, outcome in zip(items, outcomes):
+        result = db.execute(
+            update(ScheduledTransfer)
+            .where(ScheduledTransfer.id == item.id, ScheduledTransfer.locked_by == token)
+            .values(
+                runs=ScheduledTransfer.runs + 1,
+                last_run_at=now,
+                last_error=outcome.error,
+                next_run_at=next_run(item.rule, item.next_run_at, now),
+                locked_by=None,
+                locked_until=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            db.rollback()
+            print(f"[SCHEDULER] lost the lease on #{item.id}, batch rolled back")
+            metrics.incr("scheduler.lease_lost", len(items))
+            return {"ok": 0, "failed": 0}
+        if outcome.ok:
+            ok += 1
+        else:
+            print(f"[SCHEDULER] #{item.id} for {item.user_id} failed: {outcome.error}")
+    db.commit()
+
+    for item, outcome in zip(items, outcomes):
+        event_log.emit(
+            "transfer" if outcome.ok else "transfer_rejected",
+            item.user_id,
+            source="standing_order",
+            scheduled_transfer_id=item.id,
+            amount=item.amount,
+            recipient_name=item.recipient_name,
+            recipient_iban=item.recipient_iban,
+            title=item.title,
+            balance=outcome.balance,
+            error=outcome.error,
+        )
+
+    metrics.incr("scheduler.executed", ok)
+    metrics.incr("scheduler.failed", len(items) - ok)
+    return {"ok": ok, "failed": len(items) - ok}
+
+
+def run_once(
+    worker_id: str,
+    batch_size: int = SCHEDULER_BATCH_SIZE,
+    lease_seconds: int = SCHEDULER_LEASE_SECONDS,
+) -> int:
+    """Claims and executes one batch; returns how many items were run."""
+    with SessionLocal() as db:
+        items = claim_due(db, worker_id, batch_size, lease_seconds)
+        execute_claimed(db, items)
+        return len(items)
+
+
+def run_forever(
+    worker_id: str,
+    batch_size: int = SCHEDULER_BATCH_SIZE,
+    poll_seconds: float = SCHEDULER_POLL_SECONDS,
+    lease_seconds: int = SCHEDULER_LEASE_SECONDS,
+) -> None:
+    print(f"[SCHEDULER] worker {worker_id} started (batch={batch_size}, poll={poll_seconds}s)")
+    while True:
+        try:
+            done = run_once(worker_id, batch_size, lease_seconds)
+        except Exception as e:
+            print(f"[SCHEDULER] batch failed: {e}")
+            done = 0
+        if done < batch_size:
+            time.sleep(poll_seconds)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Execute scheduled transfers.")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--batch-size", type=int, default=SCHEDULER_BATCH_SIZE)
+    parser.add_argument("--poll-seconds", type=float, default=SCHEDULER_POLL_SECONDS)
+    parser.add_argument("--lease-seconds", type=int, default=SCHEDULER_LEASE_SECONDS)
+    parser.add_argument("--once", action="store_true", help="drain due items and exit")
+    args = parser.parse_args(argv)
+
+    if args.once:
+        total = 0
+        while True:
+            done = run_once(args.worker_id, args.batch_size, args.lease_seconds)
+            total += done
+            if done == 0:
+                break
+        print(f"[SCHEDULER] executed {total} due transfers")
+        return
+
+    run_forever(args.worker_id, args.batch_size, args.poll_seconds, args.lease_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -37,6 +37,25 @@ class TransferRequest(BaseModel):
     title: str
 
 
+class BatchTransferRequest(BaseModel):
+    transfers: List[TransferRequest]
+    # Reject the whole batch if any transfer fails validation.
+    atomic: bool = False
+
+
+class TransferResult(BaseModel):
+    index: int
+    ok: bool
+    error: Optional[str] = None
+    balance: Optional[float] = None
+
+
+class BatchTransferResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[TransferResult]
+
+
 class TransactionOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
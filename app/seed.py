@@ -1,6 +1,15 @@
+import argparse
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Tuple
+
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, insert, func
 
+from . import spending
+from .db import SessionLocal, init_db
 from .models import User, Account, Transaction, Contact
 
 
@@ -152,3 +161,314 @@ def seed_demo_data(db: Session) -> None:
         acc.balance -= amount
 
     db.commit()
+    spending.rebuild(db, ["user-1"])
+
+
+FIRST_NAMES = [
+    "Anna", "Piotr", "Maria", "Tomasz", "Katarzyna", "Pawel", "Agnieszka",
+    "Michael", "Barbara", "Andrew", "Joanna", "Krzysztof", "Ewa", "Adam",
+    "Magdalena", "Marek", "Zofia", "Jan", "Helena", "Robert",
+]
+
+LAST_NAMES = [
+    "Smith", "Nowak", "Kowalski", "Wisniewski", "Green", "Wojcik", "Kaminski",
+    "Lewandowski", "Zielinski", "Szymanski", "Brown", "Dabrowski", "Mazur",
+]
+
+# (nickname, default title) pairs used for family / friends contacts.
+PERSONAL_CONTACTS = [
+    ("mom", "Transfer for mom"),
+    ("dad", "Transfer for dad"),
+    ("grandson", "Gift for grandson"),
+    ("granddaughter", "Gift for granddaughter"),
+    ("son", "Transfer for son"),
+    ("daughter", "Transfer for daughter"),
+    ("neighbor", "Loan for neighbor"),
+    ("sister", "Transfer for sister"),
+    ("brother", "Transfer for brother"),
+]
+
+# (nickname, full name, default title, typical amount) for recurring payees.
+BILL_CONTACTS = [
+    ("rent", "Green Housing Cooperative", "Apartment rent", 700.0),
+    ("electricity", "PGE Energy", "Electricity bill", 100.0),
+    ("phone", "Orange Telecom", "Phone subscription", 60.0),
+    ("internet", "UPC Internet", "Home internet", 40.0),
+    ("child_support_fund", "Child Support Fund", "Payment to child support fund", 2.0),
+]
+
+# (full name, title, typical amount) for one-off payees that are not contacts.
+MERCHANTS = [
+    ("Helios Cinema", "Cinema night", 30.0),
+    ("Charity WOSP", "Charity donation", 10.0),
+    ("MPK Lodz", "Monthly ticket", 3.0),
+    ("Biedronka", "Groceries", 80.0),
+    ("Apteka Zdrowie", "Pharmacy", 35.0),
+    ("Allegro", "Online shopping", 120.0),
+]
+
+
+# Transaction histories end here rather than at the current time, so the
+# same seed gives the same rows whenever it is run.
+BULK_HISTORY_END = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class BulkSeedStats:
+    users: int = 0
+    contacts: int = 0
+    transactions: int = 0
+    seconds: float = 0.0
+
+
+def _random_iban(rng: random.Random) -> str:
+    return "PL" + "".join(rng.choice("0123456789") for _ in range(26))
+
+
+def _transaction_count(
+    rng: random.Random, mean: float, alpha: float, max_count: int
+) -> int:
+    """
+    Draws a per-user transaction count from a Pareto distribution, so that
+    most users have short histories and a few have very long ones.
+    The scale is chosen so that the (uncapped) mean equals `mean`.
+    """
+    scale = mean * (alpha - 1) / alpha
+    return max(1, min(max_count, int(scale * rng.paretovariate(alpha))))
+
+
+def _next_bulk_index(db: Session) -> int:
+    stmt = select(func.count()).select_from(User).where(User.id.like("bulk-user-%"))
+    return int(db.execute(stmt).scalar_one()) + 1
+
+
+def seed_bulk_data(
+    db: Session,
+    users: int,
+    seed: int = 42,
+    mean_transactions: float = 200.0,
+    max_transactions: int = 50_000,
+    alpha: float = 1.5,
+    history_days: int = 730,
+    history_end: datetime = BULK_HISTORY_END,
+    batch_size: int = 10_000,
+    progress: Optional[Callable[[str], None]] = print,
+) -> BulkSeedStats:
+    """
+    Generates `users` synthetic users, each with an account, a handful of
+    contacts and a power-law-distributed transaction history.
+
+    Rows are written with Core bulk INSERTs in batches of `batch_size`,
+    bypassing the ORM unit of work. The same `seed` always produces the same
+    data; transaction dates lie in the `history_days` before `history_end`. Can be run repeatedly; new users continue the 'bulk-user-N' numbering.
+    """
+    rng = random.Random(seed)
+    stats = BulkSeedStats()
+    started = time.perf_counter()
+    first_index = _next_bulk_index(db)
+    report_every = max(1, users // 20)
+
+    user_rows: List[dict] = []
+    account_rows: List[dict] = []
+    contact_rows: List[dict] = []
+    tx_rows: List[dict] = []
+
+    def flush(force: bool = False) -> None:
+        children_due = (
+            force or len(contact_rows) >= batch_size or len(tx_rows) >= batch_size
+        )
+        # Contacts and transactions reference their users (foreign keys), so
+        # pending users and accounts are always inserted before them.
+        if user_rows and (children_due or len(user_rows) >= batch_size):
+            db.execute(insert(User), user_rows)
+            db.execute(insert(Account), account_rows)
+            user_rows.clear()
+            account_rows.clear()
+        if contact_rows and (force or len(contact_rows) >= batch_size):
+            db.execute(insert(Contact), contact_rows)
+            contact_rows.clear()
+        if tx_rows and (force or len(tx_rows) >= batch_size):
+            db.execute(insert(Transaction), tx_rows)
+            tx_rows.clear()
+
+    for n in range(first_index, first_index + users):
+        user_id = f"bulk-user-{n:07d}"
+        last_name = rng.choice(LAST_NAMES)
+
+        user_rows.append(
+            {
+                "id": user_id,
+                "name": f"{rng.choice(FIRST_NAMES)} {last_name}",
+                "pesel": "".join(rng.choice("0123456789") for _ in range(11)),
+                "pin_code": f"{rng.randrange(10_000):04d}",
+                "phone": f"+48{rng.randrange(10**9):09d}",
+            }
+        )
+
+        # (full name, iban, title, typical amount, is_bill)
+        payees: List[Tuple[str, str, str, float, bool]] = []
+
+        for nickname, title in rng.sample(PERSONAL_CONTACTS, rng.randint(2, 5)):
+            full_name = f"{rng.choice(FIRST_NAMES)} {last_name}"
+            iban = _random_iban(rng)
+            contact_rows.append(
+                {
+                    "user_id": user_id,
+                    "nickname": nickname,
+                    "full_name": full_name,
+                    "iban": iban,
+                    "default_title": title,
+                }
+            )
+            payees.append((full_name, iban, title, rng.choice([20, 50, 100, 200]), False))
+
+        for nickname, full_name, title, amount in rng.sample(
+            BILL_CONTACTS, rng.randint(1, len(BILL_CONTACTS))
+        ):
+            iban = _random_iban(rng)
+            contact_rows.append(
+                {
+                    "user_id": user_id,
+                    "nickname": nickname,
+                    "full_name": full_name,
+                    "iban": iban,
+                    "default_title": title,
+                }
+            )
+            payees.append((full_name, iban, title, amount * rng.uniform(0.8, 1.5), True))
+
+        for full_name, title, amount in MERCHANTS:
+            payees.append((full_name, _random_iban(rng), title, amount, False))
+
+        stats.contacts += len(payees) - len(MERCHANTS)
+
+        # Zipf-like popularity: the first payees are picked far more often.
+        rng.shuffle(payees)
+        weights = [1.0 / (rank + 1) for rank in range(len(payees))]
+
+        count = _transaction_count(rng, mean_transactions, alpha, max_transactions)
+        spent = 0.0
+        for _ in range(count):
+            full_name, iban, title, typical, is_bill = rng.choices(payees, weights)[0]
+            if is_bill:
+                amount = round(typical, 2)
+            else:
+                amount = round(max(1.0, rng.lognormvariate(0, 0.6) * typical), 2)
+            spent += amount
+            tx_rows.append(
+                {
+                    "sender_id": user_id,
+                    "recipient_name": full_name,
+                    "recipient_iban": iban,
+                    "title": title,
+                    "amount": amount,
+                    "timestamp": history_end
+                    - timedelta(seconds=rng.randrange(history_days * 86_400)),
+                }
+            )
+        stats.transactions += count
+
+        account_rows.append(
+            {
+                "id": f"bulk-acc-{n:07d}",
+                "user_id": user_id,
+                "iban": _random_iban(rng),
+                "balance": round(rng.uniform(500, 50_000), 2),
+                "currency": "PLN",
+            }
+        )
+        stats.users += 1
+
+        flush()
+
+        if progress and (stats.users % report_every == 0 or stats.users == users):
+            elapsed = time.perf_counter() - started
+            progress(
+                f"[SEED] users {stats.users}/{users}, "
+                f"transactions {stats.transactions} "
+                f"({stats.transactions / elapsed if elapsed else 0:.0f} rows/s)"
+            )
+
+    flush(force=True)
+    db.commit()
+
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def _utc_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    CLI entry point and migration step:
+      python -m app.seed                       -> schema + demo data
+      python -m app.seed --migrate-only        -> schema only
+      python -m app.seed --users 10000 --seed 7 -> schema + demo data + bulk data
+      python -m app.seed --rebuild-aggregates  -> recompute spending aggregates
+    """
+    parser = argparse.ArgumentParser(description="Seed the VERA database.")
+    parser.add_argument(
+        "--migrate-only", action="store_true", help="create the schema only"
+    )
+    parser.add_argument("--users", type=int, default=0, help="bulk users to generate")
+    parser.add_argument("--seed", type=int, default=42, help="RNG seed")
+    parser.add_argument("--mean-transactions", type=float, default=200.0)
+    parser.add_argument("--max-transactions", type=int, default=50_000)
+    parser.add_argument("--alpha", type=float, default=1.5, help="Pareto shape")
+    parser.add_argument("--history-days", type=int, default=730)
+    parser.add_argument(
+        "--history-end",
+        type=_utc_datetime,
+        default=BULK_HISTORY_END,
+        help="ISO date the generated histories end at",
+    )
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument(
+        "--rebuild-aggregates",
+        action="store_true",
+        help="recompute spending aggregates of all users from their transactions",
+    )
+    args = parser.parse_args(argv)
+
+    if init_db():
+        print("[SEED] Schema created")
+    else:
+        print("[SEED] Schema already migrated")
+
+    if args.migrate_only:
+        return
+
+    with SessionLocal() as db:
+        seed_demo_data(db)
+
+        if args.users > 0:
+            first = _next_bulk_index(db)
+            stats = seed_bulk_data(
+                db,
+                users=args.users,
+                seed=args.seed,
+                mean_transactions=args.mean_transactions,
+                max_transactions=args.max_transactions,
+                alpha=args.alpha,
+                history_days=args.history_days,
+                history_end=args.history_end,
+                batch_size=args.batch_size,
+            )
+            print(
+                f"[SEED] Done: {stats.users} users, {stats.contacts} contacts, "
+                f"{stats.transactions} transactions in {stats.seconds:.1f}s"
+            )
+            spending.rebuild(
+                db, (f"bulk-user-{n:07d}" for n in range(first, first + stats.users))
+            )
+
+        if args.rebuild_aggregates:
+            rows = spending.rebuild(db)
+            print(f"[SEED] Rebuilt {rows} spending aggregate rows")
+
+
+if __name__ == "__main__":
+    main()
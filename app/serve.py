@@ -0,0 +1,115 @@
+"""
+Multi-worker launcher.
+
+Starts N single-process uvicorn workers on local ports and the sticky
+dispatcher (app/dispatcher.py) on the public port, so that all webhooks of
+one call are handled by the worker that holds the call's state:
+
+    python -m app.serve --workers 4 --port 8000
+
+`uvicorn --workers N` is not supported: it load-balances connections without
+affinity, so successive webhooks of a call can land on a worker that has
+never seen it.
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import List
+
+import httpx
+import uvicorn
+
+from .dispatcher import StickyDispatcher
+
+
+def wait_until_healthy(backends: List[str], timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    pending = list(backends)
+    while pending:
+        backend = pending[0]
+        try:
+            if httpx.get(backend + "/health", timeout=1.0).status_code == 200:
+                pending.pop(0)
+                continue
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Worker {backend} did not become healthy")
+        time.sleep(0.2)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run VERA with N sticky workers.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--worker-port-base",
+        type=int,
+        default=None,
+        help="first local worker port (default: --port + 1)",
+    )
+    parser.add_argument(
+        "--migrate",
+        action="store_true",
+        help="create the schema and seed demo data once before starting workers",
+    )
+    args = parser.parse_args(argv)
+
+    if args.migrate:
+        from .seed import main as seed_main
+
+        seed_main([])
+
+    base = args.worker_port_base or args.port + 1
+    ports = [base + i for i in range(args.workers)]
+    backends = [f"http://127.0.0.1:{p}" for p in ports]
+
+    # Workers must not race each other creating the schema.
+    env = dict(os.environ, AUTO_MIGRATE="false")
+    procs = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "app.main:app",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(port),
+                "--no-access-log",
+                "--log-level",
+                "warning",
+            ],
+            env=env,
+        )
+        for port in ports
+    ]
+
+    # uvicorn re-raises SIGTERM after its graceful shutdown; turn it into
+    # SystemExit so the workers below are still stopped.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        wait_until_healthy(backends)
+        print(f"[SERVE] {args.workers} workers ready on ports {ports[0]}-{ports[-1]}")
+        uvicorn.run(
+            StickyDispatcher(backends),
+            host=args.host,
+            port=args.port,
+            log_level="warning",
+        )
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Single-flight: concurrent calls with the same key share one execution.
+
+The first caller of a key runs the function; callers arriving while it is
+still running wait for it and get the same result (or exception). Nothing
+is cached: once the call finishes, the next caller runs it again.
+
+Each group exports `singleflight.<name>.calls` (executions) and
+`singleflight.<name>.shared` (duplicates that were suppressed) to /metrics.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar
+
+from . import metrics
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class Group:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if leader:
+            metrics.incr(f"singleflight.{self.name}.calls")
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            metrics.incr(f"singleflight.{self.name}.shared")
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,125 @@
+"""
+Speculative classifier calls on Twilio's partial speech results.
+
+With TWILIO_SPECULATION the <Gather> of /twilio/voice asks Twilio to post
+partial results to /twilio/voice/partial while the caller is still
+speaking. Every new StableSpeechResult starts, in the background, the
+classifier calls the current dialogue state needs (dialog_planner.TurnPlan)
+on that text; the latest speculation is kept per CallSid.
+
+When the final SpeechResult reaches process_message, take() hands the
+speculation to the turn's TurnPlan if it was made on the same words
+(ignoring case and punctuation), in the same dialogue state and with the
+same conversation history. The turn then waits for those results instead
+of calling the LLM again; otherwise it classifies as usual. /metrics shows
+speculation.hits / speculation.misses and the speculation.hit_rate gauge.
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from . import admission, dialog_planner, metrics
+from .assistant_utils import conversation_history, pending_transfers
+
+# Speculations of calls that never sent a final result are dropped after this.
+SPECULATION_TTL_SECONDS = 60
+
+_WORD_RE = re.compile(r"[\w']+")
+
+
+@dataclass
+class Speculation:
+    text: str
+    state: str
+    history: List[Tuple[str, str]]
+    started: float
+    results: Future
+
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculation")
+_latest: Dict[str, Speculation] = {}
+_lock = threading.Lock()
+_lookups = 0
+_hits = 0
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase words only: 'What's my balance?' -> "what's my balance"."""
+    return " ".join(_WORD_RE.findall((text or "").lower()))
+
+
+def _classify(
+    user_id: str, text: str, history: List[Tuple[str, str]], urgent: bool
+) -> Dict[str, str]:
+    # A hit makes the phone turn wait for these calls, so they are admitted
+    # like that turn's own: as the caller, at VOICE (CONFIRMATION if urgent).
+    with admission.priority(admission.VOICE):
+        tokens = admission.start_turn(user_id, urgent=urgent)
+        try:
+            return dialog_planner.TurnPlan(user_id, text, history, speculative=True).classify()
+        finally:
+            admission.end_turn(tokens)
+
+
+def speculate(call_id: Optional[str], user_id: str, text: Optional[str]) -> bool:
+    """Starts classifying a partial result unless it was already started."""
+    key = normalize(text)
+    if not call_id or not key:
+        return False
+
+    now = time.monotonic()
+    with _lock:
+        current = _latest.get(call_id)
+        if current is not None and current.text == key:
+            return False
+        for sid, spec in list(_latest.items()):
+            if now - spec.started > SPECULATION_TTL_SECONDS:
+                del _latest[sid]
+        history = list(conversation_history[user_id])
+        state = dialog_planner.current_state(user_id)
+        urgent = user_id in pending_transfers
+        future = _executor.submit(_classify, user_id, text, history, urgent)
+        _latest[call_id] = Speculation(key, state, history, now, future)
+
+    metrics.incr("speculation.started")
+    print(f"[SPECULATION] call {call_id}: classifying {text!r} (state={state})")
+    return True
+
+
+def _count_lookup(hit: bool) -> None:
+    global _lookups, _hits
+    with _lock:
+        _lookups += 1
+        _hits += hit
+        rate = _hits / _lookups
+    metrics.incr("speculation.hits" if hit else "speculation.misses")
+    metrics.gauge("speculation.hit_rate", rate)
+
+
+def take(call_id: Optional[str], user_id: str, message: str) -> Optional[Future]:
+    """
+    The call's speculation (a Future of {function name: result}) if it
+    matches the final message, else None. Either way it is used up.
+    """
+    if not call_id:
+        return None
+    with _lock:
+        spec = _latest.pop(call_id, None)
+    if spec is None:
+        return None
+
+    hit = (
+        spec.text == normalize(message)
+        and spec.state == dialog_planner.current_state(user_id)
+        and spec.history == list(conversation_history[user_id])
+    )
+    _count_lookup(hit)
+    if hit:
+        print(f"[SPECULATION] call {call_id}: hit for {message!r}")
+        return spec.results
+    print(f"[SPECULATION] call {call_id}: miss, speculated {spec.text!r}, final {message!r}")
+    return None
@@ -0,0 +1,176 @@
+"""
+Streaming speech interfaces for the Twilio Media Streams endpoint
+(app/api/twilio_stream.py).
+
+Audio is Twilio's format both ways: 8 kHz, 8-bit mu-law, mono.
+
+  - StreamingRecognizer: fed raw caller audio as it arrives, returns the
+    transcripts (partial and final) that audio produced.
+  - Synthesizer: turns a reply into mu-law audio for the caller.
+
+Engines are picked by STREAM_ASR / STREAM_TTS ('<name>' or '<name>:<arg>')
+from ASR_ENGINES / TTS_ENGINES; a real provider is added with
+register_asr_engine / register_tts_engine. Built in are stand-ins for local
+runs and load tests:
+
+  - 'replay:<file>' plays back the utterances in <file> (one per line) as if
+    the caller spoke them: partial transcripts grow word by word with the
+    audio received, the final one follows after a pause.
+  - 'silence' renders every reply as silence of roughly its spoken length,
+    so playback marks and barge-in behave as with real audio.
+  - 'pyttsx3' speaks with the local pyttsx3 engine (optional package, as in
+    helpers/voice_agent.py); also used to pre-render prompts, see
+    app/audio_cache.py.
+"""
+
+import os
+import tempfile
+import wave
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Protocol
+
+from .config import STREAM_ASR, STREAM_TTS
+
+SAMPLE_RATE = 8000
+# One mu-law byte per sample.
+BYTES_PER_SECOND = SAMPLE_RATE
+MULAW_SILENCE = b"\xff"
+
+
+@dataclass(frozen=True)
+class Transcript:
+    text: str
+    is_final: bool
+
+
+class StreamingRecognizer(Protocol):
+    def feed(self, audio: bytes) -> List[Transcript]: ...
+
+    def close(self) -> List[Transcript]: ...
+
+
+class Synthesizer(Protocol):
+    def synthesize(self, text: str) -> bytes: ...
+
+
+class ReplayRecognizer:
+    """Scripted caller: utterances are 'heard' as caller audio arrives."""
+
+    def __init__(
+        self,
+        utterances: List[str],
+        words_per_second: float = 3.0,
+        final_pause_seconds: float = 0.8,
+        gap_seconds: float = 1.0,
+    ):
+        self.utterances = [u.split() for u in utterances if u.strip()]
+        self.words_per_second = words_per_second
+        self.final_pause_seconds = final_pause_seconds
+        self.gap_seconds = gap_seconds
+        self._index = 0
+        # Seconds of audio received since the current utterance started.
+        self._elapsed = -gap_seconds
+        self._words_sent = 0
+
+    def feed(self, audio: bytes) -> List[Transcript]:
+        self._elapsed += len(audio) / BYTES_PER_SECOND
+        out: List[Transcript] = []
+        while self._index < len(self.utterances) and self._elapsed >= 0:
+            words = self.utterances[self._index]
+            heard = min(len(words), int(self._elapsed * self.words_per_second) + 1)
+            if heard > self._words_sent:
+                self._words_sent = heard
+                out.append(Transcript(" ".join(words[:heard]), is_final=False))
+            spoken = len(words) / self.words_per_second
+            if self._elapsed < spoken + self.final_pause_seconds:
+                break
+            out.append(Transcript(" ".join(words), is_final=True))
+            self._elapsed -= spoken + self.final_pause_seconds + self.gap_seconds
+            self._index += 1
+            self._words_sent = 0
+        return out
+
+    def close(self) -> List[Transcript]:
+        if self._index < len(self.utterances) and self._words_sent:
+            words = self.utterances[self._index][: self._words_sent]
+            self._index = len(self.utterances)
+            return [Transcript(" ".join(words), is_final=True)]
+        return []
+
+
+class SilenceSynthesizer:
+    """Silence as long as the text would take to say (about 2.5 words/s)."""
+
+    words_per_second = 2.5
+
+    def synthesize(self, text: str) -> bytes:
+        seconds = max(0.5, len(text.split()) / self.words_per_second)
+        return MULAW_SILENCE * int(seconds * BYTES_PER_SECOND)
+
+
+def to_mulaw(pcm: bytes, width: int, channels: int, rate: int) -> bytes:
+    """Linear PCM to 8 kHz mono mu-law (needs audioop / audioop-lts)."""
+    import audioop
+
+    if channels == 2:
+        pcm = audioop.tomono(pcm, width, 0.5, 0.5)
+    if rate != SAMPLE_RATE:
+        pcm, _ = audioop.ratecv(pcm, width, 1, rate, SAMPLE_RATE, None)
+    return audioop.lin2ulaw(pcm, width)
+
+
+class Pyttsx3Synthesizer:
+    """Local text-to-speech (pyttsx3), converted to phone audio."""
+
+    def synthesize(self, text: str) -> bytes:
+        import pyttsx3
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "speech.wav")
+            engine = pyttsx3.init()
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+            with wave.open(path, "rb") as f:
+                pcm = f.readframes(f.getnframes())
+                return to_mulaw(pcm, f.getsampwidth(), f.getnchannels(), f.getframerate())
+
+
+def _replay_engine(arg: Optional[str]) -> ReplayRecognizer:
+    if not arg:
+        raise ValueError("STREAM_ASR=replay needs a transcript file: replay:<path>")
+    with open(arg, encoding="utf-8") as f:
+        return ReplayRecognizer(f.read().splitlines())
+
+
+ASR_ENGINES: Dict[str, Callable[[Optional[str]], StreamingRecognizer]] = {
+    "replay": _replay_engine,
+}
+TTS_ENGINES: Dict[str, Callable[[Optional[str]], Synthesizer]] = {
+    "silence": lambda arg: SilenceSynthesizer(),
+    "pyttsx3": lambda arg: Pyttsx3Synthesizer(),
+}
+
+
+def register_asr_engine(name: str, factory: Callable[[Optional[str]], StreamingRecognizer]) -> None:
+    ASR_ENGINES[name] = factory
+
+
+def register_tts_engine(name: str, factory: Callable[[Optional[str]], Synthesizer]) -> None:
+    TTS_ENGINES[name] = factory
+
+
+def _make(engines: Dict[str, Callable], spec: str, setting: str):
+    name, _, arg = (spec or "").partition(":")
+    factory = engines.get(name)
+    if factory is None:
+        raise ValueError(f"{setting}={spec!r}: unknown engine (known: {', '.join(engines)})")
+    return factory(arg or None)
+
+
+def make_recognizer(spec: str = STREAM_ASR) -> StreamingRecognizer:
+    """A new recognizer for one call."""
+    return _make(ASR_ENGINES, spec, "STREAM_ASR")
+
+
+def make_synthesizer(spec: str = STREAM_TTS) -> Synthesizer:
+    return _make(TTS_ENGINES, spec, "STREAM_TTS")
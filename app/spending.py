@@ -0,0 +1,324 @@
+"""
+Per-user spending aggregates (models.SpendingAggregate).
+
+Totals are updated incrementally in the same DB transaction as the
+transfer (banking.perform_transfer), so questions like "how much did I
+spend on rent this year" are answered from a handful of pre-summed rows
+instead of a scan of the transaction history.
+
+  - record_transfer / apply_deltas / apply_deltas_many: incremental updates
+  - rebuild: backfill from the transactions table (python -m app.seed --rebuild-aggregates)
+  - get_aggregates / total_spent: query API
+  - spending_context: compact text summary for ask_llm
+"""
+
+import re
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, extract, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import SpendingAggregate, Transaction
+
+RECIPIENT = "recipient"
+CATEGORY = "category"
+MONTH = "month"
+
+# Key of the single bucket per month.
+ALL = "*"
+
+# First category with a keyword among the title's words wins.
+CATEGORY_KEYWORDS: List[Tuple[str, Tuple[str, ...]]] = [
+    ("housing", ("rent", "housing", "apartment")),
+    ("bills", ("bill", "electricity", "phone", "internet", "subscription")),
+    ("groceries", ("groceries", "grocery", "food")),
+    ("shopping", ("shopping", "refund")),
+    ("transport", ("ticket", "fuel", "taxi")),
+    ("health", ("pharmacy", "doctor", "medicine")),
+    ("entertainment", ("cinema", "concert", "netflix")),
+    ("charity", ("charity", "donation", "fund")),
+    ("family", ("mom", "dad", "grandson", "granddaughter", "son", "daughter",
+                "sister", "brother", "gift")),
+    ("loans", ("loan",)),
+]
+OTHER = "other"
+
+Bucket = Tuple[str, str, str]  # (dimension, period, key)
+
+
+def categorize(title: Optional[str]) -> str:
+    words = set(re.findall(r"[a-z]+", (title or "").lower()))
+    for category, keywords in CATEGORY_KEYWORDS:
+        if words.intersection(keywords):
+            return category
+    return OTHER
+
+
+def buckets_for(recipient_name: str, title: Optional[str], when: datetime) -> List[Bucket]:
+    year = f"{when.year:04d}"
+    return [
+        (RECIPIENT, year, recipient_name),
+        (CATEGORY, year, categorize(title)),
+        (MONTH, f"{year}-{when.month:02d}", ALL),
+    ]
+
+
+def _add_to_buckets(db: Session, rows: List[dict]) -> None:
+    """
+    Adds each row's total / count to its bucket in the database, creating
+    missing buckets. Atomic per bucket, so concurrent transfers neither lose
+    updates nor fail on uq_spending_bucket when they create the same bucket.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+
+        stmt = upsert(SpendingAggregate)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "dimension", "period", "key"],
+            set_={
+                "total": SpendingAggregate.total + stmt.excluded.total,
+                "count": SpendingAggregate.count + stmt.excluded.count,
+            },
+        )
+        db.execute(stmt, rows)
+        return
+
+    # Other databases: increment in place, insert if missing, and increment
+    # again if a concurrent transaction inserted the bucket first.
+    for row in rows:
+        increment = (
+            update(SpendingAggregate)
+            .where(
+                SpendingAggregate.user_id == row["user_id"],
+                SpendingAggregate.dimension == row["dimension"],
+                SpendingAggregate.period == row["period"],
+                SpendingAggregate.key == row["key"],
+            )
+            .values(
+                total=SpendingAggregate.total + row["total"],
+                count=SpendingAggregate.count + row["count"],
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if db.execute(increment).rowcount:
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(insert(SpendingAggregate), [row])
+        except IntegrityError:
+            db.execute(increment)
+
+
+def _rows(user_id: str, deltas: Dict[Bucket, Tuple[float, int]]) -> List[dict]:
+    return [
+        {
+            "user_id": user_id,
+            "dimension": dimension,
+            "period": period,
+            "key": key,
+            "total": total,
+            "count": count,
+        }
+        for (dimension, period, key), (total, count) in deltas.items()
+    ]
+
+
+def apply_deltas(
+    db: Session, user_id: str, deltas: Dict[Bucket, Tuple[float, int]]
+) -> None:
+    """
+    Adds (total, count) to each bucket, creating missing ones.
+    Does not commit: runs inside the caller's transaction.
+    """
+    if deltas:
+        _add_to_buckets(db, _rows(user_id, deltas))
+
+
+def apply_deltas_many(
+    db: Session,
+    deltas_by_user: Dict[str, Dict[Bucket, Tuple[float, int]]],
+    chunk_size: int = 500,
+) -> None:
+    """
+    apply_deltas for many users at once (batch transfers): one statement
+    per chunk of users. Does not commit.
+    """
+    rows = [row for u, deltas in deltas_by_user.items() for row in _rows(u, deltas)]
+    for i in range(0, len(rows), chunk_size):
+        _add_to_buckets(db, rows[i : i + chunk_size])
+
+
+def record_transfer(
+    db: Session,
+    user_id: str,
+    recipient_name: str,
+    title: Optional[str],
+    amount: float,
+    when: Optional[datetime] = None,
+) -> None:
+    when = when or datetime.now(timezone.utc)
+    apply_deltas(
+        db,
+        user_id,
+        {bucket: (amount, 1) for bucket in buckets_for(recipient_name, title, when)},
+    )
+
+
+def rebuild(db: Session, user_ids: Optional[Iterable[str]] = None, chunk_size: int = 500) -> int:
+    """
+    Recomputes the aggregates from the transactions table, for the given
+    users (in chunks, to keep IN lists short) or for everyone.
+    Returns the number of aggregate rows written.
+    """
+    if user_ids is None:
+        written = _rebuild_chunk(db, None)
+    else:
+        user_ids = list(user_ids)
+        written = sum(
+            _rebuild_chunk(db, user_ids[i : i + chunk_size])
+            for i in range(0, len(user_ids), chunk_size)
+        )
+    db.commit()
+    return written
+
+
+def _rebuild_chunk(db: Session, user_ids: Optional[List[str]]) -> int:
+    t = Transaction.__table__.c
+    year = extract("year", t.timestamp)
+    month = extract("month", t.timestamp)
+    stmt = select(
+        t.sender_id,
+        t.recipient_name,
+        t.title,
+        year,
+        month,
+        func.sum(t.amount),
+        func.count(),
+    ).group_by(t.sender_id, t.recipient_name, t.title, year, month)
+
+    clear = delete(SpendingAggregate)
+    if user_ids is not None:
+        stmt = stmt.where(t.sender_id.in_(user_ids))
+        clear = clear.where(SpendingAggregate.user_id.in_(user_ids))
+
+    totals: Dict[Tuple[str, str, str, str], List[float]] = defaultdict(lambda: [0.0, 0])
+    for sender_id, recipient_name, title, y, m, amount, count in db.execute(stmt):
+        when = datetime(int(y), int(m), 1)
+        for dimension, period, key in buckets_for(recipient_name, title, when):
+            acc = totals[(sender_id, dimension, period, key)]
+            acc[0] += amount
+            acc[1] += count
+
+    db.execute(clear)
+    rows = [
+        {
+            "user_id": user_id,
+            "dimension": dimension,
+            "period": period,
+            "key": key,
+            "total": round(total, 2),
+            "count": count,
+        }
+        for (user_id, dimension, period, key), (total, count) in totals.items()
+    ]
+    if rows:
+        db.execute(insert(SpendingAggregate), rows)
+    return len(rows)
+
+
+def get_aggregates(
+    db: Session,
+    user_id: str,
+    dimension: str,
+    period: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[SpendingAggregate]:
+    """Buckets of one dimension, largest total first (months: newest first)."""
+    stmt = select(SpendingAggregate).where(
+        SpendingAggregate.user_id == user_id,
+        SpendingAggregate.dimension == dimension,
+    )
+    if period is not None:
+        stmt = stmt.where(SpendingAggregate.period == period)
+    if dimension == MONTH:
+        stmt = stmt.order_by(SpendingAggregate.period.desc())
+    else:
+        stmt = stmt.order_by(SpendingAggregate.total.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return list(db.execute(stmt).scalars())
+
+
+def total_spent(
+    db: Session, user_id: str, dimension: str, period: str, key: str = ALL
+) -> Tuple[float, int]:
+    """(total, count) of one bucket; (0.0, 0) if nothing was spent."""
+    stmt = select(SpendingAggregate.total, SpendingAggregate.count).where(
+        SpendingAggregate.user_id == user_id,
+        SpendingAggregate.dimension == dimension,
+        SpendingAggregate.period == period,
+        SpendingAggregate.key == key,
+    )
+    row = db.execute(stmt).first()
+    return (row[0], row[1]) if row else (0.0, 0)
+
+
+def _join(rows: List[SpendingAggregate], top: int) -> str:
+    return ", ".join(f"{r.key} {r.total:.2f} ({r.count})" for r in rows[:top])
+
+
+def spending_context(
+    db: Session,
+    user_id: str,
+    currency: str = "PLN",
+    today: Optional[datetime] = None,
+    top: int = 5,
+) -> str:
+    """
+    A few lines summarising the user's spending, for the ask_llm context.
+    Reads at most ~13 month rows plus this year's recipient/category rows.
+    """
+    today = today or datetime.now(timezone.utc)
+    year = f"{today.year:04d}"
+    this_month = f"{year}-{today.month:02d}"
+
+    months = get_aggregates(db, user_id, MONTH, limit=13)
+    if not months:
+        return ""
+
+    lines = [f"Spending summary (outgoing transfers, {currency}; amounts with transfer counts):"]
+
+    current = next((m for m in months if m.period == this_month), None)
+    lines.append(
+        f"This month ({this_month}): {current.total if current else 0.0:.2f} "
+        f"({current.count if current else 0})"
+    )
+
+    previous = [m for m in months if m.period < this_month][:3]
+    if previous:
+        lines.append(
+            "Previous months: " + ", ".join(f"{m.period} {m.total:.2f}" for m in previous)
+        )
+
+    year_months = [m for m in months if m.period.startswith(year + "-")]
+    lines.append(
+        f"This year ({year}): {sum(m.total for m in year_months):.2f} "
+        f"({sum(m.count for m in year_months)})"
+    )
+
+    categories = get_aggregates(db, user_id, CATEGORY, period=year)
+    if categories:
+        lines.append("This year by category: " + _join(categories, top))
+
+    recipients = get_aggregates(db, user_id, RECIPIENT, period=year)
+    if recipients:
+        lines.append("This year by recipient: " + _join(recipients, top))
+
+    return "\n".join(lines)
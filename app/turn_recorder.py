@@ -0,0 +1,134 @@
+"""
+Records assistant turns to NDJSON for offline replay (see app/replay.py).
+
+Enabled by setting TURN_RECORD_PATH. Each line holds one turn:
+  - the customer message and user id
+  - the conversation history, pending transfer and dialogue state before
+    the turn
+  - a snapshot of the user's DB rows (user, account, contacts, transactions,
+    spending aggregates, learned contact aliases)
+  - every LLM answer given during the turn, in order, per llm.py function
+  - the result (reply, intent, end_call) and the turn latency
+"""
+
+import contextvars
+import json
+import threading
+import time
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .config import TURN_RECORD_PATH
+from .models import Account, Contact, ContactAlias, SpendingAggregate, Transaction, User
+
+# Transactions kept in a snapshot; enough for history and 'same as last time'.
+SNAPSHOT_TRANSACTIONS = 200
+
+_current: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "turn_record", default=None
+)
+_file_lock = threading.Lock()
+_file = None
+
+
+def enabled() -> bool:
+    return bool(TURN_RECORD_PATH)
+
+
+def _row_dict(obj: Any) -> Dict[str, Any]:
+    data = {}
+    for column in obj.__table__.columns:
+        value = getattr(obj, column.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        data[column.key] = value
+    return data
+
+
+def snapshot_user(db: Session, user_id: str) -> Dict[str, Any]:
+    user = db.execute(select(User).where(User.id == user_id)).scalar_one_or_none()
+    accounts = db.execute(select(Account).where(Account.user_id == user_id)).scalars()
+    contacts = db.execute(select(Contact).where(Contact.user_id == user_id)).scalars()
+    transactions = db.execute(
+        select(Transaction)
+        .where(Transaction.sender_id == user_id)
+        .order_by(Transaction.timestamp.desc())
+        .limit(SNAPSHOT_TRANSACTIONS)
+    ).scalars()
+    aggregates = db.execute(
+        select(SpendingAggregate).where(SpendingAggregate.user_id == user_id)
+    ).scalars()
+    aliases = db.execute(select(ContactAlias).where(ContactAlias.user_id == user_id)).scalars()
+    return {
+        "users": [_row_dict(user)] if user else [],
+        "accounts": [_row_dict(a) for a in accounts],
+        "contacts": [_row_dict(c) for c in contacts],
+        "transactions": [_row_dict(t) for t in transactions],
+        "spending_aggregates": [_row_dict(a) for a in aggregates],
+        "contact_aliases": [_row_dict(a) for a in aliases],
+    }
+
+
+def start(
+    db: Session,
+    user_id: str,
+    message: str,
+    history: List[Any],
+    pending: Any,
+    state: Optional[str] = None,
+) -> Optional[contextvars.Token]:
+    """Begins recording a turn; returns None when recording is disabled."""
+    if not enabled():
+        return None
+    record = {
+        "recorded_at": datetime.now().isoformat(),
+        "user_id": user_id,
+        "message": message,
+        "history": [list(entry) for entry in history],
+        "pending": asdict(pending) if pending is not None else None,
+        "state": state,
+        "db": snapshot_user(db, user_id),
+        "llm": [],
+        "_started": time.perf_counter(),
+    }
+    return _current.set(record)
+
+
+def record_llm(fn_name: str, content: Optional[str], error: Optional[str] = None) -> None:
+    """Called by llm._complete for every answer (or error) during a turn."""
+    record = _current.get()
+    if record is None:
+        return
+    entry: Dict[str, Any] = {"fn": fn_name, "content": content}
+    if error is not None:
+        entry["error"] = error
+    record["llm"].append(entry)
+
+
+def finish(token: Optional[contextvars.Token], result: Optional[tuple]) -> None:
+    if token is None:
+        return
+    record = _current.get()
+    _current.reset(token)
+    if record is None:
+        return
+
+    record["latency_ms"] = round((time.perf_counter() - record.pop("_started")) * 1000, 2)
+    if result is not None:
+        reply, intent, end_call = result
+        record["result"] = {"reply": reply, "intent": intent, "end_call": end_call}
+    else:
+        record["result"] = None
+
+    line = json.dumps(record, ensure_ascii=False)
+
+    global _file
+    with _file_lock:
+        if _file is None:
+            _file = open(TURN_RECORD_PATH, "a", encoding="utf-8")
+        _file.write(line + "\n")
+        _file.flush()
@@ -0,0 +1,90 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .config import (
+    TWILIO_ACCOUNT_SID,
+    TWILIO_API_KEY,
+    TWILIO_API_SECRET,
+    TWIML_APP_SID,
+    TWILIO_TOKEN_TTL,
+    TWILIO_TOKEN_REFRESH_MARGIN,
+)
+
+
+class VoiceTokenCache:
+    """
+    Per-identity cache of signed Twilio Voice SDK access tokens.
+
+    Minting a token means building an AccessToken, adding a VoiceGrant and
+    signing a JWT. A token is valid for `ttl` seconds, so the same JWT is
+    handed out until `refresh_margin` seconds before it expires, after which
+    a fresh one is minted. Callers therefore always get at least
+    `refresh_margin` seconds of validity.
+    """
+
+    MAX_IDENTITIES = 10_000
+
+    def __init__(
+        self,
+        ttl: int = TWILIO_TOKEN_TTL,
+        refresh_margin: int = TWILIO_TOKEN_REFRESH_MARGIN,
+    ):
+        if refresh_margin >= ttl:
+            raise ValueError("Token refresh margin must be shorter than the TTL.")
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def mint(self, identity: str) -> str:
+        from twilio.jwt.access_token import AccessToken
+        from twilio.jwt.access_token.grants import VoiceGrant
+
+        token = AccessToken(
+            TWILIO_ACCOUNT_SID,
+            TWILIO_API_KEY,
+            TWILIO_API_SECRET,
+            identity=identity,
+            ttl=self.ttl,
+        )
+        token.add_grant(VoiceGrant(outgoing_application_sid=TWIML_APP_SID))
+
+        jwt = token.to_jwt()
+        if isinstance(jwt, bytes):
+            jwt = jwt.decode()
+        return jwt
+
+    def get(self, identity: str, now: Optional[float] = None) -> str:
+        now = time.time() if now is None else now
+
+        cached = self._tokens.get(identity)
+        if cached and now < cached[1] - self.refresh_margin:
+            self.hits += 1
+            return cached[0]
+
+        with self._lock:
+            cached = self._tokens.get(identity)
+            if cached and now < cached[1] - self.refresh_margin:
+                self.hits += 1
+                return cached[0]
+
+            jwt = self.mint(identity)
+            self.misses += 1
+
+            if len(self._tokens) >= self.MAX_IDENTITIES:
+                self._tokens = {
+                    k: v for k, v in self._tokens.items() if v[1] - self.refresh_margin > now
+                }
+            # Twilio stamps tokens with whole-second issue times.
+            self._tokens[identity] = (jwt, int(now) + self.ttl)
+            return jwt
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+
+
+voice_tokens = VoiceTokenCache()
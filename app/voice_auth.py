@@ -1,5 +1,10 @@
 from collections import defaultdict
-from twilio.twiml.voice_response import VoiceResponse, Gather
+from typing import TYPE_CHECKING
+
+from .audio_cache import say_or_play
+
+if TYPE_CHECKING:
+    from twilio.twiml.voice_response import VoiceResponse, Gather
 
 
 class VoiceAuthenticator:
@@ -22,7 +27,9 @@ class VoiceAuthenticator:
         self.auth_step[user_id] = 0
         self.attempts[user_id] = 0
 
-    def handle(self, user_id: str, message: str, user) -> VoiceResponse:
+    def handle(self, user_id: str, message: str, user) -> "VoiceResponse":
+        from twilio.twiml.voice_response import VoiceResponse
+
         message = message or ""
         digits_all = "".join(ch for ch in message if ch.isdigit())
         digits = digits_all[-4:] if len(digits_all) >= 4 else digits_all
@@ -77,30 +84,32 @@ class VoiceAuthenticator:
         if digits == user.pin_code:
             print("[AUTH] PIN OK → SUCCESS")
             self.auth_step[user_id] = 3
-            resp.say("Authentication successful. Redirecting you now.")
+            say_or_play(resp, "Authentication successful. Redirecting you now.")
             resp.redirect("/twilio/voice")
             return resp
         return self._retry(
             resp, user_id, "Incorrect PIN. Please repeat your four-digit PIN."
         )
 
-    def _ask(self, resp: VoiceResponse, action: str, text: str) -> VoiceResponse:
+    def _ask(self, resp: "VoiceResponse", action: str, text: str) -> "VoiceResponse":
         gather = self._gather(action)
-        gather.say(text)
+        say_or_play(gather, text)
         resp.append(gather)
         return resp
 
-    def _retry(self, resp: VoiceResponse, user_id: str, msg: str) -> VoiceResponse:
+    def _retry(self, resp: "VoiceResponse", user_id: str, msg: str) -> "VoiceResponse":
         self.attempts[user_id] += 1
         if self.attempts[user_id] >= self.MAX_ATTEMPTS:
             print("[AUTH] Too many attempts — hangup")
-            resp.say("Authentication failed. Ending session for your security.")
+            say_or_play(resp, "Authentication failed. Ending session for your security.")
             resp.hangup()
             self.reset(user_id)
             return resp
         return self._ask(resp, "/auth/voice", msg)
 
-    def _gather(self, action: str) -> Gather:
+    def _gather(self, action: str) -> "Gather":
+        from twilio.twiml.voice_response import Gather
+
         return Gather(
             input="speech",
             language="en-US",
@@ -0,0 +1,74 @@
+"""
+Deadline-bounded assistant turns for the Twilio webhook.
+
+Every spoken turn runs on a background thread with its own DB session.
+The webhook waits up to TWILIO_TURN_DEADLINE_SECONDS for the reply; if it
+is not ready, the turn is parked under an id and the webhook answers with
+a short filler and a <Redirect> to /twilio/voice/result, which picks the
+reply up once the turn finishes.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Optional, Tuple
+
+from . import admission, metrics
+from .assistant import process_message
+from .db import SessionLocal
+
+# Parked turns nobody came back for (caller hung up) are dropped after this.
+PARKED_TURN_TTL_SECONDS = 300
+
+TurnResult = Tuple[str, Optional[str], bool]
+
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="voice-turn")
+_parked: Dict[str, Tuple[float, Future]] = {}
+_lock = threading.Lock()
+
+
+def _run_turn(message: str, user_id: str, call_id: Optional[str]) -> TurnResult:
+    db = SessionLocal()
+    try:
+        with admission.priority(admission.VOICE):
+            return process_message(message, user_id, db, call_id=call_id)
+    finally:
+        db.close()
+
+
+def start(message: str, user_id: str, call_id: Optional[str] = None) -> Future:
+    return _executor.submit(_run_turn, message, user_id, call_id)
+
+
+def wait(future: Future, timeout: float) -> Optional[TurnResult]:
+    """Returns the turn result, or None if it is not ready within `timeout`."""
+    try:
+        return future.result(timeout=max(timeout, 0.0))
+    except FutureTimeout:
+        return None
+
+
+def park(future: Future) -> str:
+    """Keeps a running turn for a later /twilio/voice/result request."""
+    turn_id = uuid.uuid4().hex
+    now = time.monotonic()
+    with _lock:
+        for key, (parked_at, _) in list(_parked.items()):
+            if now - parked_at > PARKED_TURN_TTL_SECONDS:
+                del _parked[key]
+        _parked[turn_id] = (now, future)
+    metrics.incr("twilio.turns_parked")
+    return turn_id
+
+
+def get_parked(turn_id: str) -> Optional[Future]:
+    with _lock:
+        entry = _parked.get(turn_id)
+    return entry[1] if entry else None
+
+
+def release(turn_id: str) -> None:
+    with _lock:
+        _parked.pop(turn_id, None)
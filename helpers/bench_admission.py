@@ -0,0 +1,80 @@
+"""
+Benchmark: LLM latency per priority when the provider's rate limit is the
+bottleneck.
+
+Installs an AdmissionController with --rpm against a simulated upstream
+(see bench_llm_batching.py), starts --chat web-chat calls and, slightly
+later, --voice phone-turn calls, all from distinct users, and reports the
+admission wait per class. With priorities, voice calls overtake the chat
+backlog; run with --no-priority to see them queue behind it.
+
+Usage:
+    python helpers/bench_admission.py --rpm 600 --chat 200 --voice 50
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app import admission, llm  # noqa: E402
+from bench_llm_batching import SimulatedUpstream  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rpm", type=int, default=600)
+    parser.add_argument("--chat", type=int, default=200)
+    parser.add_argument("--voice", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--no-priority", action="store_true")
+    args = parser.parse_args()
+
+    llm._client = SimulatedUpstream(64, args.latency_ms / 1000)
+    llm.set_batching(0)
+    controller = admission.AdmissionController(rpm=args.rpm, tpm=0, per_user=1, timeout=600)
+    # Start with an empty bucket so the limit applies from the first call.
+    controller.buckets[0][0].tokens = 0
+    admission.controller = controller
+
+    latencies = {"chat": [], "voice": []}
+    lock = threading.Lock()
+
+    def call(kind: str, n: int) -> None:
+        level = admission.VOICE if kind == "voice" and not args.no_priority else admission.CHAT
+        tokens = admission.start_turn(f"{kind}-user-{n}")
+        try:
+            with admission.priority(level):
+                started = time.perf_counter()
+                llm.detect_confirmation_or_end(f"{kind} message {n}")
+                elapsed = time.perf_counter() - started
+        finally:
+            admission.end_turn(tokens)
+        with lock:
+            latencies[kind].append(elapsed)
+
+    threads = [threading.Thread(target=call, args=("chat", n)) for n in range(args.chat)]
+    for t in threads:
+        t.start()
+    time.sleep(0.2)
+    voice = [threading.Thread(target=call, args=("voice", n)) for n in range(args.voice)]
+    for t in voice:
+        t.start()
+    for t in threads + voice:
+        t.join()
+
+    for kind, values in latencies.items():
+        values.sort()
+        print(
+            f"{kind:<6} calls={len(values):<5} p50={statistics.median(values):6.2f}s "
+            f"p95={values[int(len(values) * 0.95)]:6.2f}s max={values[-1]:6.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: cost of event_log.emit() on the caller and sustained write rate
+of the background writer.
+
+Emits --events turn-sized events from --threads threads into a throw-away
+log file, reports the per-call emit latency seen by the callers, the time
+until everything is on disk, and checks the hash chain.
+
+Usage:
+    python helpers/bench_event_log.py --events 100000 --threads 4
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["EVENT_LOG_PATH"] = os.path.join(tmp, "events.db")
+        from app import event_log
+
+        event_log._writer = event_log.EventLogWriter(
+            event_log.EVENT_LOG_PATH, batch_size=args.batch_size, max_queue=args.events + 1
+        )
+        per_thread = args.events // args.threads
+        latencies = [[] for _ in range(args.threads)]
+
+        def worker(n: int) -> None:
+            out = latencies[n]
+            for i in range(per_thread):
+                started = time.perf_counter()
+                event_log.emit(
+                    "turn",
+                    f"bulk-user-{(n * per_thread + i) % 5000:07d}",
+                    message="send 20 zloty to mom",
+                    intent="make_transfer",
+                    reply="Do you want to send 20.00 PLN to Anna Nowak?",
+                    end_call=False,
+                    latency_ms=412.5,
+                )
+                out.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        emitted = time.perf_counter() - started
+        event_log.flush()
+        written = time.perf_counter() - started
+
+        all_latencies = sorted(x for xs in latencies for x in xs)
+        total = len(all_latencies)
+        p99 = all_latencies[int(total * 0.99)]
+        count, bad = event_log.verify(event_log.EVENT_LOG_PATH)
+        event_log.close()
+
+        print(
+            f"emit: mean {statistics.mean(all_latencies) * 1e6:.1f}us, "
+            f"p99 {p99 * 1e6:.1f}us ({total / emitted:,.0f} events/s from {args.threads} threads)"
+        )
+        print(f"written: {count:,} events in {written:.2f}s ({count / written:,.0f} events/s)")
+        print(f"hash chain: {'OK' if bad is None else f'broken at {bad}'}")
+
+
+if __name__ == "__main__":
+    main()
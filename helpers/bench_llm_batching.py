@@ -0,0 +1,95 @@
+"""
+Benchmark: classifier throughput with and without micro-batching.
+
+Replaces the Groq client with a simulated upstream that allows --connections
+concurrent requests taking --latency-ms each (a rate-limited account), then
+runs --calls detect_confirmation_or_end calls from --threads concurrent
+"turns" for every --windows value (0 = batching off) and reports calls/s,
+upstream requests and the per-call latency.
+
+Usage:
+    python helpers/bench_llm_batching.py --threads 64 --windows 0 5 10
+"""
+
+import argparse
+import re
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app import llm  # noqa: E402
+
+ITEM_RE = re.compile(r"^ITEM (\d+):", re.MULTILINE)
+
+
+class SimulatedUpstream:
+    def __init__(self, connections: int, latency: float):
+        self.slots = threading.Semaphore(connections)
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        with self._lock:
+            self.requests += 1
+        items = ITEM_RE.findall(request["messages"][-1]["content"])
+        with self.slots:
+            time.sleep(self.latency)
+        content = "\n".join(f"{n}: none" for n in items) if items else "none"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def run(threads: int, calls: int, window_ms: float, max_size: int, upstream) -> None:
+    llm.set_batching(window_ms, max_size)
+    llm._client = upstream
+    upstream.requests = 0
+    per_thread = calls // threads
+    latencies = [[] for _ in range(threads)]
+
+    def turn(n: int) -> None:
+        for i in range(per_thread):
+            started = time.perf_counter()
+            llm.detect_confirmation_or_end(f"tell me a joke number {n}-{i}")
+            latencies[n].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=turn, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    done = sorted(x for xs in latencies for x in xs)
+    print(
+        f"window={window_ms:>4}ms  {len(done) / elapsed:7.1f} calls/s  "
+        f"upstream requests={upstream.requests:<5} "
+        f"latency p50={statistics.median(done) * 1000:.0f}ms "
+        f"p95={done[int(len(done) * 0.95)] * 1000:.0f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--calls", type=int, default=1280)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 5, 10])
+    parser.add_argument("--max-size", type=int, default=16)
+    args = parser.parse_args()
+
+    upstream = SimulatedUpstream(args.connections, args.latency_ms / 1000)
+    for window in args.windows:
+        run(args.threads, args.calls, window, args.max_size, upstream)
+
+
+if __name__ == "__main__":
+    main()
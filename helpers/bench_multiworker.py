@@ -0,0 +1,129 @@
+"""
+Benchmark: assistant turns/sec with 1..N sticky workers (python -m app.serve).
+
+Seeds a throw-away SQLite database with bulk users, then for every worker
+count starts the launcher with LLM_OFFLINE=true (rule-only classifiers, so
+the benchmark measures our own code, not Groq) and drives /assistant/chat
+from many concurrent callers for a fixed time.
+
+Usage:
+    python helpers/bench_multiworker.py --workers 1 2 4 8 --seconds 10
+
+Scaling is bounded by the number of cores: on a machine with C cores,
+expect roughly linear gains up to about C - 1 workers (the dispatcher
+needs a core too).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MESSAGES = [
+    "what is my balance",
+    "show my last 3 transfers",
+    "how much money do i have",
+    "show my recent transfers",
+]
+
+
+def seed(database_url: str, users: int) -> None:
+    env = dict(os.environ, DATABASE_URL=database_url)
+    subprocess.run(
+        [sys.executable, "-m", "app.seed", "--users", str(users), "--mean-transactions", "50"],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def wait_for(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+async def drive(base_url: str, users: int, callers: int, seconds: float) -> int:
+    done = 0
+    stop_at = time.monotonic() + seconds
+
+    async def caller(n: int, client: httpx.AsyncClient) -> None:
+        nonlocal done
+        rng = random.Random(n)
+        while time.monotonic() < stop_at:
+            user_id = f"bulk-user-{rng.randint(1, users):07d}"
+            r = await client.post(
+                "/assistant/chat",
+                json={"user_id": user_id, "message": rng.choice(MESSAGES)},
+            )
+            r.raise_for_status()
+            done += 1
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        await asyncio.gather(*(caller(n, client) for n in range(callers)))
+    return done
+
+
+def run_one(workers: int, port: int, database_url: str, args) -> float:
+    env = dict(os.environ, DATABASE_URL=database_url, LLM_OFFLINE="true", GROQ_API_KEY="bench")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers), "--port", str(port)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_for(base_url + "/health")
+        # Warm-up, so imports and connection pools are not measured.
+        asyncio.run(drive(base_url, args.users, args.callers, 1.0))
+        turns = asyncio.run(drive(base_url, args.users, args.callers, args.seconds))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=15)
+    return turns / args.seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--callers", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8700)
+    args = parser.parse_args()
+
+    print(f"cores: {os.cpu_count()}")
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        seed(database_url, args.users)
+
+        baseline = None
+        for workers in args.workers:
+            rate = run_one(workers, args.port, database_url, args)
+            baseline = baseline or rate
+            speedup = rate / baseline
+            print(
+                f"workers={workers:<3} {rate:8.1f} turns/s  "
+                f"speedup {speedup:4.2f}x  efficiency {speedup / workers * 100:5.1f}%"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark: due-item throughput of the scheduled transfers worker.
+
+Seeds a throw-away SQLite database with bulk users, inserts --items
+standing orders that are all due, then runs --workers scheduler processes
+(python -m app.scheduler --once) against it at the same time and checks
+that every item was executed exactly once.
+
+Usage:
+    python helpers/bench_scheduler.py --items 20000 --workers 1 4 --batch-size 200
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+TITLE = "Benchmark standing order"
+
+
+def prepare(path: str, users: int, items: int) -> None:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}")
+    subprocess.run(
+        [sys.executable, "-m", "app.seed", "--users", str(users), "--mean-transactions", "5"],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+    rng = random.Random(1)
+    due = (datetime.now(timezone.utc) - timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S.%f")
+    con = sqlite3.connect(path)
+    con.executemany(
+        "INSERT INTO scheduled_transfers (user_id, recipient_name, recipient_iban, title,"
+        " amount, rule, next_run_at, active, runs) VALUES (?, ?, ?, ?, ?, ?, ?, 1, 0)",
+        [
+            (
+                f"bulk-user-{rng.randint(1, users):07d}",
+                "Green Housing Cooperative",
+                "PL00000000000000000000000000",
+                TITLE,
+                1.0,
+                "cron:0 9 1 * *",
+                due,
+            )
+            for _ in range(items)
+        ],
+    )
+    con.commit()
+    con.close()
+
+
+def run(path: str, workers: int, batch_size: int) -> float:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}")
+    started = time.perf_counter()
+    procs = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "app.scheduler",
+                "--once",
+                "--batch-size",
+                str(batch_size),
+                "--worker-id",
+                f"bench-{n}",
+            ],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        for n in range(workers)
+    ]
+    for proc in procs:
+        proc.wait()
+    return time.perf_counter() - started
+
+
+def check(path: str, items: int) -> str:
+    con = sqlite3.connect(path)
+    executed = con.execute("SELECT COUNT(*) FROM transactions WHERE title = ?", (TITLE,)).fetchone()[0]
+    runs = dict(con.execute("SELECT runs, COUNT(*) FROM scheduled_transfers GROUP BY runs"))
+    con.close()
+    ok = executed == items and runs == {1: items}
+    return f"{'OK' if ok else 'MISMATCH'} (transactions={executed}, runs={runs})"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.db")
+        prepare(template, args.users, args.items)
+
+        for workers in args.workers:
+            path = os.path.join(tmp, f"run-{workers}.db")
+            with open(template, "rb") as src, open(path, "wb") as dst:
+                dst.write(src.read())
+            elapsed = run(path, workers, args.batch_size)
+            print(
+                f"workers={workers:<3} {args.items / elapsed:9.0f} items/s "
+                f"({elapsed:.2f}s)  exactly-once: {check(path, args.items)}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: transaction history serialization, rows/sec.
+
+Compares the two paths behind the history endpoints:
+  - orm+pydantic : ORM objects -> List[TransactionOut] validation -> stdlib json
+                   (what /banking/transactions/{user_id} does)
+  - core+orjson  : Core row -> dict projection -> orjson
+                   (what /banking/transactions/{user_id}/fast does)
+
+Runs against a throwaway in-memory SQLite database.
+
+Usage:
+    python helpers/bench_serialization.py --sizes 10 1000 100000
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app import banking, responses  # noqa: E402
+from app.db import Base  # noqa: E402
+from app.models import Transaction, User  # noqa: E402
+from app.schemas import TransactionOut  # noqa: E402
+
+adapter = TypeAdapter(List[TransactionOut])
+
+
+def make_session(rows: int):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.execute(
+        insert(User),
+        [{"id": "u", "name": "Bench", "pesel": "0", "pin_code": "0", "phone": "0"}],
+    )
+    start = datetime(2024, 1, 1)
+    db.execute(
+        insert(Transaction),
+        [
+            {
+                "sender_id": "u",
+                "recipient_name": f"Recipient {i % 50}",
+                "recipient_iban": "PL34175000120000000012345678",
+                "title": "Apartment rent",
+                "amount": 10.0 + i % 700,
+                "timestamp": start + timedelta(minutes=i),
+            }
+            for i in range(rows)
+        ],
+    )
+    db.commit()
+    return db
+
+
+def orm_pydantic(db) -> bytes:
+    db.expunge_all()
+    transactions = banking.get_transactions_for_user(db, "u")
+    validated = adapter.validate_python(transactions, from_attributes=True)
+    return json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+
+def core_orjson(db) -> bytes:
+    rows = banking.get_transaction_rows_for_user(db, "u")
+    return responses.dumps(rows)
+
+
+def bench(fn, db, rows: int, min_seconds: float = 0.5) -> float:
+    loops = 0
+    started = time.perf_counter()
+    while True:
+        fn(db)
+        loops += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return rows * loops / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"orjson installed: {responses.orjson is not None}")
+    print(f"{'rows':>8} {'orm+pydantic':>16} {'core+orjson':>16} {'speedup':>8}")
+    for rows in args.sizes:
+        db = make_session(rows)
+        assert json.loads(orm_pydantic(db)) == json.loads(core_orjson(db))
+        slow = bench(orm_pydantic, db, rows)
+        fast = bench(core_orjson, db, rows)
+        print(f"{rows:>8} {slow:>12.0f} r/s {fast:>12.0f} r/s {fast / slow:>7.1f}x")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
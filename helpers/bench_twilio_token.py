@@ -0,0 +1,58 @@
+"""
+Benchmark: cost of minting a Twilio Voice SDK token vs. serving it from
+the per-identity cache used by /twilio/token.
+
+Uses dummy credentials – signing is local, no network access is needed.
+
+Usage:
+    python helpers/bench_twilio_token.py --iterations 2000
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("TWILIO_ACCOUNT_SID", "AC" + "0" * 32)
+os.environ.setdefault("TWILIO_API_KEY", "SK" + "0" * 32)
+os.environ.setdefault("TWILIO_API_SECRET", "s" * 32)
+os.environ.setdefault("TWIML_APP_SID", "AP" + "0" * 32)
+
+from app.twilio_tokens import VoiceTokenCache  # noqa: E402
+
+
+def bench(label: str, fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    elapsed = time.perf_counter() - started
+    per_call_us = elapsed / iterations * 1e6
+    print(f"{label:<28} {per_call_us:10.1f} us/token  {iterations / elapsed:12.0f} tokens/s")
+    return per_call_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--identities", type=int, default=10)
+    args = parser.parse_args()
+
+    cache = VoiceTokenCache(ttl=3600, refresh_margin=300)
+
+    mint = bench("mint + sign (no cache)", lambda i: cache.mint("web_user"), args.iterations)
+
+    identities = [f"user-{n}" for n in range(args.identities)]
+    cached = bench(
+        f"cached ({args.identities} identities)",
+        lambda i: cache.get(identities[i % len(identities)]),
+        args.iterations,
+    )
+
+    print(f"speedup: {mint / cached:.0f}x  (hits={cache.hits}, misses={cache.misses})")
+
+
+if __name__ == "__main__":
+    main()
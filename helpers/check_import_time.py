@@ -0,0 +1,83 @@
+"""
+Import-time regression check for the web app.
+
+Runs `python -X importtime -c "import app.main"` in a clean interpreter and
+fails (exit code 1) if the cumulative import time of `app.main` exceeds the
+budget, or if modules that must stay lazy (LLM / Twilio SDKs) are imported.
+
+Usage:
+    python helpers/check_import_time.py --budget-ms 1500
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Heavy SDKs that must only be imported on first use.
+LAZY_MODULES = ["groq", "twilio"]
+
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(module: str) -> Dict[str, int]:
+    """
+    Returns {module_name: cumulative_us} for every module imported while
+    importing `module` in a fresh interpreter.
+    """
+    env = dict(os.environ)
+    env.pop("GROQ_API_KEY", None)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr)
+        raise SystemExit(f"[IMPORT-TIME] importing {module} failed")
+
+    cumulative: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            cumulative[m.group(4)] = int(m.group(2))
+    return cumulative
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    args = parser.parse_args()
+
+    cumulative = measure(args.module)
+    total_ms = cumulative.get(args.module, 0) / 1000
+
+    print(f"[IMPORT-TIME] {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for name, us in sorted(cumulative.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    eager = [m for m in LAZY_MODULES if m in cumulative]
+    if eager:
+        print(f"[IMPORT-TIME] FAIL: imported eagerly: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("[IMPORT-TIME] FAIL: over budget")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("[IMPORT-TIME] OK")
+
+
+if __name__ == "__main__":
+    main()
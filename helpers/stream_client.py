@@ -0,0 +1,102 @@
+"""
+Simulated Twilio Media Streams call against /twilio/stream.
+
+Sends 'connected' and 'start', then 20 ms frames of caller audio (silence)
+in real time, echoes every 'mark' the way Twilio does once playback has
+finished, and prints what the server sends back with timestamps. Run the
+server with the replay recognizer to script what the caller "says":
+
+    STREAM_ASR=replay:/tmp/call.txt LLM_OFFLINE=true uvicorn app.main:app
+    python helpers/stream_client.py --seconds 20
+
+With --barge-in the client does not wait for the reply to be played before
+it "hears" the next words, so the server interrupts its replies.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import time
+
+import websockets
+
+FRAME_SECONDS = 0.02
+FRAME = base64.b64encode(b"\xff" * int(8000 * FRAME_SECONDS)).decode("ascii")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/twilio/stream")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--call-sid", default="CA-stream-client")
+    parser.add_argument("--barge-in", action="store_true")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    stream_sid = "MZ-stream-client"
+    # Seconds of reply audio queued for "playback"; marks are echoed after it.
+    playing_until = 0.0
+    pending_marks = []
+
+    def log(text: str) -> None:
+        print(f"{time.monotonic() - started:7.2f}s  {text}")
+
+    async with websockets.connect(args.url) as ws:
+        await ws.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+        await ws.send(
+            json.dumps(
+                {
+                    "event": "start",
+                    "streamSid": stream_sid,
+                    "start": {"streamSid": stream_sid, "callSid": args.call_sid},
+                }
+            )
+        )
+
+        async def send_audio() -> None:
+            frames = int(args.seconds / FRAME_SECONDS)
+            for n in range(frames):
+                now = time.monotonic()
+                while pending_marks and now >= playing_until:
+                    name = pending_marks.pop(0)
+                    await ws.send(
+                        json.dumps({"event": "mark", "streamSid": stream_sid, "mark": {"name": name}})
+                    )
+                # Twilio keeps sending caller audio while a reply plays; the
+                # replay recognizer only "hears" it when --barge-in is set.
+                if args.barge_in or now >= playing_until:
+                    media = {"track": "inbound", "chunk": str(n), "payload": FRAME}
+                    await ws.send(json.dumps({"event": "media", "streamSid": stream_sid, "media": media}))
+                await asyncio.sleep(FRAME_SECONDS)
+            await ws.send(json.dumps({"event": "stop", "streamSid": stream_sid}))
+
+        async def receive() -> None:
+            nonlocal playing_until
+            async for raw in ws:
+                message = json.loads(raw)
+                event = message.get("event")
+                if event == "media":
+                    seconds = len(base64.b64decode(message["media"]["payload"])) / 8000
+                    playing_until = max(playing_until, time.monotonic()) + seconds
+                    log(f"media  {seconds:.2f}s of audio")
+                elif event == "mark":
+                    pending_marks.append(message["mark"]["name"])
+                    log(f"mark   {message['mark']['name']}")
+                elif event == "clear":
+                    playing_until = 0.0
+                    log("clear  (barge-in)")
+                else:
+                    log(f"{event}")
+
+        sender = asyncio.create_task(send_audio())
+        try:
+            await receive()
+        except websockets.ConnectionClosed:
+            pass
+        log("connection closed")
+        sender.cancel()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app import event_log  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_event_log(monkeypatch):
+    """Tests never write the audit log; the flag is restored after each test."""
+    monkeypatch.setattr(event_log, "_disabled", True)
@@ -0,0 +1,62 @@
+import pytest
+
+from app.amount_parser import (
+    ABSOLUTE,
+    FRACTION_OF_BALANCE,
+    ParsedAmount,
+    parse_amount,
+    parse_cardinal,
+)
+
+
+@pytest.mark.parametrize(
+    "message, value, currency",
+    [
+        ("send 50 to mom", 50, None),
+        ("two hundred and fifty", 250, None),
+        ("twenty five zloty", 25, "PLN"),
+        ("a thousand", 1000, None),
+        ("two thousand five hundred", 2500, None),
+        ("one hundred thousand", 100000, None),
+        ("100,50", 100.5, None),
+        ("1,000.50", 1000.5, None),
+        ("1 000,50", 1000.5, None),
+        ("1 000 zł to mom", 1000, "PLN"),
+        ("1 000 PLN", 1000, "PLN"),
+        ("twelve point five", 12.5, None),
+        ("twelve point fifty", 12.5, None),
+        ("send mom 12 point five", 12.5, None),
+        ("send 12 point 5", 12.5, None),
+        ("fifty złoty and twenty groszy", 50.2, "PLN"),
+        ("$50", 50, "USD"),
+    ],
+)
+def test_absolute_amounts(message, value, currency):
+    assert parse_amount(message) == ParsedAmount(ABSOLUTE, value, currency)
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "send mom twenty five fifty",
+        "send nineteen ninety",
+        "send 100 200",
+        "send 1 000",
+    ],
+)
+def test_numbers_in_a_row_are_ambiguous(message):
+    assert parse_amount(message) is None
+
+
+def test_fraction_of_balance():
+    assert parse_amount("half my balance").kind == FRACTION_OF_BALANCE
+    assert parse_amount("10 percent of my balance").value == pytest.approx(0.1)
+
+
+def test_ordinals_are_not_amounts():
+    assert parse_amount("on the 3rd") is None
+
+
+def test_parse_cardinal():
+    assert parse_cardinal("show my last three transfers") == 3
+    assert parse_cardinal("last 10 please") == 10
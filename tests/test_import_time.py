@@ -0,0 +1,9 @@
+from helpers.check_import_time import LAZY_MODULES, measure
+
+
+def test_app_import_leaves_sdks_lazy():
+    cumulative = measure("app.main")
+
+    assert "app.main" in cumulative
+    eager = [module for module in LAZY_MODULES if module in cumulative]
+    assert eager == [], f"imported eagerly: {eager}"
@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app import llm, replay, turn_recorder
+from app.assistant import process_message
+from app.assistant_utils import conversation_history, pending_transfers
+from app.db import Base
+from app.dialog_planner import dialog_states
+from app.models import Transaction
+from app.seed import seed_demo_data
+
+USER_ID = "user-1"
+
+
+def fake_answer(fn_name, request):
+    """What the provider answers while the turns are recorded."""
+    said = request["messages"][-1]["content"].lower()
+    if fn_name == "detect_intent":
+        return "make_transfer" if "send" in said else "other"
+    if fn_name in ("extract_recipient", "match_contact_label"):
+        return "mom"
+    if fn_name == "detect_confirmation_or_end":
+        return "confirm" if "go ahead" in said else "none"
+    if fn_name == "refers_to_same_amount_as_last_time":
+        return "NO"
+    return "NONE"
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        seed_demo_data(session)
+        yield session
+    engine.dispose()
+
+
+@pytest.fixture
+def recorded(tmp_path, monkeypatch, db):
+    """Records a transfer and both its confirmations; returns the NDJSON path."""
+    path = tmp_path / "turns.ndjson"
+    monkeypatch.setattr(turn_recorder, "TURN_RECORD_PATH", str(path))
+    monkeypatch.setattr(turn_recorder, "_file", None)
+    monkeypatch.setattr(llm, "LLM_OFFLINE", False)
+    monkeypatch.setattr(llm, "_batcher", None)
+    monkeypatch.setattr(
+        llm, "_create", lambda request, fn_name=None: fake_answer(fn_name, request)
+    )
+    for state in (conversation_history, pending_transfers, dialog_states):
+        state.clear()
+
+    process_message("Send 50 zloty to mom", USER_ID, db)
+    process_message("Yes, go ahead", USER_ID, db)
+    process_message("Yes, go ahead", USER_ID, db)
+    turn_recorder._file.close()
+    # Like the replay CLI, replay with recording turned off.
+    monkeypatch.setattr(turn_recorder, "TURN_RECORD_PATH", "")
+    monkeypatch.setattr(turn_recorder, "_file", None)
+
+    for state in (conversation_history, pending_transfers, dialog_states):
+        state.clear()
+    return path
+
+
+def test_recorded_turns_replay_identically(recorded, db):
+    records = list(replay.iter_records(str(recorded)))
+    assert [r["message"] for r in records] == ["Send 50 zloty to mom"] + ["Yes, go ahead"] * 2
+    assert records[2]["pending"] is not None
+    assert any(entry["fn"] == "detect_confirmation_or_end" for entry in records[2]["llm"])
+    transfers = db.execute(select(Transaction).where(Transaction.sender_id == USER_ID)).scalars()
+    assert len(list(transfers)) == len(records[0]["db"]["transactions"]) + 1
+
+    for index, record in enumerate(records):
+        result = replay.replay_turn(index, record)
+        assert result.matched, result.diffs or result.error
+        assert result.extra_calls == []
+        assert result.unused_answers == 0
+
+
+def test_replay_reports_a_turn_that_behaves_differently(recorded):
+    record = list(replay.iter_records(str(recorded)))[2]
+    for entry in record["llm"]:
+        if entry["fn"] == "detect_confirmation_or_end":
+            entry["content"] = "reject"
+
+    result = replay.replay_turn(2, record)
+
+    assert not result.matched
+    assert any(diff.startswith("reply:") for diff in result.diffs)